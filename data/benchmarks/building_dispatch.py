@@ -0,0 +1,60 @@
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from optihood.energy_network import EnergyNetworkIndiv, _buildingSheets, _splitByBuilding
+from optihood.scenario_directory import readScenarioDirectory
+from synthetic_scenario import writeSyntheticScenario
+
+
+def splitWithMasks(data, numberOfBuildings):
+    # sheets filtered with a boolean mask per building, as done before _splitByBuilding
+    return {i: {sheet: data[sheet][data[sheet]["building"] == i] for sheet in _buildingSheets}
+            for i in range(1, numberOfBuildings + 1)}
+
+
+def timeIt(function, *args, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def convertNodes(directoryPath, numberOfBuildings, timePeriod, maxWorkers):
+    network = EnergyNetworkIndiv(timePeriod, maxWorkers=maxWorkers)
+    nodesData = readScenarioDirectory(directoryPath, numberOfBuildings)
+    network._createBuildingModelData(nodesData)
+    start = time.perf_counter()
+    network._convertNodes(nodesData, "costs", False)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+
+    # time needed to split the building sheets (one mask per building and sheet vs. one groupby per sheet) and to
+    # convert the nodes of the buildings sequentially (1 worker) or with the default pool of threads
+    numberOfBuildingsList = [50, 200, 500]
+    timePeriod = pd.date_range("2018-01-01 00:00:00", "2018-01-31 23:00:00", freq="60min")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmpDir:
+        for numberOfBuildings in numberOfBuildingsList:
+            scenarioPath = os.path.join(tmpDir, f"scenario_{numberOfBuildings}")
+            scenarioFile = writeSyntheticScenario(scenarioPath, numberOfBuildings)
+            directoryPath = os.path.join(scenarioPath, "scenario_directory")
+            EnergyNetworkIndiv(timePeriod).createScenarioDirectory(scenarioFile, directoryPath, numberOfBuildings)
+            data = readScenarioDirectory(directoryPath, numberOfBuildings)
+
+            row = {"buildings": numberOfBuildings,
+                   "split with masks (s)": timeIt(splitWithMasks, data, numberOfBuildings),
+                   "split with groupby (s)": timeIt(_splitByBuilding, data, numberOfBuildings),
+                   "conversion 1 worker (s)": convertNodes(directoryPath, numberOfBuildings, timePeriod, 1),
+                   "conversion thread pool (s)": convertNodes(directoryPath, numberOfBuildings, timePeriod, None)}
+            results.append(row)
+            print(row)
+
+    print(pd.DataFrame(results).set_index("buildings").round(3).to_string())
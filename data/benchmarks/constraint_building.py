@@ -0,0 +1,115 @@
+import os
+import tempfile
+import time
+
+import oemof.solph as solph
+import pandas as pd
+from pyomo import environ as pyo
+
+from optihood.constraints import electricRodCapacityConstaint, roof_area_limit, totalPVCapacityConstraint
+from optihood.energy_network import EnergyNetworkIndiv
+from optihood.flow_registry import FlowRegistry
+from synthetic_scenario import writeSyntheticScenario
+
+
+# custom constraints as implemented before the flow registry (scan of all the flows of the model with substring tests)
+def roofAreaLimitLegacy(model, keyword1, keyword2, nb):
+    for b in range(1, nb + 1):
+        limit = 0
+        investFlows = {}
+        for (i, o) in model.flows:
+            if str(b) in str(i):
+                if hasattr(model.flows[i, o].investment, keyword1):
+                    investFlows[(i, o)] = model.flows[i, o].investment
+                    limit = getattr(model.flows[i, o].investment, keyword2)
+        limitName = "invest_limit_" + keyword1 + "_building" + str(b)
+        setattr(model, limitName, pyo.Expression(expr=sum(model.InvestmentFlow.invest[i, o] * getattr(investFlows[i, o], keyword1)
+                                                          for (i, o) in investFlows)))
+        setattr(model, limitName + "_constraint", pyo.Constraint(expr=(getattr(model, limitName) <= limit)))
+    return model
+
+
+def electricRodCapacityLegacy(om, numBuildings):
+    electricRodInputFlows = [(i, o) for (i, o) in om.flows if ("ElectricRod" in o.label)]
+    airHeatPumpInputFlows = [(i, o) for (i, o) in om.flows if ("HP" in o.label and "CHP" not in o.label and "GWHP" not in o.label)]
+    groundHeatPumpInputFlows = [(i, o) for (i, o) in om.flows if ("GWHP" in o.label and not any([c.isdigit() for c in o.label.split("__")[0]]))]
+    elRodCapacityTotal, airHeatPumpCapacityTotal, groundHeatPumpCapacityTotal = 0, 0, 0
+    for b in range(1, numBuildings + 1):
+        elRodCapacity = [om.InvestmentFlow.invest[i, o] for (i, o) in electricRodInputFlows if f'__Building{b}' in o.label]
+        airHeatPumpCapacity = [om.InvestmentFlow.invest[i, o] for (i, o) in airHeatPumpInputFlows if f'__Building{b}' in o.label]
+        groundHeatPumpCapacity = [om.InvestmentFlow.invest[i, o] for (i, o) in groundHeatPumpInputFlows if f'__Building{b}' in o.label]
+        if elRodCapacity:
+            elRodCapacityTotal = elRodCapacityTotal + elRodCapacity[0]
+            airHeatPumpCapacityTotal = airHeatPumpCapacityTotal + (airHeatPumpCapacity[0] if airHeatPumpCapacity else 0)
+            groundHeatPumpCapacityTotal = groundHeatPumpCapacityTotal + (groundHeatPumpCapacity[0] if groundHeatPumpCapacity else 0)
+    om.electricRodSizeConstr = pyo.Constraint(expr=(elRodCapacityTotal <= (airHeatPumpCapacityTotal + groundHeatPumpCapacityTotal)))
+    return om
+
+
+def totalPVCapacityLegacy(om, numBuildings):
+    pvOutFlows = [(i, o) for (i, o) in om.flows if ("pv" in i.label)]
+    pvCapacityTotal = 0
+    for b in range(1, numBuildings + 1):
+        pvCapacity = [om.InvestmentFlow.invest[i, o] for (i, o) in pvOutFlows if f'__Building{b}' in o.label]
+        if pvCapacity:
+            pvCapacityTotal = pvCapacityTotal + pvCapacity[0]
+    om.PVSizeConstr = pyo.Constraint(expr=(pvCapacityTotal <= 205))
+    return om
+
+
+def addConstraints(om, numberOfBuildings, functions):
+    start = time.perf_counter()
+    functions[0](om, "space", "roof_area", numberOfBuildings)
+    functions[1](om, numberOfBuildings)
+    functions[2](om, numberOfBuildings)
+    return time.perf_counter() - start
+
+
+def deleteConstraints(om, numberOfBuildings):
+    for b in range(1, numberOfBuildings + 1):
+        om.del_component(f"invest_limit_space_building{b}")
+        om.del_component(f"invest_limit_space_building{b}_constraint")
+    om.del_component("electricRodSizeConstr")
+    om.del_component("PVSizeConstr")
+    om.__dict__.pop("_flowRegistry", None)
+
+
+def writeScenarioWithElectricRods(scenarioPath, numberOfBuildings):
+    # synthetic scenario in which every building also has an electric rod (with the parameters of the heat pump)
+    scenarioFile = writeSyntheticScenario(scenarioPath, numberOfBuildings)
+    data = pd.ExcelFile(scenarioFile)
+    sheets = {s: data.parse(s) for s in data.sheet_names}
+    transformers = sheets["transformers"]
+    electricRods = transformers[transformers["label"] == "HP"].assign(label="ElectricRod", efficiency=1)
+    sheets["transformers"] = pd.concat([transformers, electricRods]).sort_values("building", kind="stable")
+    with pd.ExcelWriter(scenarioFile, engine="openpyxl") as writer:
+        for s, frame in sheets.items():
+            frame.to_excel(writer, sheet_name=s, index=False)
+    return scenarioFile
+
+
+if __name__ == '__main__':
+
+    # time needed to add the roof area, PV capacity and electric rod constraints to the model of a 300 buildings scenario
+    # by scanning all the flows (legacy) and by using the flow registry (including the time needed to build it)
+    numberOfBuildings = 300
+    timePeriod = pd.date_range("2018-01-01 00:00:00", periods=24, freq="60min")
+
+    with tempfile.TemporaryDirectory() as tmpDir:
+        scenarioFile = writeScenarioWithElectricRods(tmpDir, numberOfBuildings)
+        network = EnergyNetworkIndiv(timePeriod)
+        network.setFromExcel(scenarioFile, numberOfBuildings)
+        om = solph.Model(network)
+
+        legacy = addConstraints(om, numberOfBuildings, [roofAreaLimitLegacy, totalPVCapacityLegacy, electricRodCapacityLegacy])
+        deleteConstraints(om, numberOfBuildings)
+        registry = addConstraints(om, numberOfBuildings, [roof_area_limit, totalPVCapacityConstraint, electricRodCapacityConstaint])
+        start = time.perf_counter()
+        FlowRegistry(om)
+        registryBuild = time.perf_counter() - start
+
+    print(pd.Series({"buildings": numberOfBuildings, "flows": len(om.flows),
+                     "legacy (s)": legacy,
+                     "flow registry (s)": registry,
+                     "of which registry construction (s)": registryBuild,
+                     "speedup": legacy / registry}).round(3).to_string())
@@ -0,0 +1,55 @@
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+import optihood.cop_profiles as copProfilesModule
+from optihood.cop_profiles import copProfiles
+from optihood.energy_network import EnergyNetworkIndiv
+from optihood.scenario_directory import readScenarioDirectory
+from synthetic_scenario import writeSyntheticScenario
+
+
+def convertNodes(directoryPath, numberOfBuildings, timePeriod):
+    # time needed to convert the scenario data into the nodes of the energy network (the data are read beforehand)
+    copProfiles.clear()
+    network = EnergyNetworkIndiv(timePeriod)
+    nodesData = readScenarioDirectory(directoryPath, numberOfBuildings)
+    network._createBuildingModelData(nodesData)
+    start = time.perf_counter()
+    network._convertNodes(nodesData, "costs", False)
+    return time.perf_counter() - start
+
+
+def getProfileWithoutCache(model, tHigh, tLow):
+    # COP profile and average calculated for every heat pump as done before the COP profile cache
+    cop = copProfilesModule._calculateCop(copProfilesModule.copCoefficients[model], tHigh, tLow)
+    return cop, sum(cop) / len(cop)
+
+
+if __name__ == '__main__':
+
+    # node conversion time of a full year scenario whose buildings all have an air source (HP) and a ground source
+    # (GWHP) heat pump, with and without the COP profile cache
+    numberOfBuildings = 100
+    timePeriod = pd.date_range("2018-01-01 00:00:00", periods=8760, freq="60min")
+
+    with tempfile.TemporaryDirectory() as tmpDir:
+        scenarioFile = writeSyntheticScenario(tmpDir, numberOfBuildings, fullYear=True)
+        directoryPath = os.path.join(tmpDir, "scenario_directory")
+        EnergyNetworkIndiv(timePeriod).createScenarioDirectory(scenarioFile, directoryPath, numberOfBuildings)
+
+        cached = min(convertNodes(directoryPath, numberOfBuildings, timePeriod) for _ in range(2))
+        statistics = copProfiles.getStatistics()
+        copProfiles._getProfile = getProfileWithoutCache
+        try:
+            uncached = min(convertNodes(directoryPath, numberOfBuildings, timePeriod) for _ in range(2))
+        finally:
+            del copProfiles._getProfile
+
+    print(pd.Series({"buildings": numberOfBuildings,
+                     "without COP cache (s)": uncached,
+                     "with COP cache (s)": cached,
+                     "speedup": uncached / cached,
+                     "COP cache hit rate": statistics["hitRate"]}).round(3).to_string())
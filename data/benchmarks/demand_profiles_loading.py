@@ -0,0 +1,50 @@
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from optihood.profiles import readDemandProfiles
+from synthetic_scenario import writeSyntheticScenario
+
+
+def readDemandProfilesLegacy(demandProfilesPath, numberOfBuildings):
+    # sequential loading previously used in createNodesData (timestamps parsed for each building)
+    demandProfiles = {}
+    for i in range(1, numberOfBuildings + 1):
+        profile = pd.read_csv(os.path.join(demandProfilesPath, f"Building{i}.csv"), delimiter=";")
+        profile.set_index("timestamp", inplace=True)
+        profile.index = pd.to_datetime(profile.index)
+        demandProfiles[i] = profile
+    return demandProfiles
+
+
+def timeIt(function, *args, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == '__main__':
+
+    numberOfBuildingsList = [10, 50, 200]
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmpDir:
+        for numberOfBuildings in numberOfBuildingsList:
+            scenarioPath = os.path.join(tmpDir, f"scenario_{numberOfBuildings}")
+            writeSyntheticScenario(scenarioPath, numberOfBuildings)
+            demandProfilesPath = os.path.join(scenarioPath, "demand_profiles")
+
+            row = {"buildings": numberOfBuildings,
+                   "legacy (s)": timeIt(readDemandProfilesLegacy, demandProfilesPath, numberOfBuildings, repeat=1),
+                   "1 thread (s)": timeIt(lambda: readDemandProfiles(demandProfilesPath, numberOfBuildings, maxWorkers=1)),
+                   "thread pool (s)": timeIt(readDemandProfiles, demandProfilesPath, numberOfBuildings)}
+            row["speedup"] = row["legacy (s)"] / row["thread pool (s)"]
+            results.append(row)
+            print(row)
+
+    print(pd.DataFrame(results).set_index("buildings").round(3).to_string())
@@ -0,0 +1,93 @@
+import time
+import tracemalloc
+
+import numpy as np
+import oemof.solph as solph
+import pandas as pd
+from oemof.solph.plumbing import sequence
+from pyomo import environ as pyo
+
+from optihood.constraints import environmentalImpactlimit
+
+
+def environmentalImpactlimitLegacy(om, keyword1, keyword2, limit=None):
+    # expression of the environmental impacts as implemented before the linear expression (nested generator of products)
+    flows = {}
+    transformerFlowCapacityDict = {}
+    storageCapacityDict = {}
+    for (i, o) in om.flows:
+        if hasattr(om.flows[i, o], keyword1):
+            flows[(i, o)] = om.flows[i, o]
+        if hasattr(om.flows[i, o].investment, keyword2):
+            transformerFlowCapacityDict[(i, o)] = om.flows[i, o].investment
+    for x in om.GenericInvestmentStorageBlock.INVESTSTORAGES:
+        if hasattr(x.investment, keyword2):
+            storageCapacityDict[x] = om.GenericInvestmentStorageBlock.invest[x]
+    om.totalEnvironmentalImpact = pyo.Expression(
+        expr=sum(om.flow[inflow, outflow, t] * om.timeincrement[t] * sequence(getattr(flows[inflow, outflow], keyword1))[t]
+                 for (inflow, outflow) in flows for t in om.TIMESTEPS)
+        + sum(om.InvestmentFlow.invest[inflow, outflow] * getattr(transformerFlowCapacityDict[inflow, outflow], keyword2)
+              for (inflow, outflow) in transformerFlowCapacityDict)
+        + sum(om.GenericInvestmentStorageBlock.invest[x] * getattr(x.investment, keyword2) for x in storageCapacityDict))
+    om.totalEnvironmentalImpact_constraint = pyo.Constraint(expr=(om.totalEnvironmentalImpact <= limit))
+    return om, flows, transformerFlowCapacityDict, storageCapacityDict
+
+
+def impactModel(numberOfBuildings, timesteps):
+    # minimal model with, in each building, an electricity source with an impact time series (zero impact at night, as
+    # with a PV surplus), a natural gas source with a constant impact (both with an investment and an impact per
+    # capacity), an investment storage and the excess sinks
+    timeindex = pd.date_range("2018-01-01", periods=timesteps, freq="60min")
+    rng = np.random.default_rng(0)
+    energySystem = solph.EnergySystem(timeindex=timeindex)
+    for b in range(1, numberOfBuildings + 1):
+        electricityBus = solph.Bus(label=f"electricityBus__Building{b}")
+        naturalGasBus = solph.Bus(label=f"naturalGasBus__Building{b}")
+        impact = rng.uniform(0.05, 0.15, timesteps) * (timeindex.hour >= 6)
+        energySystem.add(electricityBus, naturalGasBus,
+                         solph.Source(label=f"electricityResource__Building{b}", outputs={electricityBus: solph.Flow(
+                             variable_costs=0.2, env_per_flow=impact,
+                             investment=solph.Investment(ep_costs=1, env_per_capa=2))}),
+                         solph.Source(label=f"naturalGasResource__Building{b}", outputs={naturalGasBus: solph.Flow(
+                             variable_costs=0.1, env_per_flow=0.228,
+                             investment=solph.Investment(ep_costs=1, env_per_capa=1))}),
+                         solph.Sink(label=f"excessElectricity__Building{b}", inputs={electricityBus: solph.Flow()}),
+                         solph.Sink(label=f"excessNaturalGas__Building{b}", inputs={naturalGasBus: solph.Flow()}),
+                         solph.components.GenericStorage(label=f"electricalStorage__Building{b}",
+                                                         inputs={electricityBus: solph.Flow()},
+                                                         outputs={electricityBus: solph.Flow()},
+                                                         investment=solph.Investment(ep_costs=10, env_per_capa=3)))
+    return solph.Model(energySystem)
+
+
+def buildExpression(om, function, traceMemory=False):
+    if traceMemory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    function(om, keyword1="env_per_flow", keyword2="env_per_capa", limit=1e6)
+    buildTime = time.perf_counter() - start
+    peakMemory = tracemalloc.get_traced_memory()[1] / 1e6 if traceMemory else None
+    tracemalloc.stop()
+    om.del_component("totalEnvironmentalImpact_constraint")
+    om.del_component("totalEnvironmentalImpact")
+    return buildTime, peakMemory
+
+
+if __name__ == '__main__':
+
+    # time and peak memory needed to build the expression of the total environmental impact of a full year model of
+    # 50 buildings, as a nested generator of products (legacy) and as a linear expression of precomputed coefficients
+    numberOfBuildings = 50
+    timesteps = 8760
+    om = impactModel(numberOfBuildings, timesteps)
+    legacyTime, _ = buildExpression(om, environmentalImpactlimitLegacy)
+    linearTime, _ = buildExpression(om, environmentalImpactlimit)
+    _, legacyMemory = buildExpression(om, environmentalImpactlimitLegacy, traceMemory=True)
+    _, linearMemory = buildExpression(om, environmentalImpactlimit, traceMemory=True)
+
+    print(pd.Series({"buildings": numberOfBuildings, "timesteps": timesteps,
+                     "legacy build time (s)": legacyTime,
+                     "linear expression build time (s)": linearTime,
+                     "speedup": legacyTime / linearTime,
+                     "legacy peak memory (MB)": legacyMemory,
+                     "linear expression peak memory (MB)": linearMemory}).round(3).to_string())
@@ -0,0 +1,53 @@
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from optihood.energy_network import EnergyNetworkIndiv
+from synthetic_scenario import writeSyntheticScenario
+
+# phases of the solve (see EnergyNetworkClass.getPhaseReport), for HiGHS writeSolverFile is the conversion of the model
+# into the matrix passed in memory and readSolution the transfer of the solution into the model
+solvePhases = ["writeSolverFile", "runSolver", "readSolution", "processResults"]
+
+
+def optimizeScenario(scenarioFile, numberOfBuildings, timesteps, solver, options):
+    network = EnergyNetworkIndiv(pd.date_range("2018-01-01 00:00:00", periods=timesteps, freq="60min"))
+    network.setFromExcel(scenarioFile, numberOfBuildings, opt="costs")
+    start = time.perf_counter()
+    network.optimize(numberOfBuildings, solver, options={solver: options})
+    solveTime = time.perf_counter() - start
+    report = network.getPhaseReport()
+    case = {p + " (s)": report.get(p, {}).get("wallTime", 0.0) for p in solvePhases}
+    case["optimize (s)"] = solveTime
+    case["objective"] = network._metaResults["objective"]
+    case["termination"] = str(network._metaResults["solver"]["Termination condition"])
+    case["constraints"] = network._metaResults["problem"].get("Number of constraints")
+    return case
+
+
+if __name__ == '__main__':
+
+    # optimization of the same synthetic scenario with CBC (lp file written, solver process, solution file read) and
+    # with HiGHS (model passed in memory through highspy), e.g. python highs_solver.py --buildings 10 --timesteps 168
+    parser = argparse.ArgumentParser(description="In-memory HiGHS vs file based CBC")
+    parser.add_argument("--buildings", type=int, default=10)
+    parser.add_argument("--timesteps", type=int, default=168)
+    parser.add_argument("--gap", type=float, default=0.01, help="relative MIP gap")
+    parser.add_argument("--timeLimit", type=int, default=600, help="time limit of the solver (s)")
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    solverOptions = {"cbc": {"ratioGap": args.gap, "sec": args.timeLimit, "threads": args.threads},
+                     "highs": {"mip_rel_gap": args.gap, "time_limit": float(args.timeLimit), "threads": args.threads}}
+    cases = {}
+    with tempfile.TemporaryDirectory() as tmpDir:
+        scenarioFile = writeSyntheticScenario(os.path.join(tmpDir, "scenario"), args.buildings,
+                                              fullYear=args.timesteps > 744)
+        for solver in ["cbc", "highs"]:
+            cases[solver] = optimizeScenario(scenarioFile, args.buildings, args.timesteps, solver, solverOptions[solver])
+
+    print("{} buildings, {} timesteps, gap {}".format(args.buildings, args.timesteps, args.gap))
+    print(pd.DataFrame(cases).to_string())
@@ -0,0 +1,57 @@
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from optihood.energy_network import EnergyNetworkIndiv
+from synthetic_scenario import writeSyntheticScenario
+
+# phases of the optimization (see EnergyNetworkClass.getPhaseReport), lpRelaxation includes the definition of the
+# energy network in dispatch mode, the model and the solve of the LP
+optimizePhases = ["lpRelaxation", "buildModel", "runSolver"]
+
+
+def optimizeScenario(scenarioFile, numberOfBuildings, timesteps, solver, options, lpWarmStart, fixUnused):
+    network = EnergyNetworkIndiv(pd.date_range("2018-01-01 00:00:00", periods=timesteps, freq="60min"))
+    network.setFromExcel(scenarioFile, numberOfBuildings, opt="costs")
+    start = time.perf_counter()
+    network.optimize(numberOfBuildings, solver, options={solver: options}, lpWarmStart=lpWarmStart,
+                     fixUnusedTechnologies=fixUnused)
+    optimizeTime = time.perf_counter() - start
+    report = network.getPhaseReport()
+    case = {p + " (s)": report.get(p, {}).get("wallTime", 0.0) for p in optimizePhases}
+    case["optimize (s)"] = optimizeTime
+    case["objective"] = network._metaResults["objective"]
+    case["termination"] = str(network._metaResults["solver"]["Termination condition"])
+    return case
+
+
+if __name__ == '__main__':
+
+    # optimization of the same synthetic scenario without warm start, warm started from the LP relaxation (dispatch
+    # mode) and warm started with the technologies unused by the LP fixed to zero,
+    # e.g. python lp_warm_start.py --buildings 10 --timesteps 168
+    parser = argparse.ArgumentParser(description="MILP warm started from the dispatch mode LP")
+    parser.add_argument("--buildings", type=int, default=10)
+    parser.add_argument("--timesteps", type=int, default=168)
+    parser.add_argument("--solver", default="cbc")
+    parser.add_argument("--gap", type=float, default=0.01, help="relative MIP gap")
+    parser.add_argument("--timeLimit", type=int, default=600, help="time limit of the solver (s)")
+    args = parser.parse_args()
+
+    solverOptions = {"cbc": {"ratioGap": args.gap, "sec": args.timeLimit},
+                     "gurobi": {"MIPGap": args.gap, "TimeLimit": args.timeLimit},
+                     "highs": {"mip_rel_gap": args.gap, "time_limit": float(args.timeLimit)}}[args.solver]
+    strategies = {"milp": (False, False), "lpWarmStart": (True, False), "lpWarmStart + fixUnused": (True, True)}
+    cases = {}
+    with tempfile.TemporaryDirectory() as tmpDir:
+        scenarioFile = writeSyntheticScenario(os.path.join(tmpDir, "scenario"), args.buildings,
+                                              fullYear=args.timesteps > 744)
+        for strategy, (lpWarmStart, fixUnused) in strategies.items():
+            cases[strategy] = optimizeScenario(scenarioFile, args.buildings, args.timesteps, args.solver,
+                                               solverOptions, lpWarmStart, fixUnused)
+
+    print("{} buildings, {} timesteps, {} solver, gap {}".format(args.buildings, args.timesteps, args.solver, args.gap))
+    print(pd.DataFrame(cases).to_string())
@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+from synthetic_scenario import writeSyntheticScenario
+
+# builds the energy network of a scenario directory in a separate process and prints the peak resident set size (MB)
+peakMemoryScript = """
+import sys
+sys.path.insert(0, sys.argv[1])
+import pandas as pd
+from optihood.energy_network import EnergyNetworkIndiv
+network = EnergyNetworkIndiv(pd.date_range("2018-01-01 00:00:00", periods=8760, freq="60min"))
+network.setFromDirectory(sys.argv[2], int(sys.argv[3]))
+try:
+    import resource
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)     # kB on linux
+except ImportError:
+    import psutil
+    print(psutil.Process().memory_info().peak_wset / 1024 ** 2)
+"""
+
+
+def peakMemory(optihoodPath, directoryPath, numberOfBuildings):
+    output = subprocess.run([sys.executable, "-c", peakMemoryScript, optihoodPath, directoryPath, str(numberOfBuildings)],
+                            capture_output=True, text=True, check=True, cwd=os.path.dirname(directoryPath))
+    return float(output.stdout.split()[-1])
+
+
+if __name__ == '__main__':
+
+    # peak RSS when defining a full year energy network, optionally compared with another optihood checkout, e.g.
+    #   git worktree add ../optihood_reference <commit>
+    #   python memory_usage.py ../optihood_reference
+    numberOfBuildingsList = [10, 50, 200]
+    optihoodPath = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+    referencePath = os.path.abspath(sys.argv[1]) if len(sys.argv) > 1 else None
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmpDir:
+        for numberOfBuildings in numberOfBuildingsList:
+            scenarioPath = os.path.join(tmpDir, f"scenario_{numberOfBuildings}")
+            # solar collectors are left out so that reference checkouts without the solar profile cache (in which the
+            # collector precalculation takes about 25 s per building for a full year) can be compared
+            scenarioFile = writeSyntheticScenario(scenarioPath, numberOfBuildings, fullYear=True, solarCollector=False)
+            directoryPath = os.path.join(scenarioPath, "scenario_directory")
+            sys.path.insert(0, optihoodPath)
+            from optihood.energy_network import EnergyNetworkIndiv
+            network = EnergyNetworkIndiv(pd.date_range("2018-01-01 00:00:00", periods=8760, freq="60min"))
+            network.createScenarioDirectory(scenarioFile, directoryPath, numberOfBuildings)
+
+            row = {"buildings": numberOfBuildings, "peak RSS (MB)": peakMemory(optihoodPath, directoryPath, numberOfBuildings)}
+            if referencePath is not None:
+                row["reference peak RSS (MB)"] = peakMemory(referencePath, directoryPath, numberOfBuildings)
+                row["reduction (%)"] = 100 * (1 - row["peak RSS (MB)"] / row["reference peak RSS (MB)"])
+            results.append(row)
+            print(row)
+
+    print(pd.DataFrame(results).set_index("buildings").round(1).to_string())
@@ -0,0 +1,165 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from synthetic_scenario import technologyMixes, writeSyntheticScenario
+
+# phases of the phase report (see EnergyNetworkClass.getPhaseReport) summed in each stage of the pipeline
+stages = {
+    "build": ["readExcel", "readDirectory", "convertNodes", "addNodes", "buildModel", "customConstraints"],
+    "solve": ["solve"],
+    "postprocess": ["processResults", "calculateResultsPerBuilding"],
+    "export": ["exportToExcel"],
+}
+modelSizeKeys = {"Number of constraints": "constraints", "Number of variables": "variables",
+                 "Number of binary variables": "binaryVariables", "Number of nonzeros": "nonzeros"}
+
+# runs the full pipeline for one scenario in a separate process and prints the result of the case as json
+caseScript = """
+import json, os, sys, time, traceback
+sys.path.insert(0, sys.argv[1])
+import pandas as pd
+from optihood.energy_network import EnergyNetworkIndiv
+scenarioFile, numberOfBuildings, timesteps, solver = sys.argv[2], int(sys.argv[3]), int(sys.argv[4]), sys.argv[5]
+options = json.loads(sys.argv[6])
+case = {"buildings": numberOfBuildings}
+start = time.perf_counter()
+try:
+    network = EnergyNetworkIndiv(pd.date_range("2018-01-01 00:00:00", periods=timesteps, freq="60min"))
+    network.setFromExcel(scenarioFile, numberOfBuildings, opt="costs")
+    network.optimize(numberOfBuildings, solver, options={solver: options})
+    network.exportToExcel(os.path.join(os.path.dirname(scenarioFile), "results.xlsx"))
+    case["status"] = str(network._metaResults["solver"]["Termination condition"])
+    case["objective"] = network._metaResults["objective"]
+    case["model"] = {k: network._metaResults["problem"].get(k) for k in json.loads(sys.argv[7])}
+except Exception:
+    case["status"] = "error"
+    case["error"] = traceback.format_exc()
+case["totalTime"] = time.perf_counter() - start
+case["phases"] = {k: {m: v for m, v in r.items() if m != "profile"} for k, r in network.getPhaseReport().items()} \\
+    if "network" in dir() else {}
+print(json.dumps(case, default=str))
+"""
+
+
+def runCase(optihoodPath, scenarioFile, numberOfBuildings, timesteps, solver, options, timeout=None):
+    output = subprocess.run([sys.executable, "-c", caseScript, optihoodPath, scenarioFile, str(numberOfBuildings),
+                             str(timesteps), solver, json.dumps(options), json.dumps(list(modelSizeKeys))],
+                            capture_output=True, text=True, cwd=os.path.dirname(scenarioFile), timeout=timeout)
+    if output.returncode != 0 or not output.stdout.strip():
+        return {"buildings": numberOfBuildings, "status": "error", "error": output.stderr[-2000:], "phases": {}}
+    case = json.loads(output.stdout.strip().splitlines()[-1])
+    case["model"] = {modelSizeKeys[k]: v for k, v in case.get("model", {}).items()}
+    case["stages"] = {stage: sum(case["phases"].get(p, {}).get("wallTime", 0.0) for p in phases)
+                      for stage, phases in stages.items()}
+    return case
+
+
+def gitCommit(path):
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, cwd=path,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summary(report):
+    rows = []
+    for case in report["cases"]:
+        row = {"buildings": case["buildings"], "status": case["status"]}
+        row.update({f"{stage} (s)": t for stage, t in case.get("stages", {}).items()})
+        row["total (s)"] = case.get("totalTime")
+        row.update(case.get("model", {}))
+        rows.append(row)
+    return pd.DataFrame(rows).set_index("buildings")
+
+
+def compare(report, baseline, tolerance, minTime):
+    """
+    compares the stage times of the cases of report with those of baseline (cases with the same number of buildings)
+    :return: list of the regressions (stage time larger than tolerance times the baseline and than minTime seconds)
+    """
+    for key in ["solver", "timesteps", "technologies"]:
+        if report[key] != baseline[key]:
+            print("Warning: {} differs from the baseline ({} vs {})".format(key, report[key], baseline[key]))
+    baselineCases = {c["buildings"]: c for c in baseline["cases"]}
+    rows, regressions = [], []
+    for case in report["cases"]:
+        reference = baselineCases.get(case["buildings"])
+        if reference is None or "stages" not in case or "stages" not in reference:
+            continue
+        row = {"buildings": case["buildings"]}
+        for stage, t in case["stages"].items():
+            referenceTime = reference["stages"].get(stage, 0.0)
+            ratio = t / referenceTime if referenceTime else float("nan")
+            row[f"{stage} ratio"] = ratio
+            if t > minTime and t > tolerance * referenceTime:
+                regressions.append("{} buildings, {}: {:.2f} s vs {:.2f} s".format(case["buildings"], stage, t, referenceTime))
+        if case.get("model") != reference.get("model"):
+            row["model size changed"] = True
+        rows.append(row)
+    if rows:
+        print(pd.DataFrame(rows).set_index("buildings").round(2).to_string())
+    return regressions
+
+
+if __name__ == '__main__':
+
+    # scaling benchmark of the full pipeline (excel input, node conversion, model building, solving, post-processing
+    # and export) for synthetic scenarios with an increasing number of buildings, e.g.
+    #   python scaling.py --buildings 1 10 50 --timesteps 24 --output report.json
+    #   python scaling.py --buildings 1 10 50 --timesteps 24 --baseline report.json
+    parser = argparse.ArgumentParser(description="Scaling benchmark of optihood on synthetic scenarios")
+    parser.add_argument("--buildings", type=int, nargs="+", default=[1, 5, 10, 50, 100, 200, 500])
+    parser.add_argument("--timesteps", type=int, default=24, help="number of hourly time steps (at most 8760)")
+    parser.add_argument("--technologies", default="all", choices=list(technologyMixes))
+    parser.add_argument("--solver", default="highs", help="open source solver available offline (e.g. highs or cbc)")
+    parser.add_argument("--gap", type=float, default=0.01, help="relative MIP gap")
+    parser.add_argument("--timeLimit", type=int, default=900, help="time limit of the solver per case (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--optihood", default=os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")),
+                        help="path of the optihood checkout to be benchmarked")
+    parser.add_argument("--output", help="json file in which the report is written")
+    parser.add_argument("--baseline", help="json report of a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="ratio to the baseline above which a stage is reported as a regression")
+    parser.add_argument("--minTime", type=float, default=0.5, help="stages shorter than this time (s) are not reported as regressions")
+    args = parser.parse_args()
+
+    solverOptions = {"highs": {"mip_rel_gap": args.gap, "time_limit": args.timeLimit},
+                     "cbc": {"ratioGap": args.gap, "sec": args.timeLimit},
+                     "gurobi": {"MIPGap": args.gap, "TimeLimit": args.timeLimit}}.get(args.solver, {})
+    report = {"optihood": {"path": args.optihood, "commit": gitCommit(args.optihood)},
+              "python": platform.python_version(), "platform": platform.platform(), "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+              "solver": args.solver, "solverOptions": solverOptions, "timesteps": args.timesteps,
+              "technologies": args.technologies, "seed": args.seed, "cases": []}
+
+    with tempfile.TemporaryDirectory() as tmpDir:
+        for numberOfBuildings in args.buildings:
+            scenarioPath = os.path.join(tmpDir, f"scenario_{numberOfBuildings}")
+            scenarioFile = writeSyntheticScenario(scenarioPath, numberOfBuildings, seed=args.seed,
+                                                  fullYear=args.timesteps > 744,
+                                                  technologies=technologyMixes[args.technologies])
+            case = runCase(args.optihood, scenarioFile, numberOfBuildings, args.timesteps, args.solver, solverOptions,
+                           timeout=args.timeLimit * 3 + 600)
+            report["cases"].append(case)
+            print({k: v for k, v in case.items() if k not in ["phases", "error"]})
+            if case["status"] == "error":
+                print(case["error"])
+
+    print(summary(report).round(3).to_string())
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance, args.minTime)
+        for r in regressions:
+            print("Regression: " + r)
+        sys.exit(1 if regressions else 0)
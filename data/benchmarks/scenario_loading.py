@@ -0,0 +1,49 @@
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from optihood.energy_network import EnergyNetworkIndiv
+from optihood.scenario_directory import readScenarioDirectory
+from synthetic_scenario import writeSyntheticScenario
+
+
+def timeIt(function, *args, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == '__main__':
+
+    # compares the time needed to read the scenario data from the excel file and from a scenario directory
+    numberOfBuildingsList = [10, 50, 200]
+    timePeriod = pd.date_range("2018-01-01 00:00:00", "2018-01-31 23:00:00", freq="60min")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmpDir:
+        for numberOfBuildings in numberOfBuildingsList:
+            scenarioPath = os.path.join(tmpDir, f"scenario_{numberOfBuildings}")
+            scenarioFile = writeSyntheticScenario(scenarioPath, numberOfBuildings)
+            directoryPath = os.path.join(scenarioPath, "scenario_directory")
+            network = EnergyNetworkIndiv(timePeriod)
+            network.createScenarioDirectory(scenarioFile, directoryPath, numberOfBuildings)
+
+            def readExcel():
+                network.createNodesData(pd.ExcelFile(scenarioFile), scenarioFile, numberOfBuildings)
+
+            def readDirectory():
+                network._createBuildingModelData(readScenarioDirectory(directoryPath, numberOfBuildings))
+
+            row = {"buildings": numberOfBuildings,
+                   "excel (s)": timeIt(readExcel, repeat=1),
+                   "scenario directory (s)": timeIt(readDirectory)}
+            row["speedup"] = row["excel (s)"] / row["scenario directory (s)"]
+            results.append(row)
+            print(row)
+
+    print(pd.DataFrame(results).set_index("buildings").round(3).to_string())
@@ -0,0 +1,69 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pvlib
+from oemof.thermal.solar_thermal_collector import flat_plate_precalc
+
+from optihood.converters import SolarCollector
+from optihood.solar_profiles import solarProfiles
+from optihood.sources import PV
+from weather_loading import writeSyntheticWeather
+
+
+def precalculateLegacy(weather, latitude, longitude, tilt, azimuth):
+    # PV and solar collector precalculations previously done for each building
+    data = pd.DataFrame({'ghi': weather['gls'], 'dhi': weather['str.diffus'], 'temp_amb': weather['tre200h0']})
+    solposition = pvlib.solarposition.get_solarposition(time=data.index, latitude=latitude, longitude=longitude)
+    dni = pvlib.irradiance.dni(ghi=data['ghi'], dhi=data['dhi'], zenith=solposition['apparent_zenith'])
+    totalIrradiation = pvlib.irradiance.get_total_irradiance(
+        surface_tilt=tilt, surface_azimuth=azimuth, solar_zenith=solposition['apparent_zenith'],
+        solar_azimuth=solposition['azimuth'], dni=dni.fillna(0), ghi=data['ghi'], dhi=data['dhi'])
+    pvPower = PV.pv_precalc(None, data['temp_amb'], totalIrradiation['poa_global'] / 1000)
+    collector = flat_plate_precalc(latitude, longitude, tilt, azimuth, 0.73, 1.7, 0.016, 20, 10,
+                                   weather['gls'], weather['str.diffus'], weather['tre200h0'])
+    return pvPower, collector['collectors_heat'] / 1000
+
+
+def precalculateCached(weather, latitude, longitude, tilt, azimuth):
+    pv = PV.__new__(PV)
+    weatherKey = solarProfiles.fingerprint(weather['gls'], weather['str.diffus'], weather['tre200h0'])
+    pvPower = solarProfiles.getProfile(("pv", latitude, longitude, tilt, azimuth, weatherKey),
+                                       lambda: pv._computePvPower(weather['str.diffus'], weather['gls'], latitude, longitude,
+                                                                  azimuth, tilt, weather['tre200h0']))
+    etaC, collectorHeat = solarProfiles.getProfile(
+        ("solarCollector", latitude, longitude, tilt, azimuth, 0.73, 1.7, 0.016, 20, 10, weatherKey),
+        lambda: SolarCollector._precalculate(None, latitude, longitude, tilt, azimuth, 0.73, 1.7, 0.016, 20, 10,
+                                             weather['gls'], weather['str.diffus'], weather['tre200h0']))
+    return pvPower, collectorHeat
+
+
+if __name__ == '__main__':
+
+    # one site with two roof orientations, one month of hourly data (the legacy collector precalculation loops over
+    # the time steps and takes about 25 s per building for a full year)
+    numberOfBuildingsList = [10, 50]
+    orientations = [(30, 180), (30, 90)]
+    weatherFile = "weather_solar_benchmark.csv"
+    writeSyntheticWeather(weatherFile, 744)
+    weather = pd.read_csv(weatherFile, delimiter=";")
+    weather.index = pd.date_range("2018-01-01 00:00:00", periods=744, freq="60min")
+
+    results = []
+    for numberOfBuildings in numberOfBuildingsList:
+        solarProfiles.clear()
+        row = {"buildings": numberOfBuildings}
+        for name, function in [("legacy (s)", precalculateLegacy), ("cached (s)", precalculateCached)]:
+            start = time.perf_counter()
+            profiles = [function(weather, 47.5, 7.6, *orientations[i % len(orientations)]) for i in range(numberOfBuildings)]
+            row[name] = time.perf_counter() - start
+            if name == "legacy (s)":
+                legacyProfiles = profiles
+        for (pvLegacy, heatLegacy), (pvCached, heatCached) in zip(legacyProfiles, profiles):
+            assert np.allclose(pvLegacy, pvCached) and np.allclose(heatLegacy, heatCached)
+        row["speedup"] = row["legacy (s)"] / row["cached (s)"]
+        row.update({f"{k} hit rate": v["hitRate"] for k, v in solarProfiles.getStatistics().items()})
+        results.append(row)
+        print(row)
+
+    print(pd.DataFrame(results).set_index("buildings").round(3).to_string())
@@ -0,0 +1,67 @@
+import os
+import tempfile
+import time
+
+import oemof.solph as solph
+import pandas as pd
+from pyomo import environ as pyo
+
+from optihood.constraints import dailySHStorageConstraint
+
+
+def dailySHStorageConstraintLegacy(om):
+    # reset of the SH storages as implemented before the indexed constraint (one named constraint per timestep)
+    for s in om.NODES:
+        if "shStorage" in s.label:
+            constr = s.label.replace("__Building", "") + "_constraint_"
+            for t in om.TIMESTEPS:
+                if t % 48 == 0 and t != 0:
+                    setattr(om, constr + str(t), pyo.Constraint(expr=(om.GenericInvestmentStorageBlock.storage_content[s, t] == 0)))
+    return om
+
+
+def storageModel(numberOfBuildings, numberOfPeriods):
+    # minimal model with one investment SH storage per building, the time index being the concatenation of the
+    # representative days
+    energySystem = solph.EnergySystem(timeindex=pd.date_range("2018-01-01", periods=24 * numberOfPeriods, freq="60min"))
+    for b in range(1, numberOfBuildings + 1):
+        bus = solph.Bus(label=f"shSourceBus__Building{b}")
+        energySystem.add(bus,
+                         solph.Source(label=f"heatSource__Building{b}", outputs={bus: solph.Flow(variable_costs=1)}),
+                         solph.Sink(label=f"shDemand__Building{b}", inputs={bus: solph.Flow(fix=1, nominal_value=5)}),
+                         solph.GenericStorage(label=f"shStorage__Building{b}", inputs={bus: solph.Flow()},
+                                              outputs={bus: solph.Flow()}, loss_rate=0.001,
+                                              investment=solph.Investment(ep_costs=10)))
+    return solph.Model(energySystem)
+
+
+def timeConstraint(om, function, lpFile):
+    start = time.perf_counter()
+    function(om)
+    construction = time.perf_counter() - start
+    start = time.perf_counter()
+    om.write(lpFile, io_options={"symbolic_solver_labels": False})
+    return construction, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+
+    # time needed to construct the reset of the SH storages (every 2 representative days) and to write the LP file, with
+    # one named constraint per reset (legacy) and with a single indexed constraint, for 12, 52 and 365 representative days
+    numberOfBuildings = 20
+    rows = []
+    with tempfile.TemporaryDirectory() as tmpDir:
+        lpFile = os.path.join(tmpDir, "model.lp")
+        for numberOfPeriods in [12, 52, 365]:
+            om = storageModel(numberOfBuildings, numberOfPeriods)
+            legacy = timeConstraint(om, dailySHStorageConstraintLegacy, lpFile)
+            om = storageModel(numberOfBuildings, numberOfPeriods)
+            indexed = timeConstraint(om, lambda m: dailySHStorageConstraint(m, timestepsPerPeriod=24), lpFile)
+            resets = len(om.shStorageResetConstr)
+            rows.append({"periods": numberOfPeriods, "resets": resets,
+                         "legacy construction (s)": legacy[0], "indexed construction (s)": indexed[0],
+                         "construction speedup": legacy[0] / indexed[0],
+                         "legacy LP writing (s)": legacy[1], "indexed LP writing (s)": indexed[1]})
+
+    print("{} buildings".format(numberOfBuildings))
+    print(pd.DataFrame(rows).set_index("periods").round(3).to_string())
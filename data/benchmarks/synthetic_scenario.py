@@ -0,0 +1,85 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+basicExamplePath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "excels", "basic_example")
+buildingSheets = ["buses", "grid_connection", "commodity_sources", "solar", "demand", "transformers", "storages"]
+# technology mixes (labels of the transformers, solar technologies and storages available in each building)
+technologyMixes = {
+    "all": ["CHP", "HP", "GWHP", "GasBoiler", "solarCollector", "pv", "electricalStorage", "shStorage", "dhwStorage"],
+    "heatPumps": ["HP", "GWHP", "pv", "electricalStorage", "shStorage", "dhwStorage"],
+    "gas": ["CHP", "GasBoiler", "solarCollector", "shStorage", "dhwStorage"],
+}
+
+
+def writeSyntheticScenario(scenarioPath, numberOfBuildings, seed=0, fullYear=False, solarCollector=True, technologies=None):
+    """
+    Creates a scenario with numberOfBuildings buildings from the first building of the basic example
+    The technologies of every building are the ones of Building1 and the demand profiles are those of the basic example
+    buildings scaled by a random factor
+    :param scenarioPath: directory in which the scenario file (scenario.xlsx) and the profiles are written
+    :param numberOfBuildings: number of buildings
+    :param fullYear: if True the profiles of the basic example (January) are repeated to cover the year 2018
+    :param solarCollector: if False the solar collectors are removed from the scenario
+    :param technologies: labels of the technologies available in the buildings (see technologyMixes), all the
+        technologies of the basic example if None
+    :return: path of the scenario file
+    """
+    rng = np.random.default_rng(seed)
+    demandProfilesPath = os.path.join(scenarioPath, "demand_profiles")
+    os.makedirs(demandProfilesPath, exist_ok=True)
+    if fullYear:
+        weather = _hourlyTimeSeries(pd.read_csv(os.path.join(basicExamplePath, "weather.csv"), delimiter=";"), 8760)
+        index = pd.date_range("2018-01-01 00:00:00", periods=len(weather), freq="60min")
+        weather["time.mm"], weather["time.dd"], weather["time.hh"] = index.month, index.day, index.hour
+        weather.to_csv(os.path.join(scenarioPath, "weather.csv"), sep=";", index=False)
+    else:
+        shutil.copy(os.path.join(basicExamplePath, "weather.csv"), scenarioPath)
+    impact = pd.read_csv(os.path.join(basicExamplePath, "electricity_impact.csv"), delimiter=";", encoding="utf-8-sig")
+    impact = _hourlyTimeSeries(impact, 8760 if fullYear else None)
+    impact.to_csv(os.path.join(scenarioPath, "electricity_impact.csv"), sep=";", index=False)
+
+    data = pd.ExcelFile(os.path.join(basicExamplePath, "scenario.xls"))
+    sheets = {s: data.parse(s) for s in data.sheet_names}
+    for s in buildingSheets:
+        building1 = sheets[s][sheets[s]["building"] == 1]
+        sheets[s] = pd.concat([building1.assign(building=i + 1) for i in range(numberOfBuildings)], ignore_index=True)
+    if not solarCollector:
+        sheets["solar"] = sheets["solar"][sheets["solar"]["label"] != "solarCollector"]
+    if technologies is not None:
+        unknown = set(technologies) - set(technologyMixes["all"])
+        if unknown:
+            raise ValueError("Unknown technologies {}, expected some of {}".format(sorted(unknown), technologyMixes["all"]))
+        for s in ["transformers", "storages"]:
+            sheets[s]["active"] = sheets[s]["active"].where(sheets[s]["label"].isin(technologies), 0)
+        sheets["solar"] = sheets["solar"][sheets["solar"]["label"].isin(technologies)]
+    sheets["profiles"]["path"] = [demandProfilesPath, os.path.join(scenarioPath, "weather.csv")]
+    impact = sheets["commodity_sources"]["CO2 impact"]
+    sheets["commodity_sources"]["CO2 impact"] = impact.where(impact.map(lambda v: not isinstance(v, str)),
+                                                             os.path.join(scenarioPath, "electricity_impact.csv"))
+    scenarioFile = os.path.join(scenarioPath, "scenario.xlsx")
+    with pd.ExcelWriter(scenarioFile, engine="openpyxl") as writer:
+        for s, frame in sheets.items():
+            frame.to_excel(writer, sheet_name=s, index=False)
+
+    profiles = [pd.read_csv(os.path.join(basicExamplePath, "demand_profiles", f), delimiter=";")
+                for f in sorted(os.listdir(os.path.join(basicExamplePath, "demand_profiles")))]
+    profiles = [_hourlyTimeSeries(profile, 8760 if fullYear else None) for profile in profiles]
+    for i in range(numberOfBuildings):
+        profile = profiles[i % len(profiles)].copy()
+        demandColumns = profile.columns.drop("timestamp")
+        profile[demandColumns] = profile[demandColumns] * rng.uniform(0.5, 1.5)
+        profile.to_csv(os.path.join(demandProfilesPath, f"Building{i + 1}.csv"), sep=";", index=False)
+    return scenarioFile
+
+
+def _hourlyTimeSeries(frame, hours=None):
+    # repeats the rows of an hourly time series to obtain the given number of hours (if any), timestamps (if any) are
+    # replaced by ISO timestamps so that they are parsed without inferring the date format (day first in the example)
+    hours = len(frame) if hours is None else hours
+    frame = frame.iloc[np.arange(hours) % len(frame)].reset_index(drop=True)
+    if "timestamp" in frame.columns:
+        frame["timestamp"] = pd.date_range("2018-01-01 00:00:00", periods=hours, freq="60min").strftime("%Y-%m-%d %H:%M")
+    return frame
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from optihood.profiles import readWeatherData
+
+
+def writeSyntheticWeather(filePath, numberOfRows, isoTimestamp=False):
+    # hourly weather data starting 2018-01-01, in the format expected by createNodesData
+    index = pd.date_range("2018-01-01 00:00:00", periods=numberOfRows, freq="60min")
+    rng = np.random.default_rng(0)
+    weather = pd.DataFrame({"time.yy": index.year, "time.mm": index.month, "time.dd": index.day,
+                            "time.hh": index.hour,
+                            "tre200h0": np.round(rng.normal(10, 8, numberOfRows), 1),
+                            "gls": rng.integers(0, 800, numberOfRows),
+                            "str.diffus": rng.integers(0, 300, numberOfRows),
+                            "ground_temp": np.round(rng.normal(10, 2, numberOfRows), 6)})
+    if isoTimestamp:
+        weather.insert(0, "timestamp", index.strftime("%Y-%m-%dT%H:%M:%S"))
+    weather.to_csv(filePath, sep=";", index=False)
+
+
+def readWeatherDataLegacy(weatherDataPath):
+    # row-by-row timestamp construction previously used in createNodesData
+    weatherData = pd.read_csv(weatherDataPath, delimiter=";")
+    for index, row in weatherData.iterrows():
+        time = f"{int(row['time.yy'])}.{int(row['time.mm']):02}.{int(row['time.dd']):02} {int(row['time.hh']):02}:00:00"
+        weatherData.at[index, 'timestamp'] = datetime.strptime(time, "%Y.%m.%d  %H:%M:%S")
+    weatherData.set_index("timestamp", inplace=True)
+    weatherData.index = pd.to_datetime(weatherData.index)
+    return weatherData
+
+
+def timeIt(function, *args, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == '__main__':
+
+    # 1 year hourly, 1 year quarter-hourly equivalent and 20 years hourly
+    numberOfRowsList = [8760, 35040, 175200]
+    compareLegacy = True    # the legacy row-by-row loop is slow (in the order of 20 s for the largest file)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmpDir:
+        for numberOfRows in numberOfRowsList:
+            columnsFile = os.path.join(tmpDir, f"weather_{numberOfRows}.csv")
+            isoFile = os.path.join(tmpDir, f"weather_iso_{numberOfRows}.csv")
+            writeSyntheticWeather(columnsFile, numberOfRows)
+            writeSyntheticWeather(isoFile, numberOfRows, isoTimestamp=True)
+
+            vectorized = readWeatherData(columnsFile)
+            iso = readWeatherData(isoFile)
+            assert vectorized.index.equals(iso.index)
+
+            row = {"rows": numberOfRows,
+                   "read_csv only (s)": timeIt(lambda f: pd.read_csv(f, delimiter=";"), columnsFile),
+                   "time columns (s)": timeIt(readWeatherData, columnsFile),
+                   "ISO timestamp (s)": timeIt(readWeatherData, isoFile)}
+            if compareLegacy:
+                legacy = readWeatherDataLegacy(columnsFile)
+                assert legacy.index.equals(vectorized.index)
+                row["legacy loop (s)"] = timeIt(readWeatherDataLegacy, columnsFile, repeat=1)
+                row["speedup"] = row["legacy loop (s)"] / row["time columns (s)"]
+            results.append(row)
+            print(row)
+
+    print(pd.DataFrame(results).set_index("rows").round(4).to_string())
@@ -57,75 +57,29 @@ if __name__ == '__main__':
         #"cbc": {"tee": False}
     }
 
-    # lists of costs and environmental impacts for different optimizations
-    costsList = []
-    envList = []
-
-    for opt in range(1, numberOfOptimizations+1):
-
-        # First optimization is by Cost alone
-        # Second optimization is by Environmental impact alone
-        # Third optimization onwards are the steps in between Cost-Optimized and Env-Optimized (by epsilon constraint method)
-
-        if opt == 2:        # Environmental optimization
-            optimizationType = "env"
-            envImpactlimit = 1000000
-        else:
-            optimizationType = "costs"
-            if opt == 1:    # Cost optimization
-                envImpactlimit = 1000000
-            else:           # Constrained optimization for multi-objective analysis (steps between Cost-Optimized and Env-Optimized)
-                envImpactlimit = steps[opt - 3]
-
-        print("******************\nOPTIMIZATION " + str(opt) + "\n******************")
-
-        # create an energy network and set the network parameters from an excel file
-        network = EnergyNetwork(timePeriod)
-        network.setFromExcel(os.path.join(inputFilePath, inputfileName), numberOfBuildings, opt=optimizationType)
-
-        # optimize the energy network
-        env, capacitiesTransformers, capacitiesStorages = network.optimize(solver='gurobi',
-                                                                           envImpactlimit=envImpactlimit,
-                                                                           numberOfBuildings=numberOfBuildings,
-                                                                           options=optimizationOptions)
-
-        # print optimization outputs i.e. costs, environmental impact and capacities selected for different components (with investment optimization)
-        network.printInvestedCapacities(capacitiesTransformers, capacitiesStorages)
-        network.printCosts()
-        network.printEnvImpacts()
-
-        # save results
-        resultFileName = "results" + str(numberOfBuildings) + '_' + str(opt) + '.xlsx'    # result filename for each optimization
-
-        if not os.path.exists(resultFilePath):
-            os.makedirs(resultFilePath)
-
-        network.exportToExcel(os.path.join(resultFilePath, resultFileName))
-
-        costs = network.getTotalCosts()
-        meta = network.printMetaresults()
-
-        if opt == 1:  # Cost optimization
-            costsListLast = meta['objective']
-            envListLast = env
-            max_env = env
-        else:
-            if opt == 2:  # Environmental optimization
-                min_env = env
-                costsList.append(costs)
-                # Define steps for multi-objective optimization
-                steps = list(range(int(min_env), int(max_env), int((max_env - min_env) / (numberOfOptimizations - 1))))[1:]
-            else:  # Constrained optimization for multi-objective analysis (steps between Cost-Optimized and Env-Optimized)
-                costsList.append(meta['objective'])
-            envList.append(env)
-
-    costsList.append(costsListLast)
-    envList.append(envListLast)
+    # create an energy network and set the network parameters from an excel file
+    network = EnergyNetwork(timePeriod)
+    network.setFromExcel(os.path.join(inputFilePath, inputfileName), numberOfBuildings, opt="costs")
+
+    # the optimization model is built only once, the optimizations of the pareto front only change the objective
+    # (costs or environmental impacts) and the limit of the environmental impacts (epsilon constraint method)
+    # First optimization is by Cost alone
+    # Second optimization is by Environmental impact alone
+    # Third optimization onwards are the steps in between Cost-Optimized and Env-Optimized
+    paretoRunner = network.createParetoRunner(numberOfBuildings, solver='gurobi', options=optimizationOptions)
+
+    # results of each optimization are saved in resultFilePath (results<optimization>.xlsx)
+    front, capacities, statistics = paretoRunner.run(numberOfOptimizations, resultFilePath=resultFilePath)
+
+    # print optimization outputs i.e. costs, environmental impact and capacities selected for different components (with investment optimization)
+    print(front)
+    print(capacities.T)
+    print(statistics)
 
     # plot pareto front to visualize multi objective optimization results
     figureFilePath = r"..\figures"
     figureFileName = f"Pareto.png"
 
-    plotParetoFront(os.path.join(figureFilePath, figureFileName), costsList, envList)
+    plotParetoFront(os.path.join(figureFilePath, figureFileName), list(front["costs"]), list(front["envImpact"]))
 
 
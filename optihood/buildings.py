@@ -73,7 +73,7 @@ class Building:
         for label in self.__linkBuses:
             self.__busDict[label] = busDictBuilding1[label]
 
-    def addPV(self, data, data_timeseries, opt, dispatchMode):
+    def addPV(self, data, timeSeries, opt, dispatchMode):
         # Create Source objects from table 'commodity sources'
         for i, s in data.iterrows():
             if opt == "costs":
@@ -107,9 +107,9 @@ class Building:
                                        float(s["peripheral_losses"]), float(s["latitude"]), float(s["longitude"]),
                                        float(s["tilt"]), float(s["efficiency"]), s["roof_area"],
                                        s["zenith_angle"], s["azimuth"],
-                                       data_timeseries['gls'],
-                                       data_timeseries['str.diffus'],
-                                       data_timeseries['tre200h0'], float(s["capacity_min"]), float(s["capacity_max"]),
+                                       timeSeries.getSeries('weather/gls'),
+                                       timeSeries.getSeries('weather/str.diffus'),
+                                       timeSeries.getSeries('weather/tre200h0'), float(s["capacity_min"]), float(s["capacity_max"]),
                                        epc, base, env_capa, env_flow, varc, dispatchMode))
 
             self.__envParam[s["label"] + '__' + self.__buildingLabel] = envParam
@@ -119,7 +119,7 @@ class Building:
             self.__technologies.append(
                 [s["to"] + '__' + self.__buildingLabel, s["label"] + '__' + self.__buildingLabel])
 
-    def addSolar(self, data, data_timeseries, opt, mergeLinkBuses, dispatchMode):
+    def addSolar(self, data, timeSeries, opt, mergeLinkBuses, dispatchMode):
         # Create Source objects from table 'commodity sources'
         for i, s in data.iterrows():
             if mergeLinkBuses and s["from"] in self.__linkBuses:
@@ -158,8 +158,8 @@ class Building:
                                                    float(s["longitude"]), float(s["tilt"]), s["roof_area"],
                                                    s["zenith_angle"], float(s["azimuth"]),
                                                    float(s["eta_0"]), float(s["a_1"]), float(s["a_2"]), float(s["temp_collector_inlet"]),
-                                                   float(s["delta_temp_n"]), data_timeseries['gls'], data_timeseries['str.diffus'],
-                                                    data_timeseries['tre200h0'], float(s["capacity_min"]), float(s["capacity_max"]),
+                                                   float(s["delta_temp_n"]), timeSeries.getSeries('weather/gls'), timeSeries.getSeries('weather/str.diffus'),
+                                                    timeSeries.getSeries('weather/tre200h0'), float(s["capacity_min"]), float(s["capacity_max"]),
                                                    epc, base, env_capa, env_flow, varc, dispatchMode)
             self.__nodesList.append(collector.getSolar("source"))
             self.__nodesList.append(collector.getSolar("transformer"))
@@ -199,7 +199,7 @@ class Building:
                                                               outputs={self.__busDict[outputBusLabel]: solph.Flow()},
                                                       conversion_factors={self.__busDict[outputBusLabel]: float(gs["efficiency"])}))
 
-    def addSource(self, data, data_elec, data_cost, opt):
+    def addSource(self, data, timeSeries, opt):
         # Create Source objects from table 'commodity sources'
 
         for i, cs in data.iterrows():
@@ -207,25 +207,25 @@ class Building:
                 sourceLabel = cs["label"]+'__' + self.__buildingLabel
                 outputBusLabel = cs["to"] + '__' + self.__buildingLabel
                 # variable costs = (if opt == "costs") : cs["variable costs"]
-                #                  (if opt == "env") and ('electricity' in cs["label"]): data_elec["impact"]
+                #                  (if opt == "env") and ('electricity' in cs["label"]): electricity impact time series
                 #                  (if opt == "env") and ('electricity' not in cs["label"]): cs["CO2 impact"]
-                # env_per_flow = (if 'electricity' in cs["label"]) : data_elec["impact"]
+                # env_per_flow = (if 'electricity' in cs["label"]) : electricity impact time series
                 #                 (if 'electricity' not in cs["label"]) : cs["CO2 impact"]
-                # self.__envParam is assigned the value data_elec["impact"] or cs["CO2 impact"] depending on whether ('electricity' is in cs["label"]) or not
+                # self.__envParam is assigned the electricity impact time series or cs["CO2 impact"] depending on whether ('electricity' is in cs["label"]) or not
                 if opt == "costs":
                     if 'electricity' in cs["label"]:
-                        varCosts = data_cost["cost"]
+                        varCosts = timeSeries["electricity/cost"]
                     else:
                         varCosts = float(cs["variable costs"])
                 elif 'electricity' in cs["label"]:
-                    varCosts = data_elec["impact"]
+                    varCosts = timeSeries["electricity/impact"]
                 else:
                     varCosts = float(cs["CO2 impact"])
 
                 if 'electricity' in cs["label"]:
-                    envImpactPerFlow = data_elec["impact"]
-                    envParameter = data_elec["impact"]
-                    costParameter = data_cost["cost"]
+                    envImpactPerFlow = timeSeries["electricity/impact"]
+                    envParameter = timeSeries.getSeries("electricity/impact")
+                    costParameter = timeSeries.getSeries("electricity/cost")
                 else:
                     envImpactPerFlow = float(cs["CO2 impact"])
                     envParameter = float(cs["CO2 impact"])
@@ -244,7 +244,7 @@ class Building:
                 self.__envParam[sourceLabel] = envParameter
                 self.__costParam[sourceLabel] = costParameter
 
-    def addSink(self, data, timeseries, buildingModelParams, mergeLinkBuses):
+    def addSink(self, data, timeSeries, mergeLinkBuses):
         # Create Sink objects with fixed time series from 'demand' table
         for i, de in data.iterrows():
             if de["active"]:
@@ -259,9 +259,9 @@ class Building:
                     # create sink
                     self.__nodesList.append(
                         SinkRCModel(
-                            tAmbient=buildingModelParams['tAmb'].values,
-                            totalIrradiationHorizontal=buildingModelParams['IrrH'].values,
-                            heatGainOccupants=buildingModelParams['Qocc'].values,
+                            tAmbient=timeSeries['buildingModel/tAmb'],
+                            totalIrradiationHorizontal=timeSeries['buildingModel/IrrH'],
+                            heatGainOccupants=timeSeries['buildingModel/Qocc'],
                             label=sinkLabel,
                             inputs={self.__busDict[inputBusLabel]: solph.Flow()},
                         )
@@ -270,9 +270,9 @@ class Building:
                     # set static inflow values, if any
                     inflow_args = {"nominal_value": float(de["nominal value"])}
                     # get time series for node and parameter
-                    for col in timeseries.columns.values:
-                        if col == de["label"]:
-                            inflow_args["fix"] = timeseries[col]
+                    demandKey = 'demand/' + self.__buildingLabel + '/' + de["label"]
+                    if demandKey in timeSeries:
+                        inflow_args["fix"] = timeSeries[demandKey]
                     # create sink
                     self.__nodesList.append(
                         solph.Sink(
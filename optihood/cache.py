@@ -0,0 +1,230 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from optihood.profiles import demandProfilesPattern
+
+
+# version of the format of the entries, part of their key so that entries of another format are not read
+_cacheFormat = 2
+
+
+class ScenarioCache:
+    """
+    On-disk cache of the prepared nodesData dictionary (see EnergyNetworkClass.setFromExcel)
+
+    Entries are addressed by a hash of the content of the scenario file, the number of buildings, the clusterSize
+    dictionary and the additional sheets parsed. Each entry stores the hashes of the profile files referenced by the
+    scenario (demand profiles, weather data, electricity cost and impact) and is invalidated as soon as one of them
+    changes. The paths of the profiles are recorded as written in the scenario and resolved again when an entry is
+    loaded, so that relative paths resolving to other files (e.g. from another working directory) invalidate the entry.
+    Numeric frames (time series) are stored as NPZ, the other frames (scenario sheets of mixed types) and the metadata
+    as JSON, no entry is unpickled.
+
+    Parameters
+    ----------
+    cacheDir : directory in which the cache entries are saved
+    """
+
+    def __init__(self, cacheDir):
+        self.__cacheDir = cacheDir
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        if not os.path.exists(cacheDir):
+            os.makedirs(cacheDir)
+
+    def getStatistics(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hitRate": self.hits / lookups if lookups else np.nan}
+
+    def clear(self):
+        for entry in os.listdir(self.__cacheDir):
+            shutil.rmtree(os.path.join(self.__cacheDir, entry), ignore_errors=True)
+
+    def load(self, filePath, numberOfBuildings, clusterSize={}, sheets=(), period=None,
+             namePattern=demandProfilesPattern):
+        """returns the cached nodesData or None if there is no valid entry
+        period: length of the representative periods of clusterSize, namePattern: pattern of the names of the demand
+        profile files (see readDemandProfiles)"""
+        entryPath = self._entryPath(filePath, numberOfBuildings, clusterSize, sheets, period, namePattern)
+        manifestPath = os.path.join(entryPath, "manifest.json")
+        if not os.path.exists(manifestPath):
+            self.misses += 1
+            logging.info("Scenario cache miss for {} ({})".format(filePath, self._statisticsString()))
+            return None
+        with open(manifestPath) as f:
+            manifest = json.load(f)
+        for path, digest in manifest["files"].items():
+            if not os.path.isfile(path) or _fileHash(path) != digest:
+                shutil.rmtree(entryPath, ignore_errors=True)
+                self.misses += 1
+                self.invalidations += 1
+                logging.info("Scenario cache entry invalidated, {} ({}) has changed ({})".format(
+                    path, os.path.abspath(path), self._statisticsString()))
+                return None
+        for path, content in manifest["directories"].items():
+            if not os.path.isdir(path) or sorted(os.listdir(path)) != content:
+                shutil.rmtree(entryPath, ignore_errors=True)
+                self.misses += 1
+                self.invalidations += 1
+                logging.info("Scenario cache entry invalidated, content of {} ({}) has changed ({})".format(
+                    path, os.path.abspath(path), self._statisticsString()))
+                return None
+        nodesData = {}
+        for key, frameInfo in manifest["frames"].items():
+            if isinstance(frameInfo, dict) and "file" not in frameInfo:   # dictionary of frames (demandProfiles)
+                nodesData[key] = {int(i): _readFrame(entryPath, info) for i, info in frameInfo.items()}
+            else:
+                nodesData[key] = _readFrame(entryPath, frameInfo)
+        self.hits += 1
+        logging.info("Scenario cache hit for {} ({})".format(filePath, self._statisticsString()))
+        return nodesData
+
+    def save(self, nodesData, filePath, numberOfBuildings, clusterSize={}, sheets=(), period=None,
+             namePattern=demandProfilesPattern):
+        entryPath = self._entryPath(filePath, numberOfBuildings, clusterSize, sheets, period, namePattern)
+        manifest = {"scenario": os.path.abspath(filePath),
+                    "numberOfBuildings": numberOfBuildings,
+                    "clusterSize": list(clusterSize.items()),
+                    "period": period,
+                    "sheets": list(sheets),
+                    "files": {path: _fileHash(path) for path in _referencedFiles(nodesData)},
+                    "directories": {path: sorted(os.listdir(path)) for path in _referencedDirectories(nodesData)},
+                    "frames": {}}
+        # write into a temporary directory first so that an interrupted save never leaves a partial entry
+        tmpPath = tempfile.mkdtemp(dir=self.__cacheDir)
+        try:
+            for key, value in nodesData.items():
+                if isinstance(value, dict):
+                    manifest["frames"][key] = {str(i): _writeFrame(tmpPath, f"{key}_{i}", frame) for i, frame in value.items()}
+                else:
+                    manifest["frames"][key] = _writeFrame(tmpPath, key, value)
+            with open(os.path.join(tmpPath, "manifest.json"), "w") as f:
+                json.dump(manifest, f, indent=1)
+            shutil.rmtree(entryPath, ignore_errors=True)
+            os.replace(tmpPath, entryPath)
+        except Exception:
+            shutil.rmtree(tmpPath, ignore_errors=True)
+            raise
+        logging.info("Scenario data of {} saved in the cache".format(filePath))
+
+    def _entryPath(self, filePath, numberOfBuildings, clusterSize, sheets, period=None, namePattern=demandProfilesPattern):
+        key = hashlib.sha256()
+        key.update(_fileHash(filePath).encode())
+        key.update(json.dumps([_cacheFormat, numberOfBuildings, list(clusterSize.items()), list(sheets), period,
+                               namePattern]).encode())
+        return os.path.join(self.__cacheDir, key.hexdigest())
+
+    def _statisticsString(self):
+        return "hits: {hits}, misses: {misses}, invalidations: {invalidations}".format(**self.getStatistics())
+
+
+def _fileHash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _referencedDirectories(nodesData):
+    """folder of the demand profiles read by createNodesData for this scenario, as written in the scenario (relative
+    paths are resolved against the working directory when the entry is loaded)"""
+    profiles = nodesData["profiles"]
+    demandProfilesPath = profiles.loc[profiles["name"] == "demand_profiles", "path"].iloc[0]
+    return [demandProfilesPath] if os.path.isdir(demandProfilesPath) else []
+
+
+def _referencedFiles(nodesData):
+    """list of the profile files read by createNodesData for this scenario, as written in the scenario"""
+    files = []
+    profiles = nodesData["profiles"]
+    for demandProfilesPath in _referencedDirectories(nodesData):
+        files.extend(os.path.join(demandProfilesPath, f) for f in sorted(os.listdir(demandProfilesPath)))
+    files.extend(profiles.loc[profiles["name"] == "weather_data", "path"].tolist())
+    electricitySource = nodesData["commodity_sources"]["label"] == "electricityResource"
+    for col in ["CO2 impact", "variable costs"]:
+        files.extend(v for v in nodesData["commodity_sources"].loc[electricitySource, col].unique() if isinstance(v, str))
+    if "Qocc" in nodesData["building_model"]:
+        files.append(r"..\excels\Internal_gains.csv")
+    return [f for f in files if os.path.isfile(f)]
+
+
+def _writeFrame(path, name, frame):
+    numeric = all(np.issubdtype(dtype, np.number) for dtype in frame.dtypes) and not isinstance(frame.columns, pd.MultiIndex)
+    if not numeric or frame.index.dtype == object:
+        return _writeJsonFrame(path, name, frame)
+    fileName = name + ".npz"
+    isDatetime = isinstance(frame.index, pd.DatetimeIndex)
+    arrays = {f"c{i}": frame.iloc[:, i].to_numpy() for i in range(frame.shape[1])}
+    arrays["index"] = frame.index.asi8 if isDatetime else frame.index.to_numpy()
+    np.savez(os.path.join(path, fileName), **arrays)
+    return {"file": fileName, "columns": [str(c) for c in frame.columns], "indexName": frame.index.name,
+            "datetimeIndex": isDatetime, "rangeIndex": isinstance(frame.index, pd.RangeIndex)}
+
+
+def _writeJsonFrame(path, name, frame):
+    """writes a frame of mixed types (e.g. a scenario sheet) as JSON, the dtypes of the columns being restored when the
+    frame is read, the datetimes are stored as integers (ns)"""
+    fileName = name + ".json"
+    isDatetime = isinstance(frame.index, pd.DatetimeIndex)
+    dtypes = [str(dtype) for dtype in frame.dtypes]
+    columns = [frame.iloc[:, i].astype("int64") if dtype.startswith("datetime64") else frame.iloc[:, i]
+               for i, dtype in enumerate(dtypes)]
+    content = {"columns": [list(c) if isinstance(c, tuple) else c for c in frame.columns],
+               "multiColumns": isinstance(frame.columns, pd.MultiIndex), "dtypes": dtypes,
+               "index": (frame.index.asi8 if isDatetime else frame.index).tolist(), "indexName": frame.index.name,
+               "datetimeIndex": isDatetime, "data": [c.tolist() for c in columns]}
+    with open(os.path.join(path, fileName), "w") as f:
+        json.dump(content, f, default=_jsonValue)
+    return {"file": fileName}
+
+
+def _jsonValue(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    raise TypeError("The value {} of type {} cannot be saved in the scenario cache".format(value, type(value)))
+
+
+def _readFrame(path, info):
+    filePath = os.path.join(path, info["file"])
+    if filePath.endswith(".json"):
+        return _readJsonFrame(filePath)
+    with np.load(filePath) as arrays:
+        if info["datetimeIndex"]:
+            index = pd.DatetimeIndex(arrays["index"], name=info["indexName"])
+        elif info["rangeIndex"]:
+            index = pd.RangeIndex(len(arrays["index"]), name=info["indexName"])
+        else:
+            index = pd.Index(arrays["index"], name=info["indexName"])
+        return pd.DataFrame({c: arrays[f"c{i}"] for i, c in enumerate(info["columns"])}, index=index)
+
+
+def _readJsonFrame(filePath):
+    with open(filePath) as f:
+        content = json.load(f)
+    if content["datetimeIndex"]:
+        index = pd.DatetimeIndex(np.array(content["index"], dtype="int64"), name=content["indexName"])
+    else:
+        index = pd.Index(content["index"], name=content["indexName"], dtype=object if not content["index"] else None)
+    columns = pd.MultiIndex.from_tuples([tuple(c) for c in content["columns"]]) if content["multiColumns"] \
+        else content["columns"]
+    frame = pd.DataFrame({i: pd.Series(values, index=index, dtype=object if dtype == "object" else None)
+                          for i, (values, dtype) in enumerate(zip(content["data"], content["dtypes"]))}, index=index)
+    for i, dtype in enumerate(content["dtypes"]):
+        if dtype != "object" and str(frame[i].dtype) != dtype:
+            frame[i] = frame[i].astype(dtype)
+    frame.columns = columns
+    return frame
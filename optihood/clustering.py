@@ -0,0 +1,348 @@
+import heapq
+import logging
+
+import numpy as np
+import pandas as pd
+from scipy.cluster.hierarchy import linkage, cut_tree
+
+# columns of the weather data used to select the representative days
+clusteringWeatherColumns = ["tre200h0", "gls"]
+clusteringMethods = ["kmedoids", "hierarchical"]
+
+
+def scenarioTimeSeries(nodesData, numberOfBuildings):
+    """
+    time series of the scenario data (see EnergyNetworkClass.createNodesData) used to aggregate the time: demand
+    profiles of each building, electricity cost and impact and weather data (columns clusteringWeatherColumns)
+    :return: dataframe indexed by the timestamps of the demand profiles
+    """
+    index = nodesData["demandProfiles"][1].index
+    frames = [nodesData["demandProfiles"][i].add_suffix("__Building{}".format(i))
+              for i in range(1, numberOfBuildings + 1)]
+    frames.append(nodesData["electricity_cost"][["cost"]].reindex(index))
+    frames.append(nodesData["electricity_impact"][["impact"]].reindex(index))
+    weatherData = nodesData["weather_data"][clusteringWeatherColumns]
+    if len(weatherData) != len(index):
+        raise ValueError("The weather data ({} timesteps) and the demand profiles ({} timesteps) should have the "
+                         "same length".format(len(weatherData), len(index)))
+    # the weather data can be of another year, they are aligned with the demand profiles by position
+    frames.append(pd.DataFrame(weatherData.to_numpy(), index=index, columns=clusteringWeatherColumns))
+    return pd.concat(frames, axis=1)
+
+
+def _normalize(values, names, weights):
+    """min-max normalization of the values of each series (last axis), multiplied by the weights of the series"""
+    minimum = values.min(axis=tuple(range(values.ndim - 1)))
+    span = values.max(axis=tuple(range(values.ndim - 1))) - minimum
+    scale = np.array([1.0 if weights is None else weights.get(n, 1.0) for n in names])
+    return (values - minimum) / np.where(span > 0, span, 1) * scale
+
+
+class TypicalDays:
+    """
+    Selection of the representative days (clusterSize of setFromExcel and optimize) from the time series of a scenario
+
+    Each day (or period of any length, see periodLength) is described by the concatenation of the normalized values of
+    all its timesteps for every time series (min-max normalization over the whole time series, so that each series has
+    the same weight). The periods are clustered using k-medoids or hierarchical clustering (Ward linkage) and each
+    cluster is represented by its medoid, which is an actual period of the time series. The distance matrix (and the
+    linkage) are computed only once, so that numbers of clusters can be compared at low cost (see sweep).
+    """
+
+    def __init__(self, series, weights=None, periodLength="1D"):
+        """
+        :param series: dataframe of the time series indexed by timestamp (one column per series), of any resolution
+        :param weights: dictionary of the weights of the series indexed by the column name (1 by default)
+        :param periodLength: length of the representative periods (e.g. "1D" for days, "7D" for weeks), the periods
+               start at midnight of the first day of the time series, an incomplete last period is ignored
+        """
+        series = series.sort_index()
+        origin = series.index[0].normalize()
+        periods = (series.index - origin) // pd.Timedelta(periodLength)
+        stepsPerPeriod = pd.Series(1, index=periods).groupby(level=0).size()
+        if stepsPerPeriod.iloc[-1] < stepsPerPeriod.iloc[0]:
+            logging.warning("The last period ({} timesteps) is incomplete and ignored".format(stepsPerPeriod.iloc[-1]))
+            stepsPerPeriod = stepsPerPeriod.iloc[:-1]
+            series = series.iloc[:np.searchsorted(periods, stepsPerPeriod.index[-1], side="right")]
+        if stepsPerPeriod.nunique() != 1:
+            raise ValueError("All the periods of the time series should have the same number of timesteps, found {}"
+                             .format(sorted(stepsPerPeriod.unique())))
+        self.periods = origin + stepsPerPeriod.index * pd.Timedelta(periodLength)
+        self.names = list(series.columns)
+        # values of each period: (periods, timesteps of a period, series)
+        self.values = series.to_numpy(dtype=np.float64).reshape(len(self.periods), stepsPerPeriod.iloc[0],
+                                                                len(self.names))
+        self._features = _normalize(self.values, self.names, weights).reshape(len(self.periods), -1)
+        squared = (self._features ** 2).sum(axis=1)
+        self._distances = np.sqrt(np.maximum(squared[:, None] + squared[None, :]
+                                             - 2 * self._features @ self._features.T, 0))
+        self._linkage = None
+        logging.info("Typical period selection from {} periods of {} timesteps and {} time series".format(
+            len(self.periods), stepsPerPeriod.iloc[0], len(self.names)))
+
+    @classmethod
+    def fromNodesData(cls, nodesData, numberOfBuildings, weights=None, periodLength="1D"):
+        """time series of the scenario data (see scenarioTimeSeries)"""
+        return cls(scenarioTimeSeries(nodesData, numberOfBuildings), weights, periodLength)
+
+    def cluster(self, numberOfClusters, method="kmedoids", peakSeries=None):
+        """
+        clusters the periods and returns the representative periods
+        :param numberOfClusters: number of representative periods
+        :param method: "kmedoids" or "hierarchical"
+        :param peakSeries: names of the time series whose peak period is added as a representative period of itself
+               (weight 1) if it is not a medoid, e.g. so that the capacities optimized on the representative periods
+               cover the peak demands. A name without building suffix (e.g. "spaceHeatingDemand") selects this series
+               of every building
+        :return: clusterSize: dictionary of the number of periods represented by each representative period indexed by
+                 its first timestamp (YYYY-MM-DD if the periods start at midnight), in chronological order,
+                 report: reconstruction error of each time series (see _errorReport)
+        """
+        medoids, labels = self._labels(numberOfClusters, method)
+        if peakSeries:
+            medoids, labels = self._addPeakPeriods(medoids, labels, peakSeries)
+        counts = np.bincount(labels, minlength=len(medoids))
+        order = np.argsort(medoids)
+        dateFormat = "%Y-%m-%d" if (self.periods == self.periods.normalize()).all() else "%Y-%m-%d %H:%M"
+        clusterSize = {self.periods[medoids[c]].strftime(dateFormat): int(counts[c]) for c in order}
+        report = self._errorReport(medoids, labels)
+        logging.info("{} representative periods selected with {}, mean normalized RMSE: {:.4f}".format(
+            len(medoids), method, report["rmse"].mean()))
+        return clusterSize, report
+
+    def sweep(self, clusterRange, method="kmedoids"):
+        """
+        reconstruction error for several numbers of clusters
+        :param clusterRange: numbers of clusters (e.g. range(4, 51))
+        :return: dataframe indexed by the number of clusters with the mean normalized RMSE and the largest absolute
+                 relative errors on the totals and on the peaks of the time series
+        """
+        summary = {}
+        for k in clusterRange:
+            report = self._errorReport(*self._labels(k, method))
+            summary[k] = {"rmse": report["rmse"].mean(), "totalError": report["totalError"].abs().max(),
+                          "peakError": report["peakError"].abs().max()}
+        return pd.DataFrame.from_dict(summary, orient="index").rename_axis("numberOfClusters")
+
+    def periodSequence(self, clusterSize):
+        """
+        representative period of each period of the time series, in chronological order, e.g. for the inter-period
+        storage linking (periodSequence of EnergyNetworkClass.optimize)
+        :param clusterSize: representative periods (see cluster), each period is assigned to the nearest of them
+        :return: list of the keys of clusterSize
+        """
+        keys = list(clusterSize)
+        medoids = self.periods.get_indexer(pd.DatetimeIndex([pd.Timestamp(k) for k in keys]))
+        if (medoids < 0).any():
+            raise ValueError("The representative periods {} are not periods of the time series".format(
+                [k for k, m in zip(keys, medoids) if m < 0]))
+        labels = np.argmin(self._distances[:, medoids], axis=1)
+        labels[medoids] = np.arange(len(keys))
+        return [keys[c] for c in labels]
+
+    def _addPeakPeriods(self, medoids, labels, peakSeries):
+        """adds the periods of the peaks of the series peakSeries (see cluster) to the medoids, as clusters of one
+        period"""
+        columns = [i for i, n in enumerate(self.names) if n in peakSeries or n.split("__")[0] in peakSeries]
+        if not columns:
+            raise ValueError("None of the time series {} found, available time series: {}".format(peakSeries,
+                                                                                                   self.names))
+        peaks = np.unique(self.values[:, :, columns].max(axis=1).argmax(axis=0))
+        peaks = peaks[~np.isin(peaks, medoids)]
+        labels = labels.copy()
+        labels[peaks] = len(medoids) + np.arange(len(peaks))
+        logging.info("{} peak periods added to the representative periods".format(len(peaks)))
+        return np.concatenate([medoids, peaks]), labels
+
+    def _labels(self, numberOfClusters, method):
+        if not 0 < numberOfClusters <= len(self.periods):
+            raise ValueError("The number of clusters should be between 1 and the number of periods ({})".format(
+                len(self.periods)))
+        if method == "kmedoids":
+            return _kMedoids(self._distances, numberOfClusters)
+        if method == "hierarchical":
+            if self._linkage is None:
+                self._linkage = linkage(self._features, method="ward")
+            # cut of the sequence of merges (a cut by distance threshold gives fewer clusters if merges are tied)
+            labels = cut_tree(self._linkage, n_clusters=numberOfClusters).ravel()
+            if labels.max() + 1 != numberOfClusters:
+                raise ValueError("The hierarchical clustering gives {} clusters instead of {}, use fewer clusters or "
+                                 "the kmedoids method".format(labels.max() + 1, numberOfClusters))
+            medoids = _medoids(self._distances, labels)
+            # each period is assigned to the nearest medoid (as with k-medoids, see periodSequence)
+            labels = np.argmin(self._distances[:, medoids], axis=1)
+            labels[medoids] = np.arange(len(medoids))
+            return medoids, labels
+        raise ValueError("Unknown clustering method {}, available methods: {}".format(method, clusteringMethods))
+
+    def _errorReport(self, medoids, labels):
+        """
+        reconstruction error of each time series, each period being replaced by the medoid of its cluster
+        rmse: root mean square error of the normalized values, totalError and peakError: relative error on the total
+        and on the maximum of the series over the period
+        """
+        reconstructed = self.values[medoids[labels]]
+        features = self._features.reshape(self.values.shape)
+        rmse = np.sqrt(((features[medoids[labels]] - features) ** 2).mean(axis=(0, 1)))
+        total, reconstructedTotal = self.values.sum(axis=(0, 1)), reconstructed.sum(axis=(0, 1))
+        peak, reconstructedPeak = self.values.max(axis=(0, 1)), reconstructed.max(axis=(0, 1))
+        return pd.DataFrame({"rmse": rmse, "totalError": _relativeError(reconstructedTotal, total),
+                             "peakError": _relativeError(reconstructedPeak, peak)}, index=self.names)
+
+
+class TimeSegments:
+    """
+    Segmentation of the time series into segments of consecutive timesteps of variable length
+
+    Consecutive timesteps with similar normalized values of all the time series (same normalization as TypicalDays)
+    are merged bottom-up, the pair of adjacent segments whose merge increases the least the sum of squared deviations
+    from the segment means (Ward criterion) being merged first. The merges are computed once down to a single segment,
+    the segmentation for any number of segments is then obtained at low cost (see sweep). Each segment is represented
+    by the mean of the time series over its timesteps and weighted by its duration (timeincrement of the energy
+    network, see segment).
+    """
+
+    def __init__(self, series, weights=None):
+        """
+        :param series: dataframe of the time series indexed by timestamp (one column per series), with a regular index
+        :param weights: dictionary of the weights of the series indexed by the column name (1 by default)
+        """
+        series = series.sort_index()
+        self.index = series.index
+        self.names = list(series.columns)
+        self.values = series.to_numpy(dtype=np.float64)
+        self.hoursPerTimestep = (self.index[1] - self.index[0]) / pd.Timedelta(hours=1)
+        self._features = _normalize(self.values, self.names, weights)
+        self._mergeRank = None
+
+    @classmethod
+    def fromNodesData(cls, nodesData, numberOfBuildings, weights=None):
+        """time series of the scenario data (see scenarioTimeSeries)"""
+        return cls(scenarioTimeSeries(nodesData, numberOfBuildings), weights)
+
+    def segment(self, numberOfSegments):
+        """
+        :param numberOfSegments: number of segments
+        :return: timeindex: first timestamps of the segments, timeincrement: duration of the segments (hours), to be
+                 passed to the energy network (EnergyNetworkClass(timeindex, timeincrement=timeincrement)),
+                 report: reconstruction error of each time series (see _errorReport)
+        """
+        starts = self._starts(numberOfSegments)
+        lengths = np.diff(np.append(starts, len(self.index)))
+        report = self._errorReport(starts, lengths)
+        logging.info("{} timesteps aggregated into {} segments, mean normalized RMSE: {:.4f}".format(
+            len(self.index), len(starts), report["rmse"].mean()))
+        return self.index[starts], list(lengths * self.hoursPerTimestep), report
+
+    def sweep(self, segmentRange):
+        """
+        reconstruction error for several numbers of segments
+        :param segmentRange: numbers of segments (e.g. range(500, 3001, 500))
+        :return: dataframe indexed by the number of segments with the mean normalized RMSE and the largest absolute
+                 relative error on the peaks of the time series
+        """
+        summary = {}
+        for k in segmentRange:
+            starts = self._starts(k)
+            report = self._errorReport(starts, np.diff(np.append(starts, len(self.index))))
+            summary[k] = {"rmse": report["rmse"].mean(), "peakError": report["peakError"].abs().max()}
+        return pd.DataFrame.from_dict(summary, orient="index").rename_axis("numberOfSegments")
+
+    def _starts(self, numberOfSegments):
+        if not 0 < numberOfSegments <= len(self.index):
+            raise ValueError("The number of segments should be between 1 and the number of timesteps ({})"
+                             .format(len(self.index)))
+        if self._mergeRank is None:
+            self._mergeRank = _mergeRank(self._features)
+        # the first timestep of a segment is removed by the merge of the segment with the previous one
+        return np.flatnonzero(self._mergeRank >= len(self.index) - numberOfSegments)
+
+    def _errorReport(self, starts, lengths):
+        """
+        reconstruction error of each time series, each timestep being replaced by the mean of its segment
+        rmse: root mean square error of the normalized values, totalError and peakError: relative error on the total
+        and on the maximum of the series over the period
+        """
+        segmentOf = np.repeat(np.arange(len(starts)), lengths)
+        reconstructed = (np.add.reduceat(self.values, starts) / lengths[:, None])[segmentOf]
+        features = (np.add.reduceat(self._features, starts) / lengths[:, None])[segmentOf]
+        rmse = np.sqrt(((features - self._features) ** 2).mean(axis=0))
+        total, peak = self.values.sum(axis=0), self.values.max(axis=0)
+        return pd.DataFrame({"rmse": rmse, "totalError": _relativeError(reconstructed.sum(axis=0), total),
+                             "peakError": _relativeError(reconstructed.max(axis=0), peak)}, index=self.names)
+
+
+def _mergeRank(features):
+    """
+    merges the adjacent segments bottom-up (Ward criterion) down to a single segment
+    :return: rank of the merge removing each timestep as the first timestep of a segment (the first timestep is never
+             removed, its rank is the number of timesteps)
+    """
+    n = len(features)
+    sums = features.copy()
+    counts = np.ones(n)
+    following = list(range(1, n + 1))      # first timestep of the next segment (n for the last segment)
+    previous = list(range(-1, n - 1))
+    version = [0] * n
+
+    def _cost(a, b):
+        difference = sums[a] / counts[a] - sums[b] / counts[b]
+        return counts[a] * counts[b] / (counts[a] + counts[b]) * difference @ difference
+
+    heap = [(_cost(a, a + 1), a, 0, 0) for a in range(n - 1)]
+    heapq.heapify(heap)
+    rank = np.full(n, n)
+    for step in range(n - 1):
+        while True:
+            cost, a, versionA, versionB = heapq.heappop(heap)
+            b = following[a]
+            if b < n and version[a] == versionA and version[b] == versionB and rank[a] == n:
+                break
+        # segment b is merged into segment a
+        rank[b] = step
+        sums[a] += sums[b]
+        counts[a] += counts[b]
+        following[a] = following[b]
+        if following[a] < n:
+            previous[following[a]] = a
+        version[a] += 1
+        if previous[a] >= 0:
+            heapq.heappush(heap, (_cost(previous[a], a), previous[a], version[previous[a]], version[a]))
+        if following[a] < n:
+            heapq.heappush(heap, (_cost(a, following[a]), a, version[a], version[following[a]]))
+    return rank
+
+
+def _relativeError(value, reference):
+    return np.divide(value - reference, np.abs(reference), out=np.zeros_like(reference), where=reference != 0)
+
+
+def _medoids(distances, labels):
+    """medoid of each cluster: the member with the smallest sum of distances to the other members"""
+    members = labels[None, :] == np.arange(labels.max() + 1)[:, None]
+    cost = np.where(members.T, distances @ members.T, np.inf)
+    return np.argmin(cost, axis=0)
+
+
+def _kMedoids(distances, numberOfClusters, maxIterations=100):
+    """k-medoids clustering (greedy initialization of PAM followed by alternate assignments and medoid updates)
+    :return: medoids: indices of the medoids, labels: cluster of each element"""
+    medoids = [int(np.argmin(distances.sum(axis=1)))]
+    nearest = distances[medoids[0]].copy()
+    for _ in range(1, numberOfClusters):
+        gain = np.maximum(nearest[None, :] - distances, 0).sum(axis=1)
+        gain[medoids] = -1
+        medoids.append(int(np.argmax(gain)))
+        nearest = np.minimum(nearest, distances[medoids[-1]])
+    medoids = np.array(medoids)
+    for _ in range(maxIterations):
+        labels = np.argmin(distances[:, medoids], axis=1)
+        labels[medoids] = np.arange(numberOfClusters)    # identical days: each medoid stays in its own cluster
+        newMedoids = _medoids(distances, labels)
+        if np.array_equal(newMedoids, medoids):
+            break
+        medoids = newMedoids
+    else:
+        labels = np.argmin(distances[:, medoids], axis=1)
+        labels[medoids] = np.arange(numberOfClusters)
+    return medoids, labels
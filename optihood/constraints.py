@@ -1,32 +1,176 @@
+from contextlib import contextmanager
+
 from pyomo import environ as pyo
-from oemof.solph.plumbing import sequence
+from pyomo.core.expr.numeric_expr import LinearExpression
 from math import pi
+import numpy as np
+import re
+from optihood.flow_registry import getFlowRegistry
 
-def dailySHStorageConstraint(om):
+def dailySHStorageConstraint(om, timestepsPerPeriod=24, periodsPerReset=2):
     """
-    Function to limit the SH storage capacity to 2 days
+    Function to limit the SH storage capacity to 2 days: the content of the SH storages is set to zero at every
+    boundary between groups of periodsPerReset representative periods, using a single indexed constraint
     :param om: optimization model
+    :param timestepsPerPeriod: number of timesteps of a representative period (cluster)
+    :param periodsPerReset: number of representative periods between two resets of the storage content
     :return: om: optimization model
     """
-    for s in om.NODES:
-        if "shStorage" in s.label:
-            constr = s.label.replace("__Building","") + "_constraint_"
-            for t in om.TIMESTEPS:
-                if t % 48 == 0 and t!=0:
-                    setattr(
-                        om,
-                        constr + str(t),
-                        pyo.Constraint(expr=(om.GenericInvestmentStorageBlock.storage_content[s, t] == 0)),
-                    )
+    registry = getFlowRegistry(om)
+    storages = [s for b in [None] + registry.getBuildings() for s in registry.getStorages("shStorage", b)]
+    resetLength = timestepsPerPeriod * periodsPerReset
+    boundaries = [t for t in om.TIMESTEPS if t % resetLength == 0 and t != 0]
+
+    om.SH_STORAGE_RESETS = pyo.Set(initialize=[(s, t) for s in storages for t in boundaries], dimen=2, ordered=True)
+
+    def _shStorageResetRule(model, s, t):
+        return model.GenericInvestmentStorageBlock.storage_content[s, t] == 0
 
+    om.shStorageResetConstr = pyo.Constraint(om.SH_STORAGE_RESETS, rule=_shStorageResetRule)
     return om
 
+def interPeriodStorageConstraint(om, timestepsPerPeriod, periodSequence):
+    """
+    Function to link the content of the storages across the representative periods following the sequence of the
+    original periods (e.g. the days of the year), based on: Kotzur et al. (2018), Time series aggregation for energy
+    system design: Modeling seasonal storage, Applied Energy 213.
+    The content of the storages within a representative period is relative to a free start content of the period. An
+    inter-period content is defined at the boundaries of the original periods and evolves with the self-discharge and
+    the net charge of the representative period of each original period. The inter-period content plus the lowest
+    (highest) relative content of the representative period must be above zero (below the capacity). The inter-period
+    content is cyclic over the original periods and starts at the initial storage level (if any).
+    :param om: optimization model
+    :param timestepsPerPeriod: number of timesteps of a representative period (cluster)
+    :param periodSequence: index of the representative period (in the order of the time index) of each original period
+    :return: om: optimization model
+    """
+    block = om.GenericInvestmentStorageBlock
+    storages = list(block.INVESTSTORAGES)
+    numberOfClusters = len(om.TIMESTEPS) // timestepsPerPeriod
+    periods = {k: list(range(k * timestepsPerPeriod, (k + 1) * timestepsPerPeriod)) for k in range(numberOfClusters)}
+
+    # decay of a content from the start of its representative period to the end of each timestep (self-discharge)
+    decay = {}
+    for n in storages:
+        for timesteps in periods.values():
+            factor = 1
+            for t in timesteps:
+                factor *= (1 - n.loss_rate[t]) ** om.timeincrement[t]
+                decay[n, t] = factor
+
+    # the content at the start of each representative period is free, the original storage balances linking the
+    # periods of the time index (and their balance over the time index) are replaced
+    for n in storages:
+        block.balance_first[n].deactivate()
+        for k in range(1, numberOfClusters):
+            block.balance[n, periods[k][0]].deactivate()
+        if n in block.INVESTSTORAGES_BALANCED:
+            block.balanced_cstr[n].deactivate()
+
+    # the variables are not indexed by timesteps and are defined on a block detached while the results are processed
+    # (see detachedInterPeriodStorage)
+    linking = om.interPeriodStorage = pyo.Block()
+    linking.STORAGE_CLUSTERS = pyo.Set(initialize=[(n, k) for n in storages for k in range(numberOfClusters)], dimen=2,
+                                       ordered=True)
+    linking.STORAGE_PERIODS = pyo.Set(initialize=[(n, p) for n in storages for p in range(len(periodSequence) + 1)],
+                                      dimen=2, ordered=True)
+    linking.storagePeriodStart = pyo.Var(linking.STORAGE_CLUSTERS, within=pyo.NonNegativeReals)
+    linking.storageIntraMin = pyo.Var(linking.STORAGE_CLUSTERS, within=pyo.Reals)
+    linking.storageIntraMax = pyo.Var(linking.STORAGE_CLUSTERS, within=pyo.Reals)
+    linking.storageInterContent = pyo.Var(linking.STORAGE_PERIODS, within=pyo.NonNegativeReals)
+
+    def _capacity(n):
+        return n.investment.existing + block.invest[n]
+
+    def _relativeContent(n, k, t):
+        return block.storage_content[n, t] - linking.storagePeriodStart[n, k] * decay[n, t]
+
+    def _periodStartBalanceRule(linking, n, k):
+        t = periods[k][0]
+        i, o = next(iter(n.inputs)), next(iter(n.outputs))
+        return block.storage_content[n, t] == (
+            linking.storagePeriodStart[n, k] * (1 - n.loss_rate[t]) ** om.timeincrement[t]
+            - n.fixed_losses_relative[t] * _capacity(n) * om.timeincrement[t]
+            - n.fixed_losses_absolute[t] * om.timeincrement[t]
+            + om.flow[i, n, t] * n.inflow_conversion_factor[t] * om.timeincrement[t]
+            - om.flow[n, o, t] / n.outflow_conversion_factor[t] * om.timeincrement[t])
+
+    def _periodStartLimitRule(linking, n, k):
+        return linking.storagePeriodStart[n, k] <= _capacity(n)
+
+    linking.storagePeriodStartBalanceConstr = pyo.Constraint(linking.STORAGE_CLUSTERS, rule=_periodStartBalanceRule)
+    linking.storagePeriodStartLimitConstr = pyo.Constraint(linking.STORAGE_CLUSTERS, rule=_periodStartLimitRule)
+
+    linking.STORAGE_CLUSTER_TIMESTEPS = pyo.Set(
+        initialize=[(n, k, t) for n, k in linking.STORAGE_CLUSTERS for t in periods[k]], dimen=3, ordered=True)
+
+    def _intraMinRule(linking, n, k, t):
+        return linking.storageIntraMin[n, k] <= _relativeContent(n, k, t)
+
+    def _intraMaxRule(linking, n, k, t):
+        return linking.storageIntraMax[n, k] >= _relativeContent(n, k, t)
+
+    linking.storageIntraMinConstr = pyo.Constraint(linking.STORAGE_CLUSTER_TIMESTEPS, rule=_intraMinRule)
+    linking.storageIntraMaxConstr = pyo.Constraint(linking.STORAGE_CLUSTER_TIMESTEPS, rule=_intraMaxRule)
+
+    linking.STORAGE_SEQUENCE = pyo.Set(initialize=[(n, p) for n in storages for p in range(len(periodSequence))],
+                                       dimen=2, ordered=True)
+
+    def _interContentRule(linking, n, p):
+        k = periodSequence[p]
+        last = periods[k][-1]
+        return linking.storageInterContent[n, p + 1] == (linking.storageInterContent[n, p] * decay[n, last]
+                                                         + _relativeContent(n, k, last))
+
+    def _interContentMinRule(linking, n, p):
+        k = periodSequence[p]
+        return linking.storageInterContent[n, p] * decay[n, periods[k][-1]] + linking.storageIntraMin[n, k] >= 0
+
+    def _interContentMaxRule(linking, n, p):
+        k = periodSequence[p]
+        return linking.storageInterContent[n, p] + linking.storageIntraMax[n, k] <= _capacity(n)
+
+    linking.storageInterContentConstr = pyo.Constraint(linking.STORAGE_SEQUENCE, rule=_interContentRule)
+    linking.storageInterContentMinConstr = pyo.Constraint(linking.STORAGE_SEQUENCE, rule=_interContentMinRule)
+    linking.storageInterContentMaxConstr = pyo.Constraint(linking.STORAGE_SEQUENCE, rule=_interContentMaxRule)
+
+    def _cyclicRule(linking, n):
+        return linking.storageInterContent[n, len(periodSequence)] == linking.storageInterContent[n, 0]
+
+    def _initialContentRule(linking, n):
+        if n.initial_storage_level is None:
+            return pyo.Constraint.Skip
+        return linking.storageInterContent[n, 0] == n.initial_storage_level * _capacity(n)
+
+    linking.storageCyclicConstr = pyo.Constraint(storages, rule=_cyclicRule)
+    linking.storageInitialContentConstr = pyo.Constraint(storages, rule=_initialContentRule)
+    return om
+
+@contextmanager
+def detachedInterPeriodStorage(om):
+    """
+    Context manager removing the block of the inter-period storage linking (see interPeriodStorageConstraint) from the
+    optimization model, e.g. while solph.processing.results reads the variables of the model: the variables of the
+    block are indexed by the representative and the original periods instead of the timesteps
+    :param om: optimization model
+    """
+    linking = getattr(om, "interPeriodStorage", None)
+    if linking is None:
+        yield om
+        return
+    om.del_component(linking)
+    try:
+        yield om
+    finally:
+        om.add_component("interPeriodStorage", linking)
+
 def connectInvestmentRule(om):
     """Constraint to equate the investment objects of all the output flows of a Link"""
 
-    elLinkOutputFlows = [(i, o) for (i, o) in om.flows if (i.label == "electricityLink" or i.label == "elLink")]
-    shLinkOutputFlows = [(i, o) for (i, o) in om.flows if i.label == "shLink"]
-    dhwLinkOutputFlows = [(i, o) for (i, o) in om.flows if i.label == "dhwLink"]
+    registry = getFlowRegistry(om)
+    elLinkOutputFlows = registry.getFlows("electricityLink", direction="out") + registry.getFlows("elLink", direction="out")
+    shLinkOutputFlows = registry.getFlows("shLink", direction="out")
+    dhwLinkOutputFlows = registry.getFlows("dhwLink", direction="out")
 
     if elLinkOutputFlows:
         first = om.InvestmentFlow.invest[next(iter(elLinkOutputFlows))]
@@ -61,10 +205,19 @@ def connectInvestmentRule(om):
     return om
 
 
+def _flowCoefficients(value, timeincrement):
+    """coefficients of the flow variables of all the timesteps (value per flow * time increment) as an array"""
+    if np.isscalar(value):
+        return float(value) * timeincrement
+    return np.asarray(value, dtype=float)[:len(timeincrement)] * timeincrement
+
+
 def environmentalImpactlimit(om, keyword1, keyword2, limit=None):
     """
     Based on: oemof.solph.constraints.emission_limit
     Function to limit the environmental impacts during the multi-objective optimization
+    The coefficients of the flows are computed as arrays and the expression is assembled directly as a linear
+    expression (without the intermediate product and sum expressions), the terms with a zero coefficient are skipped
     :param om: model
     :param keyword1: keyword for environmental impacts per flow, placed in a solph.Flow() object
     :param keyword2: keyword for environmental impacts per capacity installed, placed in a solph.Investment() object
@@ -84,31 +237,46 @@ def environmentalImpactlimit(om, keyword1, keyword2, limit=None):
         if hasattr(x.investment, keyword2):
             storageCapacityDict[x] = om.GenericInvestmentStorageBlock.invest[x]
 
+    timesteps = list(om.TIMESTEPS)
+    timeincrement = np.array([om.timeincrement[t] for t in timesteps], dtype=float)
+    coefficients = []
+    variables = []
+    # Environmental inpact of input flows
+    for (inflow, outflow) in flows:
+        flowCoefficients = _flowCoefficients(getattr(flows[inflow, outflow], keyword1), timeincrement)
+        for k in np.flatnonzero(flowCoefficients):
+            coefficients.append(float(flowCoefficients[k]))
+            variables.append(om.flow[inflow, outflow, timesteps[k]])
+    # fix Environmental impact per transformer capacity
+    for (inflow, outflow) in transformerFlowCapacityDict:
+        coefficient = getattr(transformerFlowCapacityDict[inflow, outflow], keyword2)
+        if coefficient:
+            coefficients.append(float(coefficient))
+            variables.append(om.InvestmentFlow.invest[inflow, outflow])
+    # fix Environmental impact per storage capacity
+    for x in storageCapacityDict:
+        coefficient = getattr(x.investment, keyword2)
+        if coefficient:
+            coefficients.append(float(coefficient))
+            variables.append(om.GenericInvestmentStorageBlock.invest[x])
+
     envImpact = "totalEnvironmentalImpact"
 
     setattr(
         om,
         envImpact,
-        pyo.Expression(
-            expr=sum(
-            # Environmental inpact of input flows
-                om.flow[inflow, outflow, t]
-                * om.timeincrement[t]
-                * sequence(getattr(flows[inflow, outflow], keyword1))[t]
-                for (inflow, outflow) in flows
-                for t in om.TIMESTEPS
-            )
-            # fix Environmental impact per transformer capacity
-            + sum(om.InvestmentFlow.invest[inflow, outflow] * getattr(transformerFlowCapacityDict[inflow, outflow], keyword2)
-            for (inflow, outflow) in transformerFlowCapacityDict)
-            # fix Environmental impact per storage capacity
-            + sum(om.GenericInvestmentStorageBlock.invest[x] * getattr(x.investment, keyword2) for x in storageCapacityDict)
-        ),
+        pyo.Expression(expr=LinearExpression(constant=0, linear_coefs=coefficients, linear_vars=variables)),
+    )
+    # the limit is a mutable parameter so that it can be changed without rebuilding the model (see ParetoRunner)
+    setattr(
+        om,
+        envImpact + "_limit",
+        pyo.Param(initialize=limit, mutable=True),
     )
     setattr(
         om,
         envImpact + "_constraint",
-        pyo.Constraint(expr=(getattr(om, envImpact) <= limit)),
+        pyo.Constraint(expr=(getattr(om, envImpact) <= getattr(om, envImpact + "_limit"))),
     )
     return om, flows, transformerFlowCapacityDict, storageCapacityDict
 
@@ -134,14 +302,14 @@ def roof_area_limit(model, keyword1, keyword2, nb):
     attribute named like keyword!
     """
 
+    registry = getFlowRegistry(model)
     for b in range(1, nb+1):
         limit = 0
         invest_flows = {}
-        for (i, o) in model.flows:
-            if str(b) in str(i):
-                if hasattr(model.flows[i, o].investment, keyword1):
-                    invest_flows[(i, o)] = model.flows[i, o].investment
-                    limit = getattr(model.flows[i, o].investment, keyword2)
+        for (i, o) in registry.getBuildingFlows(b, direction="out"):
+            if hasattr(model.flows[i, o].investment, keyword1):
+                invest_flows[(i, o)] = model.flows[i, o].investment
+                limit = getattr(model.flows[i, o].investment, keyword2)
 
         limit_name = "invest_limit_" + keyword1 + "_building" + str(b)
 
@@ -166,34 +334,28 @@ def roof_area_limit(model, keyword1, keyword2, nb):
 
     return model
 
+_splitGroundHeatPump = re.compile(r"^GWHP\d+$")
+
+
 def electricRodCapacityConstaint(om, numBuildings):
     """constraint to set the total capacity of electric rod equal to sum of total capacity selected for HP"""
-    electricRodInputFlows = [(i, o) for (i, o) in om.flows if ("ElectricRod" in o.label)]
-    airHeatPumpInputFlows = [(i, o) for (i, o) in om.flows if ("HP" in o.label and "CHP" not in o.label and "GWHP" not in o.label)]
-    groundHeatPumpInputFlows = [(i, o) for (i, o) in om.flows if ("GWHP" in o.label and not any([c.isdigit() for c in o.label.split("__")[0]]))]
-    groundHeatPumpOutFlows = [(i, o) for (i, o) in om.flows if ("GWHP" in i.label and any([c.isdigit() for c in i.label.split("__")[0]]))]     # for splitted GSHPs
-
+    registry = getFlowRegistry(om)
     elRodCapacityTotal = 0
     airHeatPumpCapacityTotal = 0
     groundHeatPumpCapacityTotal = 0
 
     for b in range(1,numBuildings+1):
-        elRodCapacity = [om.InvestmentFlow.invest[i, o] for (i, o) in electricRodInputFlows if ((f'__Building{b}') in o.label)]
-        airHeatPumpCapacity = [om.InvestmentFlow.invest[i, o] for (i, o) in airHeatPumpInputFlows if ((f'__Building{b}') in o.label)]
-        if groundHeatPumpInputFlows:
-            groundHeatPumpCapacity = [om.InvestmentFlow.invest[i, o] for (i, o) in groundHeatPumpInputFlows if ((f'__Building{b}') in o.label)]
-        else:
-            groundHeatPumpCapacity = [om.InvestmentFlow.invest[i, o] for (i, o) in groundHeatPumpOutFlows if ((f'__Building{b}') in i.label)]
+        elRodCapacity = [om.InvestmentFlow.invest[i, o] for (i, o) in registry.getFlows("ElectricRod", b, "in", invest=True)]
+        airHeatPumpCapacity = [om.InvestmentFlow.invest[i, o] for (i, o) in registry.getFlows("HP", b, "in", invest=True)]
+        groundHeatPumpCapacity = [om.InvestmentFlow.invest[i, o] for (i, o) in registry.getFlows("GWHP", b, "in", invest=True)]
+        if not groundHeatPumpCapacity:
+            # splitted GSHPs (GWHP<temperature>__BuildingN) with the investment on their output flow
+            groundHeatPumpCapacity = [om.InvestmentFlow.invest[i, o] for t in sorted(registry.getTechnologies(b))
+                                      if _splitGroundHeatPump.match(t) for (i, o) in registry.getFlows(t, b, "out", invest=True)]
         if elRodCapacity:
-            elRodCapacity = elRodCapacity[0]
-            airHeatPumpCapacity = airHeatPumpCapacity[0] if airHeatPumpCapacity else 0
-            if groundHeatPumpInputFlows:
-                groundHeatPumpCapacity = groundHeatPumpCapacity[0] if groundHeatPumpCapacity else 0
-            else:
-                groundHeatPumpCapacity = groundHeatPumpCapacity[0] + groundHeatPumpCapacity[1] if groundHeatPumpCapacity else 0
-            elRodCapacityTotal = elRodCapacityTotal + elRodCapacity
-            airHeatPumpCapacityTotal = airHeatPumpCapacityTotal + airHeatPumpCapacity
-            groundHeatPumpCapacityTotal = groundHeatPumpCapacityTotal + groundHeatPumpCapacity
+            elRodCapacityTotal = elRodCapacityTotal + elRodCapacity[0]
+            airHeatPumpCapacityTotal = airHeatPumpCapacityTotal + (airHeatPumpCapacity[0] if airHeatPumpCapacity else 0)
+            groundHeatPumpCapacityTotal = groundHeatPumpCapacityTotal + sum(groundHeatPumpCapacity)
 
     expr = (elRodCapacityTotal <= (airHeatPumpCapacityTotal + groundHeatPumpCapacityTotal))
     setattr(
@@ -204,10 +366,10 @@ def electricRodCapacityConstaint(om, numBuildings):
     return om
 
 def totalPVCapacityConstraint(om, numBuildings):
-    pvOutFlows = [(i, o) for (i, o) in om.flows if ("pv" in i.label)]
+    registry = getFlowRegistry(om)
     pvCapacityTotal = 0
     for b in range(1,numBuildings+1):
-        pvCapacity = [om.InvestmentFlow.invest[i, o] for (i, o) in pvOutFlows if ((f'__Building{b}') in o.label)]
+        pvCapacity = [om.InvestmentFlow.invest[i, o] for (i, o) in registry.getFlows("pv", b, "out", invest=True)]
         if pvCapacity:
             pvCapacity = pvCapacity[0]
             pvCapacityTotal = pvCapacityTotal + pvCapacity
@@ -1,7 +1,9 @@
 import oemof.solph as solph
 import numpy as np
 import optihood.combined_prod as cp
-from oemof.thermal.solar_thermal_collector import flat_plate_precalc
+import pandas as pd
+from optihood.solar_profiles import solarProfiles
+from optihood.cop_profiles import copProfiles
 
 class SolarCollector(solph.Transformer):
     def __init__(self, label, buildingLabel, inputs, outputs, connector, electrical_consumption, peripheral_losses, latitude,
@@ -10,20 +12,20 @@ class SolarCollector(solph.Transformer):
                  delta_temp_n, irradiance_global,
                  irradiance_diffuse, temp_amb_col, capacityMin, capacityMax, epc, base, env_capa, env_flow, varc, dispatchMode):
 
-        flatPlateCollectorData = flat_plate_precalc(
-            latitude, longitude, collector_tilt, collector_azimuth, eta_0, a_1, a_2, temp_collector_inlet, delta_temp_n,
-            irradiance_global, irradiance_diffuse, temp_amb_col
-        )
+        # collector efficiency and heat (flow in kWh per m² of solar thermal panel), shared by all the collectors with the
+        # same site, orientation, parameters and weather data
+        weatherKey = solarProfiles.fingerprint(irradiance_global, irradiance_diffuse, temp_amb_col)
+        self.collectors_eta_c, self.collectors_heat = solarProfiles.getProfile(
+            ("solarCollector", latitude, longitude, collector_tilt, collector_azimuth, eta_0, a_1, a_2, temp_collector_inlet,
+             delta_temp_n, weatherKey),
+            lambda: self._precalculate(latitude, longitude, collector_tilt, collector_azimuth, eta_0, a_1, a_2,
+                                       temp_collector_inlet, delta_temp_n, irradiance_global, irradiance_diffuse, temp_amb_col))
 
         if not (np.isnan(roof_area) or np.isnan(zenith_angle)):
             self.surface_used = self._calculateArea(zenith_angle, collector_tilt, collector_azimuth)
         else:
             self.surface_used = np.nan
 
-        self.collectors_eta_c = flatPlateCollectorData['eta_c']
-
-        self.collectors_heat = flatPlateCollectorData['collectors_heat']/1000 #flow in kWh per m² of solar thermal panel
-
         if dispatchMode:
             investArgs = {'ep_costs':epc,
                         'minimum':capacityMin,
@@ -78,6 +80,19 @@ class SolarCollector(solph.Transformer):
             print("Transformer label not identified...")
             return []
 
+    def _precalculate(self, latitude, longitude, collector_tilt, collector_azimuth, eta_0, a_1, a_2, temp_collector_inlet,
+                      delta_temp_n, irradiance_global, irradiance_diffuse, temp_amb_col):
+        """collector efficiency and heat (kWh/m²) as computed by flat_plate_precalc of oemof.thermal, vectorized over the time steps
+        and with the irradiance on the collector taken from the solar profile cache"""
+        collectorIrradiance = solarProfiles.getIrradiance(latitude, longitude, collector_tilt, collector_azimuth,
+                                                          irradiance_global, irradiance_diffuse)
+        deltaT = temp_collector_inlet + delta_temp_n - np.asarray(temp_amb_col, dtype=np.float64)
+        irradiance = collectorIrradiance.to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            eta = eta_0 - a_1 * deltaT / irradiance - a_2 * deltaT ** 2 / irradiance
+        etaC = pd.Series(np.where((irradiance > 0) & (eta > 0), eta, 0.0), index=collectorIrradiance.index)
+        return etaC, etaC * collectorIrradiance / 1000
+
     def _calculateArea(self, zenith_angle, collector_tilt, collector_azimuth):
         coeff = -np.sin((zenith_angle+collector_tilt)*np.pi/180)*np.cos(collector_azimuth*np.pi/180)/np.sin(zenith_angle*np.pi/180)
         return coeff
@@ -90,7 +105,7 @@ class HeatPumpLinear:
                  epc, base, varc, env_flow, env_capa, dispatchMode):
         self.__copDHW = self._calculateCop(temperatureDHW, temperatureLow)
         self.__copSH = self._calculateCop(temperatureSH, temperatureLow)
-        self.avgCopSh = (sum(self.__copSH)/len(self.__copSH))
+        self.avgCopSh = copProfiles.getAverageCop("HP", temperatureSH, temperatureLow)
         self.nominalEff = nomEff
         if dispatchMode:
             investArgs = {'ep_costs' : epc * nomEff,
@@ -121,18 +136,7 @@ class HeatPumpLinear:
                                                         outputDHW: self.__copDHW})
 
     def _calculateCop(self, tHigh, tLow):
-        coefW = [0.66610, -2.2365, 15.541, 25.705, -17.407, 3.8145]
-        coefQ = [11.833, 96.504, 14.496, -50.064, 161.02, -133.60]
-        QCondenser = coefQ[0] + (coefQ[1] * tLow / 273.15) + (coefQ[2] * tHigh / 273.15) + (
-                coefQ[3] * tLow / 273.15 * tHigh / 273.15) + (
-                             coefQ[4] * (tLow / 273.15) ** 2) + (
-                             coefQ[5] * (tHigh / 273.15) ** 2)
-        WCompressor = coefW[0] + (coefW[1] * tLow / 273.15) + (coefW[2] * tHigh / 273.15) + (
-                coefW[3] * tLow / 273.15 * tHigh / 273.15) + (
-                             coefW[4] * (tLow / 273.15) ** 2) + (
-                              coefW[5] * (tHigh / 273.15) ** 2)
-        cop = np.divide(QCondenser, WCompressor)
-        return cop
+        return copProfiles.getCop("HP", tHigh, tLow)
 
     def getHP(self, type):
         if type == 'sh':
@@ -149,7 +153,7 @@ class GeothermalHeatPumpLinear:
                  epc, base, varc, env_flow, env_capa, dispatchMode):
         self.__copDHW = self._calculateCop(temperatureDHW, temperatureLow)
         self.__copSH = self._calculateCop(temperatureSH, temperatureLow)
-        self.avgCopSh = (sum(self.__copSH)/len(self.__copSH))
+        self.avgCopSh = copProfiles.getAverageCop("GWHP", temperatureSH, temperatureLow)
         self.nominalEff = nomEff
         if dispatchMode:
             investArgs= {'ep_costs':epc*nomEff,
@@ -182,18 +186,7 @@ class GeothermalHeatPumpLinear:
                                                         outputDHW: self.__copDHW})
 
     def _calculateCop(self, tHigh, tLow):
-        coefW = [0.1600, -1.2369, 19.9391, 19.3448, 7.1057, -1.4048]
-        coefQ = [13.8978, 114.8358, -9.3634, -179.4227, 342.3363, -12.4969]
-        QCondenser = coefQ[0] + (coefQ[1] * tLow / 273.15) + (coefQ[2] * tHigh / 273.15) + (
-                coefQ[3] * tLow / 273.15 * tHigh / 273.15) + (
-                             coefQ[4] * (tLow / 273.15) ** 2) + (
-                             coefQ[5] * (tHigh / 273.15) ** 2)
-        WCompressor = coefW[0] + (coefW[1] * tLow / 273.15) + (coefW[2] * tHigh / 273.15) + (
-                coefW[3] * tLow / 273.15 * tHigh / 273.15) + (
-                             coefW[4] * (tLow / 273.15) ** 2) + (
-                              coefW[5] * (tHigh / 273.15) ** 2)
-        cop = np.divide(QCondenser, WCompressor)
-        return cop
+        return copProfiles.getCop("GWHP", tHigh, tLow)
 
     def getHP(self, type):
         if type == 'sh':
@@ -361,18 +354,7 @@ class GeothermalHeatPumpLinearSingleUse:
                                             conversion_factors={outputH: self.__copH})
 
     def _calculateCop(self, tHigh, tLow):
-        coefW = [0.1600, -1.2369, 19.9391, 19.3448, 7.1057, -1.4048]
-        coefQ = [13.8978, 114.8358, -9.3634, -179.4227, 342.3363, -12.4969]
-        QCondenser = coefQ[0] + (coefQ[1] * tLow / 273.15) + (coefQ[2] * tHigh / 273.15) + (
-                coefQ[3] * tLow / 273.15 * tHigh / 273.15) + (
-                             coefQ[4] * (tLow / 273.15) ** 2) + (
-                             coefQ[5] * (tHigh / 273.15) ** 2)
-        WCompressor = coefW[0] + (coefW[1] * tLow / 273.15) + (coefW[2] * tHigh / 273.15) + (
-                coefW[3] * tLow / 273.15 * tHigh / 273.15) + (
-                             coefW[4] * (tLow / 273.15) ** 2) + (
-                              coefW[5] * (tHigh / 273.15) ** 2)
-        cop = np.divide(QCondenser, WCompressor)
-        return cop
+        return copProfiles.getCop("GWHP", tHigh, tLow)
 
     def getHP(self, type):
         if type == 'sh':
@@ -0,0 +1,100 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# coefficients of the polynomial fits of the condenser heat (Q) and compressor power (W) of the heat pump models
+copCoefficients = {
+    "HP": {"W": [0.66610, -2.2365, 15.541, 25.705, -17.407, 3.8145],
+           "Q": [11.833, 96.504, 14.496, -50.064, 161.02, -133.60]},
+    "GWHP": {"W": [0.1600, -1.2369, 19.9391, 19.3448, 7.1057, -1.4048],
+             "Q": [13.8978, 114.8358, -9.3634, -179.4227, 342.3363, -12.4969]},
+}
+
+
+class CopProfileCache:
+    """
+    Cache of the COP profiles of the heat pump models
+
+    The COP of a heat pump model only depends on the supply temperature (tHigh) and on the source temperature time
+    series (tLow), which are the same for all the buildings. Each combination is computed once and the profile is
+    returned as a read-only array shared by the heat pumps of all the buildings. The cache can be used by several
+    threads (buildings added in parallel). The least recently used profiles are evicted above maxEntries profiles so
+    that the cache does not grow with the number of energy networks defined in a process.
+
+    Parameters
+    ----------
+    maxEntries : maximum number of COP profiles kept in the cache
+    """
+
+    def __init__(self, maxEntries=256):
+        self.__maxEntries = maxEntries
+        self.__profiles = OrderedDict()
+        self.__statistics = [0, 0]     # [hits, misses]
+        self.__lock = threading.Lock()
+
+    def clear(self):
+        self.__profiles.clear()
+        self.__statistics[:] = [0, 0]
+
+    def getStatistics(self):
+        hits, misses = self.__statistics
+        return {"hits": hits, "misses": misses, "hitRate": hits / (hits + misses) if hits + misses else np.nan}
+
+    def logStatistics(self):
+        hits, misses = self.__statistics
+        logging.info("COP profile cache hit rate: {}/{}".format(hits, hits + misses))
+
+    def getCop(self, model, tHigh, tLow):
+        """
+        returns the COP profile of the heat pump model
+        :param model: heat pump model (key of copCoefficients)
+        :param tHigh: supply temperature
+        :param tLow: source temperature (scalar or time series)
+        :return: read-only array of the COP (float if tLow is a scalar)
+        """
+        return self._getProfile(model, tHigh, tLow)[0]
+
+    def getAverageCop(self, model, tHigh, tLow):
+        """returns the average of the COP profile of the heat pump model (see getCop)"""
+        return self._getProfile(model, tHigh, tLow)[1]
+
+    def _getProfile(self, model, tHigh, tLow):
+        if model not in copCoefficients:
+            raise ValueError("Unknown heat pump model {}, expected one of {}".format(model, list(copCoefficients)))
+        tLow = np.asarray(tLow, dtype=np.float64)
+        key = (model, float(tHigh), tLow.shape, hashlib.sha1(np.ascontiguousarray(tLow).tobytes()).hexdigest())
+        with self.__lock:
+            found = key in self.__profiles
+            self.__statistics[0 if found else 1] += 1
+            if found:
+                self.__profiles.move_to_end(key)
+            else:
+                cop = np.asarray(_calculateCop(copCoefficients[model], tHigh, tLow))
+                if cop.ndim == 0:
+                    cop = float(cop)
+                    self.__profiles[key] = (cop, cop)
+                else:
+                    cop.setflags(write=False)
+                    self.__profiles[key] = (cop, sum(cop) / len(cop))
+                if len(self.__profiles) > self.__maxEntries:
+                    self.__profiles.popitem(last=False)
+            return self.__profiles[key]
+
+
+def _calculateCop(coefficients, tHigh, tLow):
+    coefW, coefQ = coefficients["W"], coefficients["Q"]
+    QCondenser = coefQ[0] + (coefQ[1] * tLow / 273.15) + (coefQ[2] * tHigh / 273.15) + (
+            coefQ[3] * tLow / 273.15 * tHigh / 273.15) + (
+                         coefQ[4] * (tLow / 273.15) ** 2) + (
+                         coefQ[5] * (tHigh / 273.15) ** 2)
+    WCompressor = coefW[0] + (coefW[1] * tLow / 273.15) + (coefW[2] * tHigh / 273.15) + (
+            coefW[3] * tLow / 273.15 * tHigh / 273.15) + (
+                         coefW[4] * (tLow / 273.15) ** 2) + (
+                          coefW[5] * (tHigh / 273.15) ** 2)
+    return np.divide(QCondenser, WCompressor)
+
+
+copProfiles = CopProfileCache()
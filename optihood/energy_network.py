@@ -1,24 +1,133 @@
 import numpy as np
 import pandas as pd
 import oemof.solph as solph
+from pyomo.opt import SolverFactory
+from pyomo.solvers.plugins.solvers.persistent_solver import PersistentSolver
 from oemof.tools import logger
 import logging
 import os
+import warnings
 import pprint as pp
 from configparser import ConfigParser
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 try:
     import matplotlib.pyplot as plt
 except ImportError:
     plt = None
 from optihood.constraints import *
+from optihood.flow_registry import getFlowRegistry
 from optihood.buildings import Building
 from optihood.links import Link
+from optihood.profiles import readWeatherData, readDemandProfiles, demandProfilesPattern
+from optihood.timeseries_store import TimeSeriesStore
+from optihood.solar_profiles import solarProfiles
+from optihood.cop_profiles import copProfiles
+from optihood.phase_profiler import PhaseProfiler
+from optihood.pareto import ParetoRunner
+from optihood.rolling_horizon import RollingHorizonDispatch
+from optihood.highs_solver import HighsSolver
+from optihood.solving import defaultSolverOptions, failedTerminationConditions
+from optihood.scenario_directory import readScenarioDirectory, writeScenarioDirectory, optionalSheets, internalGainsColumn
+from optihood.clustering import TypicalDays, TimeSegments
+
+# sheets of the scenario data with one or several rows per building
+_buildingSheets = ["buses", "grid_connection", "commodity_sources", "demand", "transformers", "storages", "solar"]
+
+
+def _periodRows(index, starts, timestepsPerPeriod):
+    """positions in the datetime index of the rows of the periods of timestepsPerPeriod timesteps starting at the
+    timestamps starts, in the order of starts (binary search of all the starts at once)"""
+    positions = index.searchsorted(starts)
+    missing = (positions == len(index)) | (index[np.minimum(positions, len(index) - 1)] != starts)
+    if missing.any():
+        raise ValueError("The representative periods starting at {} are not in the time series".format(
+            [str(d) for d in starts[missing]]))
+    exceeding = positions + timestepsPerPeriod > len(index)
+    if exceeding.any():
+        raise ValueError("The representative periods starting at {} exceed the time series".format(
+            [str(d) for d in starts[exceeding]]))
+    return (positions[:, None] + np.arange(timestepsPerPeriod)).ravel()
+
+
+class _ClusteredRows:
+    """rows of the representative periods of time series, computed once for all the series sharing the same index"""
+
+    def __init__(self, starts, timestepsPerPeriod):
+        self.__starts = starts
+        self.__timestepsPerPeriod = timestepsPerPeriod
+        self.__rows = []          # list of (index, rows)
+
+    def select(self, frame, starts=None):
+        """rows of the representative periods of frame (starting at starts if given, e.g. for another year)"""
+        if starts is None:
+            for index, rows in self.__rows:
+                if index is frame.index or index.equals(frame.index):
+                    return frame.iloc[rows]
+            rows = _periodRows(frame.index, self.__starts, self.__timestepsPerPeriod)
+            self.__rows.append((frame.index, rows))
+            return frame.iloc[rows]
+        return frame.iloc[_periodRows(frame.index, starts, self.__timestepsPerPeriod)]
+
+
+def _selectPeriods(nodesData, numberOfBuildings, starts, timestepsPerPeriod):
+    """replaces the time series in nodesData by the concatenation of the periods of timestepsPerPeriod timesteps
+    starting at the timestamps starts"""
+    # the demand profiles (and usually the electricity cost and impact) share the same index, the rows of the periods
+    # are computed once and gathered in a single step for each series
+    clusteredRows = _ClusteredRows(starts, timestepsPerPeriod)
+    demandProfiles = {}
+    for i in range(1, numberOfBuildings + 1):
+        demandProfiles[i] = clusteredRows.select(nodesData["demandProfiles"][i])
+    electricityImpact = clusteredRows.select(nodesData["electricity_impact"])
+    electricityCost = clusteredRows.select(nodesData["electricity_cost"])
+    # the weather data can be of another year than the demand profiles
+    weatherYear = nodesData["weather_data"].index[0].year
+    weatherData = clusteredRows.select(nodesData["weather_data"], pd.DatetimeIndex(
+        [d.replace(year=weatherYear) for d in starts]))[['gls', 'str.diffus', 'tre200h0', 'ground_temp']]
+
+    nodesData["demandProfiles"] = demandProfiles
+    nodesData["electricity_impact"] = electricityImpact
+    nodesData["electricity_cost"] = electricityCost
+    nodesData["weather_data"] = weatherData
+
+
+def _segmentMeans(frame, starts, timeincrement):
+    """means of the columns of frame over the segments starting at the timestamps starts and lasting timeincrement
+    hours, the segments being consecutive and made of whole timesteps of frame"""
+    positions = frame.index.searchsorted(starts)
+    hoursPerTimestep = (frame.index[1] - frame.index[0]) / pd.Timedelta(hours=1)
+    lengths = np.rint(timeincrement / hoursPerTimestep).astype(int)
+    if (positions == len(frame.index)).any() or (frame.index[np.minimum(positions, len(frame.index) - 1)] != starts).any():
+        raise ValueError("The first timestamps of the segments are not all in the time series")
+    if (np.diff(positions) != lengths[:-1]).any() or positions[-1] + lengths[-1] > len(frame.index):
+        raise ValueError("The segments (time index and timeincrement) do not match the timesteps of the time series")
+    values = frame.to_numpy(dtype=np.float64)[positions[0]:positions[-1] + lengths[-1]]
+    means = np.add.reduceat(values, positions - positions[0]) / lengths[:, None]
+    return pd.DataFrame(means, index=starts, columns=frame.columns)
+
+
+def _splitByBuilding(data, numberOfBuildings):
+    """partitions the building sheets of the scenario data in a single pass per sheet
+    :return: dictionary of the sheets of each building indexed by the building number (1 to numberOfBuildings)"""
+    buildingsData = {i: {} for i in range(1, numberOfBuildings + 1)}
+    for sheet in _buildingSheets:
+        frame = data[sheet]
+        groups = dict(tuple(frame.groupby("building", sort=False)))
+        for i, buildingData in buildingsData.items():
+            buildingData[sheet] = groups.get(i, frame.iloc[:0])
+    return buildingsData
 
 
 class EnergyNetworkClass(solph.EnergySystem):
-    def __init__(self, timestamp):
+    _extraSheets = ()                               # sheets of the input file which are specific to the network type
+
+    def __init__(self, timestamp, memmapDir=None, maxWorkers=None, timeincrement=None):
         self._nodesList = []
+        self._timeSeries = TimeSeriesStore(memmapDir)    # time series shared by the components of all the buildings
+        self._maxWorkers = maxWorkers               # number of threads adding the buildings (default of ThreadPoolExecutor if None)
+        self._profiler = PhaseProfiler()            # wall time, CPU time and peak memory of the phases (see getPhaseReport)
+        self._firstRow = 0                          # first row of the time series used (see _selectTimeWindow)
         self._storageContentSH = {}
         self.__inputs = {}                          # dictionary of list of inputs indexed by the building label
         self.__technologies = {}                    # dictionary of list of technologies indexed by the building label
@@ -42,49 +151,200 @@ class EnergyNetworkClass(solph.EnergySystem):
         self.__annualCopGWHP = {}
         self.__elRodEff = np.nan
         self._dispatchMode = False                         
+        self._scenario = None                       # arguments of setFromExcel or setFromDirectory
+        self._demandProfilesPattern = demandProfilesPattern     # names of the demand profile files (see readDemandProfiles)
+        self._timeincrement = timeincrement         # duration (h) of the timesteps if they are segments of the time series (see TimeSegments)
         if not os.path.exists(".\\log_files"):
             os.mkdir(".\\log_files")
         logger.define_logging(logpath=os.getcwd(), logfile=f'.\\log_files\\optihood_{datetime.now().strftime("%d.%m.%Y_%H.%M.%S")}.log')
 
         logging.info("Initializing the energy network")
-        super(EnergyNetworkClass, self).__init__(timeindex=timestamp)
+        super(EnergyNetworkClass, self).__init__(timeindex=timestamp, timeincrement=timeincrement)
 
-    def setFromExcel(self, filePath, numberOfBuildings, clusterSize={}, opt="costs", mergeLinkBuses=False, dispatchMode=False):
+    def setFromExcel(self, filePath, numberOfBuildings, clusterSize={}, opt="costs", mergeLinkBuses=False, dispatchMode=False, cache=None,
+                     profilePhases=None, demandProfilesPattern=demandProfilesPattern):
         # does Excel file exist?
         if not filePath or not os.path.isfile(filePath):
-            logging.error("Excel data file {} not found.".format(filePath))                                                                               
+            logging.error("Excel data file {} not found.".format(filePath))
         self._dispatchMode = dispatchMode
+        # regular expression of the names of the demand profile files, the first group being the building number
+        self._demandProfilesPattern = demandProfilesPattern
+        self._profiler.profilePhases(profilePhases)
+        # source of the network, used to define the network again in other processes (see ParetoRunner)
+        self._scenario = {"method": "setFromExcel", "path": filePath, "numberOfBuildings": numberOfBuildings,
+                          "clusterSize": clusterSize, "opt": opt, "mergeLinkBuses": mergeLinkBuses,
+                          "dispatchMode": dispatchMode, "cache": cache, "demandProfilesPattern": demandProfilesPattern}
         logging.info("Defining the energy network from the excel file: {}".format(filePath))
-        data = pd.ExcelFile(filePath)
-        nodesData = self.createNodesData(data, filePath, numberOfBuildings)
+        with self._profiler.phase("readExcel"):
+            nodesData = self._readNodesData(filePath, numberOfBuildings, clusterSize, cache, self._extraSheets)
         # nodesData["buses"]["excess costs"] = nodesData["buses"]["excess costs indiv"]
         # nodesData["electricity_cost"]["cost"] = nodesData["electricity_cost"]["cost indiv"]
 
-        if clusterSize:
-            demandProfiles = {}
-            for i in range(1, numberOfBuildings + 1):
-                demandProfiles[i] = pd.concat(
-                    [nodesData["demandProfiles"][i].loc[d] for d in clusterSize.keys()])
-            electricityImpact = pd.concat(
-                [nodesData["electricity_impact"].loc[d] for d in clusterSize.keys()])
-            electricityCost = pd.concat(
-                [nodesData["electricity_cost"].loc[d] for d in clusterSize.keys()])
-            weatherData = pd.concat([nodesData['weather_data'][
-                                         nodesData['weather_data']['time.mm'] == int(d.split('-')[1])][
-                                         nodesData['weather_data']['time.dd'] == int(d.split('-')[2])][
-                                         ['gls', 'str.diffus', 'tre200h0', 'ground_temp']] for d in clusterSize.keys()])
-
-            nodesData["demandProfiles"] = demandProfiles
-            nodesData["electricity_impact"] = electricityImpact
-            nodesData["electricity_cost"] = electricityCost
-            nodesData["weather_data"] = weatherData
-
-        self._convertNodes(nodesData, opt, mergeLinkBuses)
+        with self._profiler.phase("convertNodes"):
+            self._convertNodes(nodesData, opt, mergeLinkBuses)
         logging.info("Nodes from Excel file {} successfully converted".format(filePath))
-        self.add(*self._nodesList)
+        with self._profiler.phase("addNodes"):
+            self.add(*self._nodesList)
+        logging.info("Nodes successfully added to the energy network")
+
+    def _readNodesData(self, filePath, numberOfBuildings, clusterSize, cache, sheets=()):
+        """reads the nodes data from the excel file (or from the scenario cache if given) and selects the clustered days
+        sheets: additional sheets of the excel file to be parsed as they are (for example: links)"""
+        nodesData = None
+        if cache is not None:
+            nodesData = cache.load(filePath, numberOfBuildings, clusterSize, sheets, self._cacheSelection(clusterSize),
+                                   self._demandProfilesPattern)
+        if nodesData is not None:
+            self.__noOfBuildings = numberOfBuildings
+        else:
+            data = pd.ExcelFile(filePath)
+            nodesData = self.createNodesData(data, filePath, numberOfBuildings)
+            self._selectClusteredPeriods(nodesData, numberOfBuildings, clusterSize)
+            self._selectSegments(nodesData, numberOfBuildings, clusterSize)
+
+            for sheet in sheets:
+                nodesData[sheet] = data.parse(sheet)
+            if cache is not None:
+                cache.save(nodesData, filePath, numberOfBuildings, clusterSize, sheets, self._cacheSelection(clusterSize),
+                           self._demandProfilesPattern)
+        # the windows of the time series share the cache entry of the whole time series
+        self._selectTimeWindow(nodesData, numberOfBuildings, clusterSize)
+        return nodesData
+
+    def _cacheSelection(self, clusterSize):
+        # the representative periods and the segments selected depend on the time index
+        if self._timeincrement is not None:
+            return "segments {}".format(solarProfiles.fingerprint(pd.Series(self._timeincrement, index=self.timeindex)))
+        return str(self._timestepsPerCluster(clusterSize) * self._timestepLength()) if clusterSize else None
+
+    def _selectClusteredPeriods(self, nodesData, numberOfBuildings, clusterSize):
+        """replaces the time series in nodesData by the concatenation of the representative periods given in clusterSize
+        The keys of clusterSize are the first timestamps of the periods (e.g. "2018-07-30" for a day starting at
+        midnight), the length of the periods is given by the time index of the energy network (see
+        _timestepsPerCluster), so that the periods can be days, weeks or any number of timesteps of any resolution"""
+        if clusterSize:
+            starts = pd.DatetimeIndex([pd.Timestamp(d) for d in clusterSize.keys()])
+            timestepsPerPeriod = self._timestepsPerCluster(clusterSize)
+            _selectPeriods(nodesData, numberOfBuildings, starts, timestepsPerPeriod)
+            logging.info("{} representative periods of {} selected, representing {}".format(
+                len(clusterSize), timestepsPerPeriod * self._timestepLength(),
+                sum(clusterSize.values()) * timestepsPerPeriod * self._timestepLength()))
+
+    def _selectTimeWindow(self, nodesData, numberOfBuildings, clusterSize):
+        """replaces the time series in nodesData by their rows from the first row of the energy network (a window of the
+        rolling horizon dispatch starting at this position of the time period of the dispatched energy network, see
+        _fromScenario), the time series being otherwise used from their first row"""
+        if not self._firstRow or clusterSize or self._timeincrement is not None:
+            return
+        index = nodesData["demandProfiles"][1].index
+        if self._firstRow + len(self.timeindex) > len(index):
+            raise ValueError("The time series ({} timesteps) are shorter than the window from the timestep {} to {}"
+                             .format(len(index), self._firstRow, self._firstRow + len(self.timeindex)))
+        start = index[self._firstRow]
+        weatherRows = _periodRows(nodesData["weather_data"].index,
+                                  pd.DatetimeIndex([start.replace(year=nodesData["weather_data"].index[0].year)]),
+                                  len(self.timeindex))
+        # the building model data are aligned with the rows of the weather data
+        nodesData["building_model"] = nodesData["building_model"].iloc[weatherRows].reset_index(drop=True)
+        _selectPeriods(nodesData, numberOfBuildings, pd.DatetimeIndex([start]), len(self.timeindex))
+        logging.info("Time series selected from {} ({} timesteps)".format(start, len(self.timeindex)))
+
+    def _selectSegments(self, nodesData, numberOfBuildings, clusterSize):
+        """replaces the time series in nodesData by their means over the segments of the time index (if the energy
+        network is defined with a timeincrement, see TimeSegments), the segments being given by their first timestamps
+        (time index) and their durations (timeincrement)"""
+        if self._timeincrement is None:
+            return
+        if clusterSize:
+            raise ValueError("The segments of the time index (timeincrement) cannot be combined with clusterSize")
+        timesteps = len(nodesData["demandProfiles"][1].index)
+        starts, timeincrement = self.timeindex, np.asarray(self._timeincrement, dtype=float)
+        nodesData["demandProfiles"] = {i: _segmentMeans(nodesData["demandProfiles"][i], starts, timeincrement)
+                                       for i in range(1, numberOfBuildings + 1)}
+        nodesData["electricity_impact"] = _segmentMeans(nodesData["electricity_impact"], starts, timeincrement)
+        nodesData["electricity_cost"] = _segmentMeans(nodesData["electricity_cost"], starts, timeincrement)
+        # the weather data can be of another year than the demand profiles, they are indexed by the middle of the
+        # segments for the calculation of the solar position
+        weatherYear = nodesData["weather_data"].index[0].year
+        weatherStarts = pd.DatetimeIndex([d.replace(year=weatherYear) for d in starts])
+        # the building model data are aligned with the rows of the weather data
+        buildingModel = nodesData["building_model"].set_index(nodesData["weather_data"].index)
+        nodesData["building_model"] = _segmentMeans(buildingModel, weatherStarts, timeincrement).reset_index(drop=True)
+        weatherData = _segmentMeans(nodesData["weather_data"][['gls', 'str.diffus', 'tre200h0', 'ground_temp']],
+                                    weatherStarts, timeincrement)
+        weatherData.index = weatherData.index + pd.to_timedelta(timeincrement / 2, unit="h")
+        nodesData["weather_data"] = weatherData
+        logging.info("{} timesteps of the time series aggregated into {} segments".format(timesteps, len(starts)))
+
+    def setFromDirectory(self, directoryPath, numberOfBuildings, clusterSize={}, opt="costs", mergeLinkBuses=False, dispatchMode=False,
+                         profilePhases=None):
+        """defines the energy network from a scenario directory (see createScenarioDirectory), which is an alternative to
+        the excel file with one table per sheet and the time series stored as parquet (or csv) files"""
+        if not directoryPath or not os.path.isdir(directoryPath):
+            logging.error("Scenario directory {} not found.".format(directoryPath))
+        self._dispatchMode = dispatchMode
+        self._profiler.profilePhases(profilePhases)
+        self._scenario = {"method": "setFromDirectory", "path": directoryPath, "numberOfBuildings": numberOfBuildings,
+                          "clusterSize": clusterSize, "opt": opt, "mergeLinkBuses": mergeLinkBuses,
+                          "dispatchMode": dispatchMode}
+        logging.info("Defining the energy network from the scenario directory: {}".format(directoryPath))
+        self.__noOfBuildings = numberOfBuildings
+        with self._profiler.phase("readDirectory"):
+            nodesData = readScenarioDirectory(directoryPath, numberOfBuildings, self._extraSheets)
+            self._createBuildingModelData(nodesData)
+            self._selectClusteredPeriods(nodesData, numberOfBuildings, clusterSize)
+            self._selectSegments(nodesData, numberOfBuildings, clusterSize)
+            self._selectTimeWindow(nodesData, numberOfBuildings, clusterSize)
+
+        with self._profiler.phase("convertNodes"):
+            self._convertNodes(nodesData, opt, mergeLinkBuses)
+        logging.info("Nodes from scenario directory {} successfully converted".format(directoryPath))
+        with self._profiler.phase("addNodes"):
+            self.add(*self._nodesList)
         logging.info("Nodes successfully added to the energy network")
 
-    def createNodesData(self, data, filePath, numBuildings):
+    def createScenarioDirectory(self, excelFilePath, directoryPath, numberOfBuildings,
+                                demandProfilesPattern=demandProfilesPattern):
+        """function to convert an input excel file (and the profiles it refers to) into a scenario directory
+        which can then be loaded using setFromDirectory"""
+        data = pd.ExcelFile(excelFilePath)
+        nodesData = self.createNodesData(data, excelFilePath, numberOfBuildings, demandProfilesPattern)
+        for sheet in optionalSheets:
+            if sheet in data.sheet_names:
+                nodesData[sheet] = data.parse(sheet)
+        writeScenarioDirectory(nodesData, directoryPath)
+        logging.info("Scenario directory {} created from the excel file {}".format(directoryPath, excelFilePath))
+
+    def getTimeSegments(self, path, numberOfBuildings, weights=None, cache=None):
+        """returns the TimeSegments aggregating the consecutive similar timesteps of the time series of the scenario given
+        by an excel file or a scenario directory, e.g. timeindex, timeincrement, report = timeSegments.segment(1000)
+        weights: dictionary of the weights of the time series (see TimeSegments)"""
+        return TimeSegments.fromNodesData(self._readScenarioTimeSeries(path, numberOfBuildings, cache),
+                                          numberOfBuildings, weights)
+
+    def _readScenarioTimeSeries(self, path, numberOfBuildings, cache):
+        # nodesData of an excel file or a scenario directory without aggregation of the time
+        if os.path.isdir(path):
+            return readScenarioDirectory(path, numberOfBuildings)
+        timeincrement, self._timeincrement = self._timeincrement, None
+        try:
+            return self._readNodesData(path, numberOfBuildings, {}, cache)
+        finally:
+            self._timeincrement = timeincrement
+
+    def getTypicalDays(self, path, numberOfBuildings, weights=None, periodLength="1D", cache=None):
+        """returns the TypicalDays selecting the representative days (clusterSize) from the time series of the scenario
+        given by an excel file or a scenario directory, e.g. clusterSize, report = typicalDays.cluster(12)
+        weights: dictionary of the weights of the time series, periodLength: length of the representative periods (see
+        TypicalDays)"""
+        return TypicalDays.fromNodesData(self._readScenarioTimeSeries(path, numberOfBuildings, cache), numberOfBuildings,
+                                         weights, periodLength)
+
+    def createNodesData(self, data, filePath, numBuildings, demandProfilesPattern=None):
+        # demandProfilesPattern: names of the demand profile files (see readDemandProfiles), the pattern of the energy
+        # network (see setFromExcel) if None
+        if demandProfilesPattern is None:
+            demandProfilesPattern = self._demandProfilesPattern
         self.__noOfBuildings = numBuildings
         nodesData = {
             "buses": data.parse("buses"),
@@ -107,24 +367,7 @@ class EnergyNetworkClass(solph.EnergySystem):
         weatherDataPath = nodesData["profiles"].loc[nodesData["profiles"]["name"] == "weather_data", "path"].iloc[0]
 
 
-        demandProfiles = {}  # dictionary of dataframes for each building's demand profiles
-
-        if (not os.listdir(demandProfilesPath)) or (not os.path.exists(demandProfilesPath)):
-            logging.error("Error in the demand profiles path: The folder is either empty or does not exist")
-        else:
-            i = 0
-            for filename in os.listdir(demandProfilesPath): #this path should contain csv file(s) (one for each building's profiles)
-                i += 1      # Building number
-                if i > numBuildings:
-                    logging.warning("Demand profiles folder has more files than the number of buildings specified")
-                    break
-                demandProfiles.update({i: pd.read_csv(os.path.join(demandProfilesPath, filename), delimiter=";")})
-
-            nodesData["demandProfiles"] = demandProfiles
-            # set datetime index
-            for i in range(numBuildings):
-                nodesData["demandProfiles"][i + 1].set_index("timestamp", inplace=True)
-                nodesData["demandProfiles"][i + 1].index = pd.to_datetime(nodesData["demandProfiles"][i + 1].index)
+        nodesData["demandProfiles"] = readDemandProfiles(demandProfilesPath, numBuildings, demandProfilesPattern)
 
         if type(electricityImpact) == np.float64:
             # for constant impact
@@ -161,31 +404,32 @@ class EnergyNetworkClass(solph.EnergySystem):
         if not os.path.exists(weatherDataPath):
             logging.error("Error in weather data file path")
         else:
-            nodesData["weather_data"] = pd.read_csv(weatherDataPath, delimiter=";")
-            #add a timestamp column to the dataframe
-            for index, row in nodesData['weather_data'].iterrows():
-                time = f"{int(row['time.yy'])}.{int(row['time.mm']):02}.{int(row['time.dd']):02} {int(row['time.hh']):02}:00:00"
-                nodesData['weather_data'].at[index, 'timestamp'] = datetime.strptime(time, "%Y.%m.%d  %H:%M:%S")
-                #set datetime index
-            nodesData["weather_data"].set_index("timestamp", inplace=True)
-            nodesData["weather_data"].index = pd.to_datetime(nodesData["weather_data"].index)
+            nodesData["weather_data"] = readWeatherData(weatherDataPath)
+
+        self._createBuildingModelData(nodesData)
+        logging.info("Data from Excel file {} imported.".format(filePath))
+        return nodesData
 
+    def _createBuildingModelData(self, nodesData):
+        # internal gains read from a scenario directory (see readScenarioDirectory) instead of the csv file
+        internalGains = nodesData.pop("internal_gains", None)
         nodesData["building_model"] = pd.DataFrame()
         nodesData["building_model"]["tAmb"] = np.array(nodesData["weather_data"]["tre200h0"])
         nodesData["building_model"]["IrrH"] = np.array(nodesData["weather_data"]["gls"])/1000       # conversion from W/m2 to kW/m2
         if (nodesData['demand']['building model'].notna().any()) and (nodesData['demand']['building model'] == 'Yes').any():
-            nodesData["building_model"]["Qocc"] = np.array(pd.read_csv(r"..\excels\Internal_gains.csv", delimiter=';', header=0)["Total (kW)"])
+            if internalGains is None:
+                internalGains = pd.read_csv(r"..\excels\Internal_gains.csv", delimiter=';', header=0)
+            nodesData["building_model"]["Qocc"] = np.array(internalGains[internalGainsColumn])
         else:
             logging.info("Building model either not selected or invalid string value entered")
-        logging.info("Data from Excel file {} imported.".format(filePath))
-        return nodesData
 
     def _convertNodes(self, data, opt, mergeLinkBuses):
         if not data:
             logging.error("Nodes data is missing.")
         ################## !!!
-        self.__temperatureAmb = np.array(data["weather_data"]["tre200h0"])
-        self.__temperatureGround = np.array(data["weather_data"]["ground_temp"])
+        self._addTimeSeries(data)
+        self.__temperatureAmb = self._timeSeries["weather/tre200h0"]
+        self.__temperatureGround = self._timeSeries["weather/ground_temp"]
         self.__temperatureSH = data["stratified_storage"].loc["shStorage", "temp_h"]
         self.__temperatureDHW = data["stratified_storage"].loc["dhwStorage", "temp_h"]
         # Transformers conversion factors input power - output power
@@ -204,28 +448,33 @@ class EnergyNetworkClass(solph.EnergySystem):
         self.__Ldhw = 4.186 * (self.__temperatureDHW - data["stratified_storage"].loc["dhwStorage", "temp_c"]) / 3600
         self._addBuildings(data, opt, mergeLinkBuses)
 
+    def _addTimeSeries(self, data):
+        self._timeSeries.addFrame("weather", data["weather_data"], ["tre200h0", "gls", "str.diffus", "ground_temp"])
+        self._timeSeries.add("electricity/cost", data["electricity_cost"]["cost"])
+        self._timeSeries.add("electricity/impact", data["electricity_impact"]["impact"])
+        self._timeSeries.addFrame("buildingModel", data["building_model"])
+        for i, demandProfiles in data["demandProfiles"].items():
+            self._timeSeries.addFrame(f"demand/Building{i}", demandProfiles)
+        self._timeSeries.logSummary()
+
     def _addBuildings(self, data, opt, mergeLinkBuses):
         numberOfBuildings = max(data["buses"]["building"])
+        buildingsData = _splitByBuilding(data, numberOfBuildings)
         self.__buildings = [Building('Building' + str(i + 1)) for i in range(numberOfBuildings)]
+        if mergeLinkBuses:
+            # the link buses of the other buildings are those of Building1, the buildings are added one after the other
+            busDictBuilding1 = self._addBuilding(self.__buildings[0], buildingsData[1], data["stratified_storage"], opt, mergeLinkBuses)
+            for b in self.__buildings[1:]:
+                self._addBuilding(b, buildingsData[int(b.getBuildingLabel()[8:])], data["stratified_storage"], opt,
+                                  mergeLinkBuses, busDictBuilding1)
+        else:
+            # the buildings are independent from each other, they are added by a pool of threads
+            with ThreadPoolExecutor(max_workers=self._maxWorkers) as executor:
+                list(executor.map(lambda b: self._addBuilding(b, buildingsData[int(b.getBuildingLabel()[8:])],
+                                                              data["stratified_storage"], opt, mergeLinkBuses),
+                                  self.__buildings))
         for b in self.__buildings:
             buildingLabel = b.getBuildingLabel()
-            i = int(buildingLabel[8:])
-            if i == 1:
-                busDictBuilding1 = b.addBus(data["buses"][data["buses"]["building"] == i], opt, mergeLinkBuses)
-            else:
-                b.addBus(data["buses"][data["buses"]["building"] == i], opt, mergeLinkBuses)
-            if mergeLinkBuses and i!=1:
-                b.addToBusDict(busDictBuilding1)
-            b.addGridSeparation(data["grid_connection"][data["grid_connection"]["building"] == i], mergeLinkBuses)
-            b.addSource(data["commodity_sources"][data["commodity_sources"]["building"] == i], data["electricity_impact"], data["electricity_cost"], opt)
-            b.addSink(data["demand"][data["demand"]["building"] == i], data["demandProfiles"][i], data["building_model"], mergeLinkBuses)
-            b.addTransformer(data["transformers"][data["transformers"]["building"] == i], self.__temperatureDHW,
-                             self.__temperatureSH, self.__temperatureAmb, self.__temperatureGround, opt, mergeLinkBuses, self._dispatchMode)
-            #if any(data["transformers"]["label"] == "HP") or any(data["transformers"]["label"] == "GWHP"):   #add electricity rod if HP or GSHP is present in the available technology pool
-            #    b.addElectricRodBackup(opt)
-            b.addStorage(data["storages"][data["storages"]["building"] == i], data["stratified_storage"], opt, mergeLinkBuses, self._dispatchMode)
-            b.addSolar(data["solar"][(data["solar"]["building"] == i) & (data["solar"]["label"] == "solarCollector")], data["weather_data"], opt, mergeLinkBuses, self._dispatchMode)
-            b.addPV(data["solar"][(data["solar"]["building"] == i) & (data["solar"]["label"] == "pv")], data["weather_data"], opt, self._dispatchMode)
             self._nodesList.extend(b.getNodesList())
             self.__inputs[buildingLabel] = b.getInputs()
             self.__technologies[buildingLabel] = b.getTechnologies()
@@ -237,6 +486,27 @@ class EnergyNetworkClass(solph.EnergySystem):
             self.__envImpactInputs[buildingLabel] = {}
             self.__opex[buildingLabel] = {}
             self.__envImpactTechnologies[buildingLabel] = {}
+        solarProfiles.logStatistics()
+        copProfiles.logStatistics()
+
+    def _addBuilding(self, b, buildingData, stratifiedStorage, opt, mergeLinkBuses, busDictBuilding1=None):
+        """adds the components of a building from its sheets (see _splitByBuilding) and returns its bus dictionary
+        busDictBuilding1 is the bus dictionary of Building1 whose link buses are shared if mergeLinkBuses is True"""
+        busDict = b.addBus(buildingData["buses"], opt, mergeLinkBuses)
+        if busDictBuilding1 is not None:
+            b.addToBusDict(busDictBuilding1)
+        b.addGridSeparation(buildingData["grid_connection"], mergeLinkBuses)
+        b.addSource(buildingData["commodity_sources"], self._timeSeries, opt)
+        b.addSink(buildingData["demand"], self._timeSeries, mergeLinkBuses)
+        b.addTransformer(buildingData["transformers"], self.__temperatureDHW,
+                         self.__temperatureSH, self.__temperatureAmb, self.__temperatureGround, opt, mergeLinkBuses, self._dispatchMode)
+        #if any(data["transformers"]["label"] == "HP") or any(data["transformers"]["label"] == "GWHP"):   #add electricity rod if HP or GSHP is present in the available technology pool
+        #    b.addElectricRodBackup(opt)
+        b.addStorage(buildingData["storages"], stratifiedStorage, opt, mergeLinkBuses, self._dispatchMode)
+        solar = buildingData["solar"]
+        b.addSolar(solar[solar["label"] == "solarCollector"], self._timeSeries, opt, mergeLinkBuses, self._dispatchMode)
+        b.addPV(solar[solar["label"] == "pv"], self._timeSeries, opt, self._dispatchMode)
+        return busDict
 
     def printNodes(self):
         print("*********************************************************")
@@ -249,14 +519,312 @@ class EnergyNetworkClass(solph.EnergySystem):
     def optimize(self, numberOfBuildings, solver, envImpactlimit=1000000, clusterSize={},
                  options=None,   # solver options
                  optConstraints=None, #optional constraints (implemented for the moment are "roof area"
-                 mergeLinkBuses=False):
+                 mergeLinkBuses=False,
+                 profilePhases=None,    # phases to be profiled, e.g. {"buildModel": "cProfile"} (see getPhaseReport)
+                 lpWarmStart=False,     # warm start the MILP from the solution of the dispatchMode LP (see _lpInvestments)
+                 fixUnusedTechnologies=False,   # with lpWarmStart, technologies not used by the LP are fixed to zero
+                 periodSequence=None):  # with clusterSize, representative period of each original period (see _addCustomConstraints)
 
         if options is None:
-            options = {"gurobi": {"MIPGap": 0.01}}
+            options = defaultSolverOptions
+        self._profiler.profilePhases(profilePhases)
+
+        if lpWarmStart and self._dispatchMode:
+            logging.warning("The energy network is already in dispatch mode, the LP warm start is skipped")
+            lpWarmStart = False
+        if lpWarmStart:
+            with self._profiler.phase("lpRelaxation"):
+                lpInvestments = self._lpInvestments(numberOfBuildings, solver, options.get(solver, {}), envImpactlimit,
+                                                    clusterSize, optConstraints, periodSequence)
+
+        optimizationModel, transformerFlowCapacityDict, storageCapacityDict = self._buildOptimizationModel(
+            numberOfBuildings, envImpactlimit, clusterSize, optConstraints, periodSequence)
+
+        if solver == "gurobi":
+            logging.info("Initiating optimization using {} solver".format(solver))
 
-        optimizationModel = solph.Model(self)
+        with self._profiler.phase("solve"):
+            if lpWarmStart:
+                self._setInitialInvestments(optimizationModel, lpInvestments, fixUnusedTechnologies)
+                opt = self._createSolver(solver, options.get(solver, {}))
+                # the solvers without warm start still benefit from the technologies fixed to zero
+                solveArgs = {"warmstart": True} if opt.warm_start_capable() else {}
+                self._solve(optimizationModel, solver, options.get(solver, {}), opt=opt, **solveArgs)
+            else:
+                self._solve(optimizationModel, solver, options.get(solver, {}))
+
+        # obtain the value of the environmental impact (subject to the limit constraint)
+        # the optimization imposes an integral limit constraint on the environmental impacts
+        # total environmental impacts <= envImpactlimit
+        envImpact = optimizationModel.totalEnvironmentalImpact()
+
+        capacitiesTransformersNetwork, capacitiesStoragesNetwork = self._collectResults(
+            optimizationModel, transformerFlowCapacityDict, storageCapacityDict, clusterSize, mergeLinkBuses)
+        self._profiler.logReport()
+
+        return envImpact, capacitiesTransformersNetwork, capacitiesStoragesNetwork
+
+    def optimizeTwoStage(self, numberOfBuildings, solver, clusterSize, timestamp, envImpactlimit=1000000, options=None,
+                         optConstraints=None, mergeLinkBuses=False, periodSequence=None):
+        """
+        two-stage optimization: the capacities are optimized on the representative days (stage one, this energy network
+        set with clusterSize), then the operation of the full period is optimized with these capacities fixed (stage
+        two, the same scenario set without clusters in dispatch mode, which is an LP)
+        :param clusterSize: representative days and their weights (as in optimize)
+        :param timestamp: time index of the full period (e.g. the whole year) of the second stage
+        :param periodSequence: representative period of each original period, to link the storage contents in stage
+               one (as in optimize)
+        :return: kpis: environmental impact (of the limit constraint), total costs and total environmental impacts of
+                 both stages as a DataFrame with the columns 'investment' (stage one, extrapolated from the
+                 representative days) and 'dispatch' (stage two),
+                 capacitiesTransformers and capacitiesStorages optimized in stage one (as returned by optimize),
+                 dispatchNetwork: energy network of stage two with its results (e.g. for exportToExcel). If the
+                 operation of the full period is infeasible with these capacities, the KPIs of stage two are NaN
+        """
+        if not clusterSize:
+            raise ValueError("The two-stage optimization requires the clusters of the representative days (clusterSize)")
+        if self._scenario is None:
+            raise ValueError("The two-stage optimization requires an energy network set with setFromExcel or "
+                             "setFromDirectory")
+        if options is None:
+            options = defaultSolverOptions
+        logging.info("Two-stage optimization, stage one: investment on the representative days")
+        envImpact, capacitiesTransformers, capacitiesStorages = self.optimize(
+            numberOfBuildings, solver, envImpactlimit=envImpactlimit, clusterSize=clusterSize, options=options,
+            optConstraints=optConstraints, mergeLinkBuses=mergeLinkBuses, periodSequence=periodSequence)
+        kpis = {"investment": {"envImpact": envImpact, "costs": self.getTotalCosts(),
+                               "totalEnvImpacts": self.getTotalEnvImpacts()}}
+        capacities = self.getInvestedCapacities()
+
+        logging.info("Two-stage optimization, stage two: dispatch of the full period with fixed capacities")
+        dispatchNetwork = type(self)._fromScenario(timestamp, self._scenario, clusterSize={}, dispatchMode=True)
+        optimizationModel, transformerFlowCapacityDict, storageCapacityDict = dispatchNetwork._buildOptimizationModel(
+            numberOfBuildings, envImpactlimit, {}, optConstraints)
+        dispatchNetwork._fixInvestments(optimizationModel, capacities, transformerFlowCapacityDict, storageCapacityDict)
+        with dispatchNetwork._profiler.phase("solve"):
+            solverResults = dispatchNetwork._solve(optimizationModel, solver, options.get(solver, {}))
+        if str(solverResults["Solver"][0]["Termination condition"]) in failedTerminationConditions:
+            # e.g. a peak demand of the full period which is not in the representative days
+            logging.error("The capacities of stage one are not sufficient for the operation of the full period, "
+                          "the representative days should include the peak demands (see peakSeries of "
+                          "TypicalDays.cluster)")
+            kpis["dispatch"] = {k: np.nan for k in kpis["investment"]}
+        else:
+            kpis["dispatch"] = {"envImpact": optimizationModel.totalEnvironmentalImpact()}
+            dispatchNetwork._collectResults(optimizationModel, transformerFlowCapacityDict, storageCapacityDict, {},
+                                            mergeLinkBuses)
+            kpis["dispatch"].update({"costs": dispatchNetwork.getTotalCosts(),
+                                     "totalEnvImpacts": dispatchNetwork.getTotalEnvImpacts()})
+        dispatchNetwork._profiler.logReport()
+
+        return pd.DataFrame(kpis), capacitiesTransformers, capacitiesStorages, dispatchNetwork
+
+    def getInvestedCapacities(self):
+        """returns the invested capacities of the optimized energy network in the units of the model, indexed by the
+        labels of the nodes ((input, output) for the flows, (storage,) for the storages), e.g. to fix the capacities of
+        a dispatch (see optimizeRollingHorizon)"""
+        return {tuple(str(n) for n in nodes if n is not None): result["scalars"]["invest"]
+                for nodes, result in self._optimizationResults.items() if "invest" in result["scalars"]}
+
+    def optimizeRollingHorizon(self, numberOfBuildings, solver, capacities, windowLength="7D", lookAhead="1D",
+                               envImpactlimit=1000000, options=None, optConstraints=None, mergeLinkBuses=False,
+                               workers=1, capacityMargin=0):
+        """
+        dispatch of the time period of this energy network with the capacities of the technologies fixed, solved in
+        overlapping windows (rolling horizon) instead of a single model of the whole period (see RollingHorizonDispatch)
+        :param capacities: invested capacities indexed by the labels of the nodes (see getInvestedCapacities)
+        :param windowLength: duration of the windows whose operation is kept, e.g. "7D"
+        :param lookAhead: duration optimized after each window and discarded, e.g. "1D"
+        :param envImpactlimit: limit of the environmental impacts of each window
+        :param workers: number of processes solving the windows, with more than one process the windows are decoupled
+               (the initial content of the storages of each window is free and balanced instead of the content at the
+               end of the previous window)
+        :param capacityMargin: relative margin added to the capacities, e.g. 0.1 if a window is infeasible with the
+               capacities of an optimization of the whole period (the windows do not see the demands after their
+               look-ahead and have no unmet demand)
+        :return: capacitiesTransformers and capacitiesStorages (as returned by optimize, margin included) and the
+                 statistics of the windows as a DataFrame, the capacities are None if a window failed
+        """
+        dispatch = RollingHorizonDispatch(self, numberOfBuildings, solver, capacities, windowLength=windowLength,
+                                          lookAhead=lookAhead, envImpactlimit=envImpactlimit, options=options,
+                                          optConstraints=optConstraints, mergeLinkBuses=mergeLinkBuses,
+                                          capacityMargin=capacityMargin)
+        return dispatch.run(workers)
+
+    def _setStorageContents(self, optimizationModel, initialContents, finalContents):
+        """replaces the balance of the storages (content at the last timestep equal to the initial content) by fixed
+        contents indexed by the labels of the storages: the initial contents (e.g. the contents at the end of the
+        previous window of a rolling horizon) and the contents at the last timestep"""
+        if not hasattr(optimizationModel, "GenericInvestmentStorageBlock"):
+            return
+        block = optimizationModel.GenericInvestmentStorageBlock
+        lastTimestep = optimizationModel.TIMESTEPS[-1]
+        for n in block.INVESTSTORAGES:
+            if n in block.balanced_cstr:
+                block.balanced_cstr[n].deactivate()
+            if str(n) in initialContents:
+                for constraint in [block.init_content_fix, block.init_content_limit]:
+                    if n in constraint:
+                        constraint[n].deactivate()
+                block.init_content[n].fix(max(initialContents[str(n)], 0))
+            if str(n) in finalContents:
+                block.storage_content[n, lastTimestep].fix(max(finalContents[str(n)], 0))
+
+    def _releaseInitialStorageContents(self, optimizationModel):
+        """frees the initial contents of the storages, which are otherwise fixed by the initial storage levels of the
+        scenario, the storages remaining balanced (content at the last timestep equal to the initial content), e.g. for
+        the decoupled windows of a rolling horizon"""
+        if not hasattr(optimizationModel, "GenericInvestmentStorageBlock"):
+            return
+        block = optimizationModel.GenericInvestmentStorageBlock
+        for n in block.INVESTSTORAGES:
+            if n in block.init_content_fix:
+                block.init_content_fix[n].deactivate()
+
+    def _fixInvestments(self, optimizationModel, capacities, transformerFlowCapacityDict, storageCapacityDict,
+                        tolerance=1e-6):
+        """fixes the invest variables of the technologies (the transformers, solar and storages of the capacity
+        dictionaries) to the capacities indexed by the labels of the nodes, the other investments (e.g. links) remain
+        variables. The capacities are increased by the relative tolerance, as the values read from the solver are rounded
+        and a capacity sized on the peak demand would otherwise be slightly too small. The lower bound of the invest
+        variables (minimum capacity, e.g. in dispatch mode) is removed so that a technology which was not invested can
+        be fixed to 0"""
+        invest = [(optimizationModel.InvestmentFlow.invest[i, o], capacities.get((str(i), str(o)), 0))
+                  for i, o in transformerFlowCapacityDict]
+        invest += [(optimizationModel.GenericInvestmentStorageBlock.invest[x], capacities.get((str(x),), 0))
+                   for x in storageCapacityDict]
+        for variable, capacity in invest:
+            variable.setlb(0)
+            variable.fix(capacity * (1 + tolerance))
+        logging.info("Capacities of {} technologies fixed".format(len(transformerFlowCapacityDict) + len(storageCapacityDict)))
+
+    def createParetoRunner(self, numberOfBuildings, solver, clusterSize={}, options=None, optConstraints=None,
+                           mergeLinkBuses=False, persistent=True, periodSequence=None):
+        """
+        returns a ParetoRunner computing the pareto front of costs and environmental impacts of the energy network with
+        the epsilon constraint method, the optimization model being built only once (see ParetoRunner)
+        """
+        return ParetoRunner(self, numberOfBuildings, solver, clusterSize=clusterSize, options=options,
+                            optConstraints=optConstraints, mergeLinkBuses=mergeLinkBuses, persistent=persistent,
+                            periodSequence=periodSequence)
+
+    def _buildOptimizationModel(self, numberOfBuildings, envImpactlimit, clusterSize, optConstraints, periodSequence=None):
+        with self._profiler.phase("buildModel"):
+            optimizationModel = solph.Model(self)
+            getFlowRegistry(optimizationModel)      # index of the flows used by the custom constraints
         logging.info("Optimization model built successfully")
 
+        with self._profiler.phase("customConstraints"):
+            optimizationModel, transformerFlowCapacityDict, storageCapacityDict = self._addCustomConstraints(
+                optimizationModel, numberOfBuildings, envImpactlimit, clusterSize, optConstraints, periodSequence)
+
+        logging.info("Custom constraints successfully added to the optimization model")
+        return optimizationModel, transformerFlowCapacityDict, storageCapacityDict
+
+    @classmethod
+    def _fromScenario(cls, timestamp, scenario, timeincrement=None, firstRow=0, **changes):
+        """defines a new energy network from the arguments of setFromExcel or setFromDirectory recorded in scenario,
+        changes replace some of these arguments (e.g. dispatchMode=True), firstRow: first row of the time series used
+        (e.g. the position of a window of the rolling horizon in the time period of the dispatched energy network)"""
+        network = cls(timestamp, timeincrement=timeincrement)
+        network._firstRow = firstRow
+        setArgs = {k: scenario[k] for k in ["clusterSize", "opt", "mergeLinkBuses", "dispatchMode"]}
+        if scenario["method"] == "setFromExcel":
+            setArgs["cache"] = scenario["cache"]
+            setArgs["demandProfilesPattern"] = scenario["demandProfilesPattern"]
+        setArgs.update(changes)
+        getattr(network, scenario["method"])(scenario["path"], scenario["numberOfBuildings"], **setArgs)
+        return network
+
+    def _lpInvestments(self, numberOfBuildings, solver, cmdlineOptions, envImpactlimit, clusterSize, optConstraints,
+                       periodSequence=None):
+        """
+        solves the LP relaxation of the energy network, i.e. the same scenario set with dispatchMode=True (investments
+        without nonconvex and offset, the minimum capacities being then always invested)
+        :return: dictionary of (invested capacity, use) of the investment flows indexed by the labels (input, output) and
+                 of the storages indexed by the label, the use being the sum of the flow (of the storage content for
+                 the storages) over the timesteps
+        """
+        if self._scenario is None:
+            raise ValueError("The LP warm start requires an energy network set with setFromExcel or setFromDirectory")
+        logging.info("Solving the LP relaxation (dispatch mode) of the energy network")
+        network = type(self)._fromScenario(self.timeindex, self._scenario, self._timeincrement, dispatchMode=True)
+        optimizationModel, _, _ = network._buildOptimizationModel(numberOfBuildings, envImpactlimit, clusterSize,
+                                                                  optConstraints, periodSequence)
+        network._solve(optimizationModel, solver, cmdlineOptions)
+        timesteps = list(optimizationModel.TIMESTEPS)
+        investments = {}
+        if hasattr(optimizationModel, "InvestmentFlow"):
+            block = optimizationModel.InvestmentFlow
+            for i, o in block.INVESTFLOWS:
+                investments[(str(i), str(o))] = (block.invest[i, o].value,
+                                                 sum(optimizationModel.flow[i, o, t].value or 0 for t in timesteps))
+        if hasattr(optimizationModel, "GenericInvestmentStorageBlock"):
+            block = optimizationModel.GenericInvestmentStorageBlock
+            for n in block.INVESTSTORAGES:
+                investments[str(n)] = (block.invest[n].value,
+                                       sum(block.storage_content[n, t].value or 0 for t in timesteps))
+        logging.info("LP relaxation solved, objective: {}".format(optimizationModel.objective()))
+        return investments
+
+    def _setInitialInvestments(self, optimizationModel, lpInvestments, fixUnused, tolerance=1e-7):
+        """
+        sets the initial values of the invest variables (and of the binaries of the nonconvex investments) to the
+        solution of the LP relaxation (see _lpInvestments). A technology is unused if neither its use nor its capacity
+        above the minimum capacity exceed tolerance in the LP. As these technologies carry no flow in the LP solution,
+        fixing them to zero keeps the MILP feasible
+        :param fixUnused: if True, the unused technologies are fixed to zero in the MILP
+        """
+        investments = []
+        if hasattr(optimizationModel, "InvestmentFlow"):
+            block = optimizationModel.InvestmentFlow
+            investments.extend((block, (i, o), (str(i), str(o)), optimizationModel.flows[i, o].investment,
+                                (i, o) in block.NON_CONVEX_INVESTFLOWS) for i, o in block.INVESTFLOWS)
+        if hasattr(optimizationModel, "GenericInvestmentStorageBlock"):
+            block = optimizationModel.GenericInvestmentStorageBlock
+            investments.extend((block, n, str(n), n.investment, n in block.NON_CONVEX_INVESTSTORAGES)
+                               for n in block.INVESTSTORAGES)
+        unused = nonconvexInvestments = 0
+        for block, index, label, investment, nonconvex in investments:
+            if label not in lpInvestments:
+                continue
+            capacity, use = lpInvestments[label]
+            if not nonconvex:
+                block.invest[index].value = capacity
+                continue
+            nonconvexInvestments += 1
+            used = use > tolerance or capacity > investment.minimum + tolerance
+            block.invest[index].value = capacity if used else 0
+            block.invest_status[index].value = int(used)
+            if not used:
+                unused += 1
+                if fixUnused:
+                    block.invest[index].fix(0)
+                    block.invest_status[index].fix(0)
+        logging.info("Initial investments set from the LP relaxation: {} of {} technologies unused{}".format(
+            unused, nonconvexInvestments, " (fixed to zero)" if fixUnused else ""))
+
+    def _collectResults(self, optimizationModel, transformerFlowCapacityDict, storageCapacityDict, clusterSize, mergeLinkBuses):
+        with self._profiler.phase("processResults"), detachedInterPeriodStorage(optimizationModel):
+            self._optimizationResults = solph.processing.results(optimizationModel)
+            self._metaResults = solph.processing.meta_results(optimizationModel)
+        logging.info("Optimization successful and results collected")
+
+        with self._profiler.phase("calculateResultsPerBuilding"):
+            # calculate capacities invested for transformers and storages (for the entire energy network and per building)
+            capacitiesTransformersNetwork, capacitiesStoragesNetwork = self._calculateInvestedCapacities(optimizationModel, transformerFlowCapacityDict, storageCapacityDict)
+
+            if clusterSize:
+                self._postprocessingClusters(clusterSize)
+            if self._timeincrement is not None:
+                self._postprocessingSegments()
+
+            # calculate results (CAPEX, OPEX, FeedIn Costs, environmental impacts etc...) for each building
+            self._calculateResultsPerBuilding(mergeLinkBuses)
+        return capacitiesTransformersNetwork, capacitiesStoragesNetwork
+
+    def _addCustomConstraints(self, optimizationModel, numberOfBuildings, envImpactlimit, clusterSize, optConstraints,
+                              periodSequence=None):
         # add constraint to limit the environmental impacts
         optimizationModel, flows, transformerFlowCapacityDict, storageCapacityDict = environmentalImpactlimit(
             optimizationModel, keyword1="env_per_flow", keyword2="env_per_capa", limit=envImpactlimit)
@@ -282,35 +850,87 @@ class EnergyNetworkClass(solph.EnergySystem):
         if not np.isnan(self.__elRodEff):
             optimizationModel = electricRodCapacityConstaint(optimizationModel, numberOfBuildings)
 
-        if clusterSize:
-            optimizationModel = dailySHStorageConstraint(optimizationModel)
-
-        logging.info("Custom constraints successfully added to the optimization model")
-
-        if solver == "gurobi":
-            logging.info("Initiating optimization using {} solver".format(solver))
-
-        optimizationModel.solve(solver=solver, cmdline_options=options[solver])
-
-        # obtain the value of the environmental impact (subject to the limit constraint)
-        # the optimization imposes an integral limit constraint on the environmental impacts
-        # total environmental impacts <= envImpactlimit
-        envImpact = optimizationModel.totalEnvironmentalImpact()
-
-        self._optimizationResults = solph.processing.results(optimizationModel)
-        self._metaResults = solph.processing.meta_results(optimizationModel)
-        logging.info("Optimization successful and results collected")
-
-        # calculate capacities invested for transformers and storages (for the entire energy network and per building)
-        capacitiesTransformersNetwork, capacitiesStoragesNetwork = self._calculateInvestedCapacities(optimizationModel, transformerFlowCapacityDict, storageCapacityDict)
-
-        if clusterSize:
-            self._postprocessingClusters(clusterSize)
-
-        # calculate results (CAPEX, OPEX, FeedIn Costs, environmental impacts etc...) for each building
-        self._calculateResultsPerBuilding(mergeLinkBuses)
-
-        return envImpact, capacitiesTransformersNetwork, capacitiesStoragesNetwork
+        if clusterSize and periodSequence is not None:
+            # the content of all the storages is linked across the representative periods following the sequence of the
+            # original periods, which makes seasonal storage visible to the clustered model
+            optimizationModel = interPeriodStorageConstraint(optimizationModel, self._timestepsPerCluster(clusterSize),
+                                                             self._periodIndices(clusterSize, periodSequence))
+            logging.info("Storage contents linked across {} original periods".format(len(periodSequence)))
+        elif clusterSize:
+            # the content of the SH storages is reset every two days (at least at every boundary of the periods, which
+            # are not consecutive)
+            timestepsPerPeriod = self._timestepsPerCluster(clusterSize)
+            periodsPerReset = max(1, round(pd.Timedelta(days=2) / (timestepsPerPeriod * self._timestepLength())))
+            optimizationModel = dailySHStorageConstraint(optimizationModel, timestepsPerPeriod, periodsPerReset)
+        return optimizationModel, transformerFlowCapacityDict, storageCapacityDict
+
+    def _periodIndices(self, clusterSize, periodSequence):
+        """indices of the representative periods of clusterSize (in the order of the time index) of periodSequence, the
+        list of the keys of clusterSize of each original period in chronological order"""
+        positions = {pd.Timestamp(d): k for k, d in enumerate(clusterSize)}
+        try:
+            indices = [positions[pd.Timestamp(d)] for d in periodSequence]
+        except KeyError as e:
+            raise ValueError("The period {} of periodSequence is not a representative period of clusterSize".format(e))
+        counts = np.bincount(indices, minlength=len(clusterSize))
+        if list(counts) != list(clusterSize.values()):
+            logging.warning("The number of periods of periodSequence represented by each representative period differs "
+                            "from clusterSize")
+        return indices
+
+    def _createSolver(self, solver, cmdlineOptions, persistent=False):
+        """creates the solver interface (the persistent interface of the solver if persistent is True and the solver has
+        one, None otherwise), the writing of the problem, the solver run and the reading of the solution are recorded as
+        separate phases"""
+        if persistent:
+            if solver + "_persistent" not in SolverFactory:
+                return None
+            opt = SolverFactory(solver + "_persistent")
+            if not isinstance(opt, PersistentSolver) or not opt.available(exception_flag=False):
+                return None
+        elif solver == "highs":
+            opt = HighsSolver()     # model passed in memory
+        else:
+            opt = SolverFactory(solver, solver_io="lp")
+        for k in cmdlineOptions:
+            opt.options[k] = cmdlineOptions[k]
+        opt._presolve = self._profiler.wrap("writeSolverFile", opt._presolve)
+        opt._apply_solver = self._profiler.wrap("runSolver", opt._apply_solver)
+        opt._postsolve = self._profiler.wrap("readSolution", opt._postsolve)
+        return opt
+
+    def _solve(self, optimizationModel, solver, cmdlineOptions, opt=None, **solveArgs):
+        """solves the optimization model as solph.Model.solve does, with the solver interface opt if given (e.g. a
+        persistent solver whose instance is set), solveArgs are passed to the solve method of the solver interface"""
+        if opt is None:
+            opt = self._createSolver(solver, cmdlineOptions)
+
+        solverResults = opt.solve(optimizationModel, **solveArgs)
+
+        status = solverResults["Solver"][0]["Status"]
+        terminationCondition = solverResults["Solver"][0]["Termination condition"]
+        if status == "ok" and terminationCondition == "optimal":
+            logging.info("Optimization successful...")
+        else:
+            warnings.warn("Optimization ended with status {0} and termination condition {1}".format(status, terminationCondition),
+                          UserWarning)
+        self.results = solverResults
+        optimizationModel.solver_results = solverResults
+        return solverResults
+
+    def getPhaseReport(self):
+        """returns the wall time (s), CPU time (s) and peak memory (MB) of each phase of the definition of the energy
+        network and of the optimization (see PhaseProfiler.getReport)"""
+        return self._profiler.getReport()
+
+    def getPhaseProfile(self, phase):
+        """returns the profile of a phase profiled using the profilePhases parameter (pstats.Stats for cProfile, session
+        for pyinstrument)"""
+        return self._profiler.getProfile(phase)
+
+    def exportPhaseReport(self, filePath):
+        """writes the phase report (see getPhaseReport) as a json file"""
+        self._profiler.exportReport(filePath)
 
     def _updateCapacityDictInputInvestment(self, transformerFlowCapacityDict):
         components = ["CHP", "GWHP", "HP", "GasBoiler", "ElectricRod"]
@@ -432,13 +1052,35 @@ class EnergyNetworkClass(solph.EnergySystem):
                 capacitiesStorages[storage] = capacitiesStorages[storage] / self.__Ldhw
         return capacitiesStorages
 
+    def _timestepsPerCluster(self, clusterSize):
+        """number of timesteps of each representative period, the time index being the concatenation of the clusters"""
+        timesteps = len(self.timeindex)
+        if timesteps % len(clusterSize):
+            raise ValueError("The number of timesteps ({}) is not a multiple of the number of clusters ({})"
+                             .format(timesteps, len(clusterSize)))
+        return timesteps // len(clusterSize)
+
+    def _timestepLength(self):
+        """duration of a timestep of the time index"""
+        if self.timeindex.freq is not None:
+            return pd.Timedelta(self.timeindex.freq)
+        return self.timeindex[1] - self.timeindex[0]
+
     def _postprocessingClusters(self, clusterSize):
         flows = [x for x in self._optimizationResults.keys() if x[1] is not None]
-        mfactor = np.repeat(list(clusterSize.values()), 24)
+        mfactor = np.repeat(list(clusterSize.values()), self._timestepsPerCluster(clusterSize))
         for flow in flows:
             self._optimizationResults[flow]['sequences'] = self._optimizationResults[flow]['sequences'].mul(mfactor, axis=0)
 
 
+    def _postprocessingSegments(self):
+        # the flows of the segments are mean powers, they are converted into the energy of the segments (kWh per
+        # segment instead of kWh per hour) so that the sums over the sequences are the energies of the whole period
+        flows = [x for x in self._optimizationResults.keys() if x[1] is not None]
+        mfactor = np.asarray(self._timeincrement, dtype=float)
+        for flow in flows:
+            self._optimizationResults[flow]['sequences'] = self._optimizationResults[flow]['sequences'].mul(mfactor, axis=0)
+
     def _calculateResultsPerBuilding(self, mergeLinkBuses):
         for b in self.__buildings:
             buildingLabel = b.getBuildingLabel()
@@ -659,6 +1301,10 @@ class EnergyNetworkClass(solph.EnergySystem):
         return envImpactTechnologiesNetwork + envImpactInputsNetwork
 
     def exportToExcel(self, file_name, mergeLinkBuses=False):
+        with self._profiler.phase("exportToExcel"):
+            self._exportToExcel(file_name, mergeLinkBuses)
+
+    def _exportToExcel(self, file_name, mergeLinkBuses):
         for i in range(1, self.__noOfBuildings+1):
             self.calcStateofCharge("shStorage", f"Building{i}")
         with pd.ExcelWriter(file_name) as writer:
@@ -858,6 +1504,8 @@ class EnergyNetworkIndiv(EnergyNetworkClass):
 
 
 class EnergyNetworkGroup(EnergyNetworkClass):
+    _extraSheets = ("links",)
+
     def createScenarioFile(self, configFilePath, excelFilePath, numberOfBuildings):
         """function to create the input excel file from a config file
         saves the generated excel file at the path given by excelFilePath"""
@@ -1030,43 +1678,9 @@ class EnergyNetworkGroup(EnergyNetworkClass):
             writer.save()
             writer.close()
 
-    def setFromExcel(self, filePath, numberOfBuildings, clusterSize={}, opt="costs", mergeLinkBuses=False, dispatchMode = False):
-        # does Excel file exist?
-        if not filePath or not os.path.isfile(filePath):
-            logging.error("Excel data file {} not found.".format(filePath))
-        logging.info("Defining the energy network from the excel file: {}".format(filePath))
-        self._dispatchMode = dispatchMode
-        data = pd.ExcelFile(filePath)
-
-        nodesData = self.createNodesData(data, filePath, numberOfBuildings)
-        # nodesData["buses"]["excess costs"] = nodesData["buses"]["excess costs group"]
-        # nodesData["electricity_cost"]["cost"] = nodesData["electricity_cost"]["cost group"]
-
-        demandProfiles = {}
-        if clusterSize:
-            for i in range(1, numberOfBuildings + 1):
-                demandProfiles[i] = pd.concat(
-                    [nodesData["demandProfiles"][i].loc[d] for d in clusterSize.keys()])
-            electricityImpact = pd.concat(
-                [nodesData["electricity_impact"].loc[d] for d in clusterSize.keys()])
-            electricityCost = pd.concat(
-                [nodesData["electricity_cost"].loc[d] for d in clusterSize.keys()])
-            weatherData = pd.concat([nodesData['weather_data'][
-                                         nodesData['weather_data']['time.mm'] == int(d.split('-')[1])][
-                                         nodesData['weather_data']['time.dd'] == int(d.split('-')[2])][['gls', 'str.diffus', 'tre200h0', 'ground_temp']] for d in clusterSize.keys()])
-
-            nodesData["demandProfiles"] = demandProfiles
-            nodesData["electricity_impact"] = electricityImpact
-            nodesData["electricity_cost"] = electricityCost
-            nodesData["weather_data"] = weatherData
-
-        nodesData["links"]= data.parse("links")
-        self._convertNodes(nodesData, opt, mergeLinkBuses)
-        self._addLinks(nodesData["links"], numberOfBuildings, mergeLinkBuses)
-        logging.info("Nodes from Excel file {} successfully converted".format(filePath))
-        self.add(*self._nodesList)
-        logging.info("Nodes successfully added to the energy network")
-
+    def _convertNodes(self, data, opt, mergeLinkBuses):
+        super(EnergyNetworkGroup, self)._convertNodes(data, opt, mergeLinkBuses)
+        self._addLinks(data["links"], max(data["buses"]["building"]), mergeLinkBuses)
 
     def _addLinks(self, data, numberOfBuildings, mergeLinkBuses):  # connects buses A and B (denotes a bidirectional link)
         if mergeLinkBuses:
@@ -0,0 +1,89 @@
+import re
+from collections import defaultdict
+
+_labelPattern = re.compile(r"^(.*)__Building(\d+)$")
+
+
+def parseLabel(label):
+    """
+    splits a node label of the form technology__BuildingN into the technology and the building number
+    :param label: node label
+    :return: (technology, building), building is None if the label does not belong to a building (e.g. links or merged
+        link buses)
+    """
+    match = _labelPattern.match(str(label))
+    if match is None:
+        return str(label), None
+    return match.group(1), int(match.group(2))
+
+
+class FlowRegistry:
+    """
+    Index of the flows and storages of an optimization model by building, technology and direction
+
+    The labels of the nodes (technology__BuildingN) are parsed once. A flow (i, o) is registered as an output ('out') of
+    the technology of node i and as an input ('in') of the technology of node o, so that the flows of a technology of a
+    building are obtained without scanning all the flows of the model. The flows are kept in the order of om.flows.
+    Use getFlowRegistry to build the registry of a model only once.
+    """
+
+    def __init__(self, om):
+        self.__flows = defaultdict(list)            # (technology, building, direction) -> list of flows
+        self.__investFlows = defaultdict(list)      # same as __flows for the flows with an investment
+        self.__buildingFlows = defaultdict(list)    # (building, direction) -> list of flows
+        self.__storages = defaultdict(list)         # (technology, building) -> list of investment storages
+        self.__technologies = defaultdict(set)      # building -> technologies
+        labels = {}
+        for (i, o) in om.flows:
+            invest = om.flows[i, o].investment is not None
+            for node, direction in ((i, "out"), (o, "in")):
+                if node not in labels:
+                    labels[node] = parseLabel(node.label)
+                technology, building = labels[node]
+                self.__flows[technology, building, direction].append((i, o))
+                self.__buildingFlows[building, direction].append((i, o))
+                self.__technologies[building].add(technology)
+                if invest:
+                    self.__investFlows[technology, building, direction].append((i, o))
+        if hasattr(om, "GenericInvestmentStorageBlock"):
+            for s in om.GenericInvestmentStorageBlock.INVESTSTORAGES:
+                technology, building = parseLabel(s.label)
+                self.__storages[technology, building].append(s)
+
+    def getFlows(self, technology, building=None, direction="in", invest=False):
+        """
+        :param technology: technology (label of the node without the building suffix), e.g. 'HP' or 'electricityBus'
+        :param building: building number, None for the nodes which do not belong to a building
+        :param direction: 'in' for the input flows of the technology, 'out' for its output flows
+        :param invest: if True only the flows with an investment are returned
+        :return: list of the flows (i, o)
+        """
+        if direction not in ("in", "out"):
+            raise ValueError("Unknown flow direction {}, expected 'in' or 'out'".format(direction))
+        return (self.__investFlows if invest else self.__flows).get((technology, building, direction), [])
+
+    def getBuildingFlows(self, building, direction="out"):
+        """returns the flows (i, o) whose node i ('out') or node o ('in') belongs to the building"""
+        if direction not in ("in", "out"):
+            raise ValueError("Unknown flow direction {}, expected 'in' or 'out'".format(direction))
+        return self.__buildingFlows.get((building, direction), [])
+
+    def getStorages(self, technology, building=None):
+        """returns the investment storages of the technology (e.g. 'shStorage') of the building"""
+        return self.__storages.get((technology, building), [])
+
+    def getTechnologies(self, building=None):
+        """returns the technologies of the nodes of the building (None for the nodes which do not belong to a building)"""
+        return self.__technologies.get(building, set())
+
+    def getBuildings(self):
+        return sorted(b for b in self.__technologies if b is not None)
+
+
+def getFlowRegistry(om):
+    """returns the flow registry of the optimization model, which is built at the first call"""
+    registry = getattr(om, "_flowRegistry", None)
+    if registry is None:
+        registry = FlowRegistry(om)
+        om._flowRegistry = registry
+    return registry
@@ -0,0 +1,206 @@
+import inspect
+import logging
+
+import numpy as np
+from pyomo.core import Constraint, Objective, minimize, value
+from pyomo.core.base.var import _GeneralVarData
+from pyomo.opt import ProblemSense, SolverResults, SolverStatus, TerminationCondition
+from pyomo.repn import generate_standard_repn
+
+try:
+    import highspy
+except ImportError:
+    highspy = None
+
+# names of the usual solver options (gurobi, cbc) which are translated into the corresponding HiGHS options
+highsOptionNames = {"MIPGap": "mip_rel_gap", "ratioGap": "mip_rel_gap", "mipgap": "mip_rel_gap",
+                    "TimeLimit": "time_limit", "sec": "time_limit", "timelimit": "time_limit",
+                    "Threads": "threads"}
+# keyword of set_value skipping the validation of the values of the solution (valid before Pyomo 6)
+_skipValidation = {"skip_validation": True} if "skip_validation" in inspect.signature(_GeneralVarData.set_value).parameters \
+    else {"valid": True}
+# absolute tolerance of the constraints without variables (e.g. the constraints of fixed variables)
+_constantTolerance = 1e-7
+
+
+class HighsSolver:
+    """
+    Solver interface passing the optimization model to HiGHS (highspy) in memory, without writing a problem file
+
+    The active constraints and the objective of the pyomo model are converted into a sparse matrix, the solution is
+    written into the values of the variables and the solver results have the same structure as those of the solvers of
+    pyomo, so that solph.processing.results and solph.processing.meta_results can be used as usual.
+    The options are HiGHS options (e.g. mip_rel_gap, time_limit, threads), the names of highsOptionNames are translated
+    and the option 'tee' shows the output of HiGHS, an option rejected by HiGHS is logged and ignored.
+    With warmstart, the current values of the variables are passed to HiGHS as a (partial) initial solution.
+    The methods _presolve (conversion of the model), _apply_solver (HiGHS run) and _postsolve (solution and results) are
+    those recorded as the phases writeSolverFile, runSolver and readSolution (see EnergyNetworkClass._createSolver).
+    """
+
+    name = "highs"
+
+    def __init__(self):
+        if highspy is None:
+            raise ImportError("The HiGHS solver requires highspy (pip install highspy)")
+        self.options = {}
+        self.__model = None
+        self.__highs = None
+        self.__variables = []
+        self.__problem = {}
+
+    def available(self, exception_flag=True):
+        return highspy is not None
+
+    def warm_start_capable(self):
+        return True
+
+    def solve(self, model, warmstart=False, **kwargs):
+        """
+        solves the model, with warmstart the variables which have a value are the initial solution of HiGHS
+        :return: pyomo SolverResults
+        """
+        self._presolve(model, warmstart)
+        self._apply_solver()
+        return self._postsolve()
+
+    def _presolve(self, model, warmstart=False):
+        self.__model = model
+        columns = {}
+        variables = []
+
+        def columnIndex(var):
+            index = columns.get(id(var))
+            if index is None:
+                index = columns[id(var)] = len(variables)
+                variables.append(var)
+            return index
+
+        rowStart, rowIndex, rowValue, rowLower, rowUpper = [0], [], [], [], []
+        for constraint in model.component_data_objects(Constraint, active=True, descend_into=True):
+            repn = generate_standard_repn(constraint.body, quadratic=False)
+            if not repn.is_linear():
+                raise ValueError("The constraint {} is not linear, HiGHS requires a linear model".format(constraint.name))
+            constant = value(repn.constant)
+            if not repn.linear_vars:
+                # a constraint without variables is checked here, an infeasible one is passed to HiGHS as an empty row
+                # so that the problem is reported infeasible
+                if (constraint.has_lb() and constant < value(constraint.lower) - _constantTolerance) or \
+                        (constraint.has_ub() and constant > value(constraint.upper) + _constantTolerance):
+                    logging.warning("The constraint {} without variables is infeasible ({} not in [{}, {}])".format(
+                        constraint.name, constant, constraint.lower, constraint.upper))
+                    rowLower.append(value(constraint.lower) - constant if constraint.has_lb() else -np.inf)
+                    rowUpper.append(value(constraint.upper) - constant if constraint.has_ub() else np.inf)
+                    rowStart.append(len(rowIndex))
+                continue
+            rowLower.append(value(constraint.lower) - constant if constraint.has_lb() else -np.inf)
+            rowUpper.append(value(constraint.upper) - constant if constraint.has_ub() else np.inf)
+            rowIndex.extend(columnIndex(v) for v in repn.linear_vars)
+            rowValue.extend(value(c) for c in repn.linear_coefs)
+            rowStart.append(len(rowIndex))
+
+        objectives = list(model.component_data_objects(Objective, active=True, descend_into=True))
+        if len(objectives) != 1:
+            raise ValueError("HiGHS requires exactly one active objective, {} found".format(len(objectives)))
+        objective = objectives[0]
+        repn = generate_standard_repn(objective.expr, quadratic=False)
+        if not repn.is_linear():
+            raise ValueError("The objective {} is not linear, HiGHS requires a linear model".format(objective.name))
+        costs = {columnIndex(v): value(c) for v, c in zip(repn.linear_vars, repn.linear_coefs)}
+
+        lp = highspy.HighsLp()
+        lp.num_col_ = len(variables)
+        lp.num_row_ = len(rowLower)
+        lp.col_cost_ = np.array([costs.get(i, 0.0) for i in range(len(variables))], dtype=float)
+        lp.col_lower_ = np.array([-np.inf if v.lb is None else value(v.lb) for v in variables], dtype=float)
+        lp.col_upper_ = np.array([np.inf if v.ub is None else value(v.ub) for v in variables], dtype=float)
+        lp.row_lower_ = np.array(rowLower, dtype=float)
+        lp.row_upper_ = np.array(rowUpper, dtype=float)
+        lp.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+        lp.a_matrix_.num_col_ = len(variables)
+        lp.a_matrix_.num_row_ = len(rowLower)
+        lp.a_matrix_.start_ = np.array(rowStart, dtype=np.int32)
+        lp.a_matrix_.index_ = np.array(rowIndex, dtype=np.int32)
+        lp.a_matrix_.value_ = np.array(rowValue, dtype=float)
+        lp.offset_ = value(repn.constant)
+        lp.sense_ = highspy.ObjSense.kMinimize if objective.sense == minimize else highspy.ObjSense.kMaximize
+        integers = [v.is_integer() or v.is_binary() for v in variables]
+        if any(integers):
+            lp.integrality_ = [highspy.HighsVarType.kInteger if i else highspy.HighsVarType.kContinuous for i in integers]
+
+        self.__highs = highspy.Highs()
+        self.__highs.setOptionValue("output_flag", bool(self.options.get("tee", False)))
+        for k, v in self.options.items():
+            if k != "tee" and self.__highs.setOptionValue(highsOptionNames.get(k, k), v) == highspy.HighsStatus.kError:
+                logging.warning("HiGHS option {} = {} is unknown or invalid and is ignored".format(
+                    highsOptionNames.get(k, k), v))
+        self.__highs.passModel(lp)
+        if warmstart:
+            start = [(i, v.value) for i, v in enumerate(variables) if v.value is not None]
+            if start:
+                index, startValues = zip(*start)
+                if self.__highs.setSolution(len(start), np.array(index, dtype=np.int32),
+                                            np.array(startValues, dtype=float)) == highspy.HighsStatus.kError:
+                    logging.warning("The initial solution was rejected by HiGHS, the model is solved without warm start")
+        self.__variables = variables
+        self.__problem = {"constraints": len(rowLower), "variables": len(variables), "nonzeros": len(rowIndex),
+                          "integers": sum(integers), "binaries": sum(v.is_binary() for v in variables),
+                          "sense": objective.sense}
+
+    def _apply_solver(self):
+        self.__highs.run()
+
+    def _postsolve(self):
+        highs = self.__highs
+        status = highs.getModelStatus()
+        info = highs.getInfo()
+        terminationCondition = _terminationConditions.get(status, TerminationCondition.error)
+        solution = highs.getSolution()
+        hasSolution = info.primal_solution_status == 2      # feasible primal solution
+        if hasSolution:
+            for var, x in zip(self.__variables, solution.col_value):
+                if var.is_integer() or var.is_binary():
+                    x = round(x)
+                var.set_value(x, **_skipValidation)
+
+        results = SolverResults()
+        problem = self.__problem
+        results.problem.name = self.__model.name
+        results.problem.number_of_constraints = problem["constraints"]
+        results.problem.number_of_variables = problem["variables"]
+        results.problem.number_of_nonzeros = problem["nonzeros"]
+        results.problem.number_of_binary_variables = problem["binaries"]
+        results.problem.number_of_integer_variables = problem["integers"]
+        results.problem.number_of_continuous_variables = problem["variables"] - problem["integers"]
+        results.problem.number_of_objectives = 1
+        results.problem.sense = ProblemSense.minimize if problem["sense"] == minimize else ProblemSense.maximize
+        if hasSolution:
+            bound = info.mip_dual_bound if problem["integers"] else info.objective_function_value
+            if problem["sense"] == minimize:
+                results.problem.lower_bound, results.problem.upper_bound = bound, info.objective_function_value
+            else:
+                results.problem.lower_bound, results.problem.upper_bound = info.objective_function_value, bound
+        results.solver.name = "HiGHS {}".format(highs.version())
+        results.solver.termination_condition = terminationCondition
+        results.solver.status = SolverStatus.ok if terminationCondition == TerminationCondition.optimal \
+            else SolverStatus.warning if hasSolution else SolverStatus.error
+        results.solver.termination_message = highs.modelStatusToString(status)
+        results.solver.time = highs.getRunTime()
+        logging.info("HiGHS: {} (objective {}, {} s)".format(highs.modelStatusToString(status),
+                                                           info.objective_function_value, highs.getRunTime()))
+        return results
+
+
+if highspy is not None:
+    _terminationConditions = {
+        highspy.HighsModelStatus.kOptimal: TerminationCondition.optimal,
+        highspy.HighsModelStatus.kInfeasible: TerminationCondition.infeasible,
+        highspy.HighsModelStatus.kUnboundedOrInfeasible: TerminationCondition.infeasibleOrUnbounded,
+        highspy.HighsModelStatus.kUnbounded: TerminationCondition.unbounded,
+        highspy.HighsModelStatus.kTimeLimit: TerminationCondition.maxTimeLimit,
+        highspy.HighsModelStatus.kIterationLimit: TerminationCondition.maxIterations,
+        highspy.HighsModelStatus.kSolutionLimit: TerminationCondition.other,
+        highspy.HighsModelStatus.kObjectiveBound: TerminationCondition.minFunctionValue,
+        highspy.HighsModelStatus.kModelEmpty: TerminationCondition.optimal,
+    }
+else:
+    _terminationConditions = {}
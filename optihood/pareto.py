@@ -0,0 +1,368 @@
+import logging
+import os
+import shutil
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from pyomo import environ as pyo
+
+from optihood.cache import ScenarioCache
+from optihood.solving import defaultSolverOptions, failedTerminationConditions, LogCollector
+
+# command line option of the solvers setting the number of threads (used to share the CPUs between the workers)
+solverThreadOptions = {"gurobi": "Threads", "cplex": "threads", "cbc": "threads", "xpress": "threads", "highs": "threads"}
+
+
+class ParetoRunner:
+    """
+    Pareto front of the costs and environmental impacts of an energy network with the epsilon constraint method
+
+    The optimization model is built only once: the limit of the environmental impacts is a mutable parameter of the
+    model (totalEnvironmentalImpact_limit) and the objective is switched between the costs and the environmental impacts.
+    The persistent interface of the solver is used if the solver has one (e.g. gurobi or cplex), otherwise the same model
+    is written to the solver for each point. Each point is warm started from the solution of the previous point, the
+    points between the environmental and the cost optimum are solved by increasing limit so that the solution of the
+    previous point is feasible.
+    The intermediate points can be solved in parallel by a pool of processes (see run), each worker defines the energy
+    network again from the scenario cache (or the scenario directory) and builds its own model once.
+    Use EnergyNetworkClass.createParetoRunner to create a runner once the energy network has been set.
+    """
+
+    def __init__(self, network, numberOfBuildings, solver, clusterSize={}, options=None, optConstraints=None,
+                 mergeLinkBuses=False, persistent=True, periodSequence=None):
+        """
+        :param network: energy network (EnergyNetworkIndiv or EnergyNetworkGroup) set with opt="costs"
+        :param numberOfBuildings: number of buildings
+        :param solver: name of the solver
+        :param clusterSize: clusters of the representative days (if any)
+        :param options: solver options indexed by the solver name (as in EnergyNetworkClass.optimize)
+        :param optConstraints: optional constraints (as in EnergyNetworkClass.optimize)
+        :param mergeLinkBuses: as in EnergyNetworkClass.optimize
+        :param persistent: if False the persistent interface of the solver is not used
+        :param periodSequence: representative period of each original period (as in EnergyNetworkClass.optimize)
+        """
+        if options is None:
+            options = defaultSolverOptions
+        self.__network = network
+        self.__runnerArgs = {"numberOfBuildings": numberOfBuildings, "solver": solver, "clusterSize": clusterSize,
+                             "options": options, "optConstraints": optConstraints, "mergeLinkBuses": mergeLinkBuses,
+                             "persistent": persistent, "periodSequence": periodSequence}
+        self.__solver = solver
+        self.__options = options.get(solver, {})
+        self.__clusterSize = clusterSize
+        self.__mergeLinkBuses = mergeLinkBuses
+        self.__model, self.__transformerFlowCapacityDict, self.__storageCapacityDict = network._buildOptimizationModel(
+            numberOfBuildings, 1000000, clusterSize, optConstraints, periodSequence)
+        self.__model.envImpactObjective = pyo.Objective(expr=self.__model.totalEnvironmentalImpact, sense=pyo.minimize)
+        self.__model.envImpactObjective.deactivate()
+        self.__model.totalEnvironmentalImpact_constraint.deactivate()
+
+        self.__opt = network._createSolver(solver, self.__options, persistent=True) if persistent else None
+        self.__persistent = self.__opt is not None
+        if self.__persistent:
+            self.__opt.set_instance(self.__model)
+        else:
+            self.__opt = network._createSolver(solver, self.__options)
+        self.__warmstartCapable = self.__opt.warm_start_capable()
+        self.__solved = False
+        logging.info("Pareto runner created ({} solver interface)".format("persistent" if self.__persistent else "lp file"))
+
+    def run(self, numberOfPoints=5, resultFilePath=None, workers=1, solverThreads=None):
+        """
+        computes the pareto front: cost optimum, environmental optimum and numberOfPoints-2 cost optimizations with limits
+        of the environmental impacts evenly distributed between both optima
+        :param numberOfPoints: number of points of the pareto front (at least 2)
+        :param resultFilePath: if given, the results of the points solved are exported to results<point>.xlsx there
+        :param workers: number of processes solving the intermediate points in parallel (the two optima are solved
+            first in this process), 1 to solve all the points in this process
+        :param solverThreads: number of threads of the solver in each worker (see solverThreadOptions)
+        :return: front: objective, limit of the environmental impacts, total costs (see getTotalCosts) and environmental
+                 impacts (of the limit constraint) of each point,
+                 capacities: invested capacities of the transformers and storages of each point,
+                 statistics: solver status, termination condition, warm start and solve time of each point,
+                 as DataFrames indexed by the point (sorted by increasing environmental impacts). The points which
+                 failed in a worker only appear in statistics, with the status 'error'. If one of the optima failed,
+                 the other points are not computed and only the optima are returned
+        """
+        if numberOfPoints < 2:
+            raise ValueError("The pareto front requires at least 2 points, got {}".format(numberOfPoints))
+        if resultFilePath and not os.path.exists(resultFilePath):
+            os.makedirs(resultFilePath)
+        points = {0: self._solvePoint("costs", None, resultFilePath, 0)}
+        points[1] = self._solvePoint("env", None, resultFilePath, 1)
+        if _failedOptimum(points):
+            return _paretoTables(points)
+        minEnv, maxEnv = points[1][0]["envImpact"], points[0][0]["envImpact"]
+        limits = {p + 2: float(limit) for p, limit in enumerate(np.linspace(minEnv, maxEnv, numberOfPoints)[1:-1])}
+        if workers > 1 and limits:
+            points.update(self._solveParallel(limits, resultFilePath, workers, solverThreads))
+        else:
+            for point, limit in limits.items():
+                points[point] = self._solvePoint("costs", limit, resultFilePath, point)
+
+        return _paretoTables(points)
+
+    def explore(self, maxPoints=10, targetHypervolume=0.99, resolution=None, criterion="hypervolume",
+                resultFilePath=None):
+        """
+        computes the pareto front with an adaptive choice of the limits of the environmental impacts: after the cost and
+        environmental optima, the next limit is the middle of the segment between two consecutive points of the front
+        with the largest priority (see criterion), until the target hypervolume or resolution is reached
+        The costs and environmental impacts are normalized by the two optima (ideal point (0, 0), nadir point (1, 1)).
+        Since the front is monotonous, the front between two consecutive points lies in the rectangle they span, so that
+        the hypervolume of the points found divided by the hypervolume plus the area of these rectangles is a lower
+        bound of the fraction of the hypervolume of the exact front which is reached.
+        :param maxPoints: maximum number of points (optimizations), including the two optima
+        :param targetHypervolume: the exploration stops when the hypervolume ratio reaches this value (None to ignore)
+        :param resolution: the exploration stops when all the segments between consecutive points are shorter than this
+            normalized distance (None to ignore)
+        :param criterion: priority of the segments, 'hypervolume' (area of the rectangle spanned by the segment, large
+            around the knee of the front), 'gap' (length of the segment) or 'curvature' (length of the segment times the
+            change of direction of the front at its ends)
+        :param resultFilePath: if given, the results of the points solved are exported to results<point>.xlsx there
+        :return: front, capacities and statistics as for run, statistics include the hypervolume ratio after each point
+        """
+        if criterion not in ("hypervolume", "gap", "curvature"):
+            raise ValueError("Unknown criterion {}, expected 'hypervolume', 'gap' or 'curvature'".format(criterion))
+        if maxPoints < 2:
+            raise ValueError("The pareto front requires at least 2 points, got {}".format(maxPoints))
+        if resultFilePath and not os.path.exists(resultFilePath):
+            os.makedirs(resultFilePath)
+        points = {0: self._solvePoint("costs", None, resultFilePath, 0)}
+        points[1] = self._solvePoint("env", None, resultFilePath, 1)
+        if _failedOptimum(points):
+            return _paretoTables(points)
+        costOptimum, envOptimum = points[0][0], points[1][0]
+        costRange = envOptimum["costs"] - costOptimum["costs"]
+        envRange = costOptimum["envImpact"] - envOptimum["envImpact"]
+        if not costRange > 0 or not envRange > 0:
+            logging.info("The cost and environmental optima coincide, the pareto front is a single point")
+            return _paretoTables(points)
+
+        # normalized (environmental impacts, costs) of the points of the front, sorted by environmental impacts
+        front = [(0.0, 1.0, 1), (1.0, 0.0, 0)]
+        explored = set()        # segments which can not be split anymore (failed optimization or no new point)
+        while len(points) < maxPoints:
+            ratio = _hypervolumeRatio(front)
+            points[len(points) - 1][2]["hypervolumeRatio"] = ratio
+            if targetHypervolume is not None and ratio >= targetHypervolume:
+                break
+            lengths = [np.hypot(q[0] - p[0], p[1] - q[1]) for p, q in zip(front[:-1], front[1:])]
+            if resolution is not None and max(lengths) < resolution:
+                break
+            priorities = _segmentPriorities(front, lengths, criterion)
+            candidates = [k for k in range(len(priorities)) if (front[k][2], front[k + 1][2]) not in explored]
+            if not candidates:
+                break
+            k = max(candidates, key=lambda c: priorities[c])
+            limit = envOptimum["envImpact"] + 0.5 * (front[k][0] + front[k + 1][0]) * envRange
+            point = len(points)
+            points[point] = self._solvePoint("costs", limit, resultFilePath, point)
+            result = points[point][0]
+            if result["costs"] is None or result["envImpact"] is None:
+                explored.add((front[k][2], front[k + 1][2]))
+                continue
+            newPoint = ((result["envImpact"] - envOptimum["envImpact"]) / envRange,
+                        (result["costs"] - costOptimum["costs"]) / costRange, point)
+            if any(np.isclose(newPoint[0], p[0]) and np.isclose(newPoint[1], p[1]) for p in front):
+                # no new point of the front between the two points (e.g. flat part of the front)
+                explored.add((front[k][2], front[k + 1][2]))
+                continue
+            front.append(newPoint)
+            front.sort()
+        points[len(points) - 1][2]["hypervolumeRatio"] = _hypervolumeRatio(front)
+        return _paretoTables(points)
+
+    def _solveParallel(self, limits, resultFilePath, workers, solverThreads):
+        """
+        solves the points {point: limit} in a pool of processes, the results and the log messages of the points are
+        collected in the order of the points, a point whose worker failed is returned with the status 'error'
+        """
+        network = self.__network
+        scenario = network._scenario
+        if scenario is None:
+            raise ValueError("The parallel pareto front requires an energy network set with setFromExcel or setFromDirectory")
+        runnerArgs = dict(self.__runnerArgs)
+        if solverThreads is not None:
+            if self.__solver in solverThreadOptions:
+                options = dict(runnerArgs["options"])
+                options[self.__solver] = dict(options.get(self.__solver, {}), **{solverThreadOptions[self.__solver]: solverThreads})
+                runnerArgs["options"] = options
+            else:
+                logging.warning("Number of threads of the solver {} unknown, solverThreads ignored".format(self.__solver))
+        temporaryCache = None
+        if scenario["method"] == "setFromExcel" and scenario["cache"] is None:
+            # the excel file is parsed once more in this process and not in every worker
+            temporaryCache = tempfile.mkdtemp(prefix="optihood_cache_")
+            scenario = dict(scenario, cache=ScenarioCache(temporaryCache))
+            network._readNodesData(scenario["path"], scenario["numberOfBuildings"], scenario["clusterSize"],
+                                   scenario["cache"], network._extraSheets)
+
+        results = {}
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_initializeWorker,
+                                     initargs=(type(network), network.timeindex, scenario, runnerArgs,
+                                               network._timeincrement, logging.getLogger().level)) as executor:
+                futures = {point: executor.submit(_solveWorkerPoint, limit, resultFilePath, point)
+                           for point, limit in limits.items()}
+                for point, future in futures.items():
+                    try:
+                        results[point], logs = future.result()
+                    except Exception as e:
+                        logging.error("Pareto point {} (limit {}) failed: {}".format(point, limits[point], repr(e)))
+                        results[point] = (None, None, {"status": "error", "error": repr(e)})
+                        continue
+                    for message in logs:
+                        logging.info("[pareto point {}] {}".format(point, message))
+        finally:
+            if temporaryCache is not None:
+                shutil.rmtree(temporaryCache, ignore_errors=True)
+        return results
+
+    def _setObjective(self, objective):
+        model = self.__model
+        if objective == "costs":
+            model.envImpactObjective.deactivate()
+            model.objective.activate()
+            active = model.objective
+        elif objective == "env":
+            model.objective.deactivate()
+            model.envImpactObjective.activate()
+            active = model.envImpactObjective
+        else:
+            raise ValueError("Unknown objective {}, expected 'costs' or 'env'".format(objective))
+        if self.__persistent:
+            self.__opt.set_objective(active)
+
+    def _setLimit(self, limit):
+        """sets the limit of the environmental impacts, the limit constraint is deactivated if limit is None"""
+        constraint = self.__model.totalEnvironmentalImpact_constraint
+        if self.__persistent and constraint.active:
+            self.__opt.remove_constraint(constraint)
+        if limit is None:
+            constraint.deactivate()
+        else:
+            self.__model.totalEnvironmentalImpact_limit = limit
+            constraint.activate()
+            if self.__persistent:
+                self.__opt.add_constraint(constraint)
+
+    def _solvePoint(self, objective, limit, resultFilePath, point):
+        network = self.__network
+        model = self.__model
+        self._setObjective(objective)
+        self._setLimit(limit)
+        warmstart = self.__warmstartCapable and self.__solved
+        start = time.perf_counter()
+        with network._profiler.phase("solve"):
+            solverResults = network._solve(model, self.__solver, self.__options, opt=self.__opt, warmstart=warmstart)
+        solveTime = time.perf_counter() - start
+        self.__solved = True
+
+        terminationCondition = str(solverResults["Solver"][0]["Termination condition"])
+        statistics = {"status": str(solverResults["Solver"][0]["Status"]), "terminationCondition": terminationCondition,
+                      "persistent": self.__persistent, "warmstart": warmstart, "solveTime": solveTime}
+        front = {"objective": objective, "envImpactLimit": np.nan if limit is None else limit, "costs": None,
+                 "envImpact": pyo.value(model.totalEnvironmentalImpact, exception=False)}
+
+        if terminationCondition in failedTerminationConditions:
+            # the variables still have the values of the previous point, no results are collected nor exported
+            front["envImpact"] = None
+            capacities = {}
+        else:
+            # copy of the dictionary which is updated by the calculation of the capacities
+            transformerFlowCapacityDict = dict(self.__transformerFlowCapacityDict)
+            capacitiesTransformers, capacitiesStorages = network._collectResults(
+                model, transformerFlowCapacityDict, self.__storageCapacityDict, self.__clusterSize,
+                self.__mergeLinkBuses)
+            # total costs of the results of the buildings (as getTotalCosts after optimize), not the value of the objective
+            front["costs"] = network.getTotalCosts()
+            if resultFilePath:
+                network.exportToExcel(os.path.join(resultFilePath, "results{}.xlsx".format(point)),
+                                      self.__mergeLinkBuses)
+            capacities = {t[0]: c for t, c in capacitiesTransformers.items()}
+            capacities.update(capacitiesStorages)
+
+        logging.info("Pareto point {} ({} optimization, limit {}): costs {}, environmental impacts {}, {}".format(
+            point, objective, limit, front["costs"], front["envImpact"], terminationCondition))
+        return front, capacities, statistics
+
+
+def _paretoTables(points):
+    """front, capacities and statistics DataFrames of the points {point: (front, capacities, statistics)}"""
+    solved = [p for p in sorted(points) if points[p][0] is not None]
+    front = pd.DataFrame([points[p][0] for p in solved], index=solved).rename_axis("point")
+    front = front.sort_values("envImpact", kind="stable")
+    capacities = pd.DataFrame([points[p][1] for p in solved], index=solved).rename_axis("point").loc[front.index]
+    statistics = pd.DataFrame([points[p][2] for p in sorted(points)], index=sorted(points)).rename_axis("point")
+    statistics = statistics.loc[list(front.index) + [p for p in sorted(points) if p not in front.index]]
+    return front, capacities, statistics
+
+
+def _failedOptimum(points):
+    """True if the cost or the environmental optimum (points 0 and 1) failed, the limits of the environmental impacts of
+    the other points being then undefined"""
+    failed = False
+    for point in [0, 1]:
+        front, _, statistics = points[point]
+        if statistics["terminationCondition"] in failedTerminationConditions or front["costs"] is None \
+                or front["envImpact"] is None:
+            logging.error("The {} optimum of the pareto front failed ({}), the other points are not computed".format(
+                front["objective"], statistics["terminationCondition"]))
+            failed = True
+    return failed
+
+
+def _hypervolumeRatio(front):
+    """
+    hypervolume of the normalized front (sorted by environmental impacts) with respect to the nadir point (1, 1),
+    divided by the hypervolume plus the area of the rectangles spanned by the consecutive points
+    """
+    hypervolume = sum((q[0] - p[0]) * (1 - p[1]) for p, q in zip(front[:-1], front[1:]))
+    gaps = sum(max(q[0] - p[0], 0) * max(p[1] - q[1], 0) for p, q in zip(front[:-1], front[1:]))
+    return hypervolume / (hypervolume + gaps) if hypervolume + gaps > 0 else 1.0
+
+
+def _segmentPriorities(front, lengths, criterion):
+    """priorities of the segments between the consecutive points of the normalized front"""
+    if criterion == "gap":
+        return lengths
+    if criterion == "hypervolume":
+        return [max(q[0] - p[0], 0) * max(p[1] - q[1], 0) for p, q in zip(front[:-1], front[1:])]
+    directions = [np.arctan2(p[1] - q[1], q[0] - p[0]) for p, q in zip(front[:-1], front[1:])]
+    priorities = []
+    for k, length in enumerate(lengths):
+        turns = [abs(directions[k] - directions[j]) for j in (k - 1, k + 1) if 0 <= j < len(directions)]
+        priorities.append(length * (max(turns) if turns else 1.0))
+    return priorities
+
+
+_workerRunner = None
+_workerLogs = None
+
+
+def _initializeWorker(networkClass, timestamp, scenario, runnerArgs, timeincrement=None, logLevel=logging.WARNING):
+    """defines the energy network and builds the pareto runner of a worker process, the log level is that of the main
+    process (a spawned worker starts with the default level)"""
+    global _workerRunner, _workerLogs
+    logging.getLogger().setLevel(logLevel)
+    network = networkClass._fromScenario(timestamp, scenario, timeincrement)
+    # the log messages of the points are returned to the main process instead of being written by each worker
+    _workerLogs = LogCollector()
+    logging.getLogger().handlers = [_workerLogs]
+    _workerRunner = ParetoRunner(network, **runnerArgs)
+
+
+def _solveWorkerPoint(limit, resultFilePath, point):
+    _workerLogs.messages = []
+    try:
+        result = _workerRunner._solvePoint("costs", limit, resultFilePath, point)
+    except Exception:
+        logging.error(traceback.format_exc())
+        raise
+    result[2]["worker"] = os.getpid()
+    return result, list(_workerLogs.messages)
@@ -0,0 +1,227 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import pyinstrument
+    from pyinstrument.renderers import ConsoleRenderer
+except ImportError:
+    pyinstrument = None
+
+profilers = ["cProfile", "pyinstrument"]
+
+
+class PhaseProfiler:
+    """
+    Records the wall time, CPU time and peak memory of the phases of the optimization pipeline (reading the input data,
+    converting the nodes, building the model, solving, processing the results, etc.)
+
+    The CPU time includes the time of the child processes (e.g. a solver called through the command line). The peak
+    memory is the peak of the memory traced by tracemalloc if it is tracing, otherwise the peak of the resident set size
+    of the process sampled during the phase on linux (see _RssSampler, the peak since the start of the process on other
+    platforms). The memory of child processes is not included. A phase which is recorded several times is accumulated (times are summed and the
+    peak memory is the maximum). Phases can be nested, e.g. the writing of the solver file within the solve phase.
+
+    On demand, a phase can additionally be profiled using cProfile or pyinstrument (see profilePhases). Only the thread
+    in which the phase is run is profiled.
+    """
+
+    def __init__(self):
+        self.__phases = {}
+        self.__profiles = {}
+        self.__profilePhases = {}
+        self.__peaks = []              # peak memory of the phases being recorded (nested phases)
+
+    def profilePhases(self, phases):
+        """
+        selects the phases to be profiled, the previous selection is kept for the phases not given
+        :param phases: dictionary of the profiler ('cProfile' or 'pyinstrument') indexed by the phase name
+        """
+        for phase, profiler in (phases or {}).items():
+            if profiler not in profilers:
+                raise ValueError("Unknown profiler {} for phase {}, expected one of {}".format(profiler, phase, profilers))
+            if profiler == "pyinstrument" and pyinstrument is None:
+                raise ImportError("pyinstrument is required to profile the phase {}".format(phase))
+            self.__profilePhases[phase] = profiler
+
+    @contextmanager
+    def phase(self, name):
+        """context manager recording the phase name"""
+        profiler = self._startProfiler(self.__profilePhases.get(name))
+        _rssSampler.start()
+        if self.__peaks:
+            self.__peaks[-1] = max(self.__peaks[-1], _peakMemory())
+        _resetPeakMemory()
+        self.__peaks.append(0.0)
+        wallTime, cpuTime = time.perf_counter(), _cpuTime()
+        try:
+            yield
+        finally:
+            wallTime, cpuTime = time.perf_counter() - wallTime, _cpuTime() - cpuTime
+            peakMemory = _peakMemory()
+            _rssSampler.stop()
+            peakMemory = max(self.__peaks.pop(), peakMemory)
+            if self.__peaks:
+                self.__peaks[-1] = max(self.__peaks[-1], peakMemory)
+            if profiler is not None:
+                self.__profiles[name] = self._stopProfiler(profiler)
+            record = self.__phases.setdefault(name, {"calls": 0, "wallTime": 0.0, "cpuTime": 0.0, "peakMemory": 0.0})
+            record["calls"] += 1
+            record["wallTime"] += wallTime
+            record["cpuTime"] += cpuTime
+            record["peakMemory"] = max(record["peakMemory"], peakMemory)
+            logging.debug("Phase {} took {:.3f} s (CPU {:.3f} s, peak memory {:.1f} MB)".format(name, wallTime, cpuTime, peakMemory))
+
+    def wrap(self, name, function):
+        """returns function wrapped in the phase name"""
+        def wrapped(*args, **kwargs):
+            with self.phase(name):
+                return function(*args, **kwargs)
+        return wrapped
+
+    def getReport(self):
+        """
+        :return: dictionary of the phases (in the order of their first call) with the number of calls, the wall time (s),
+        the CPU time (s), the peak memory (MB) and the text output of the profiler if the phase was profiled
+        """
+        report = {}
+        for name, record in self.__phases.items():
+            report[name] = dict(record)
+            if name in self.__profiles:
+                report[name]["profile"] = self._profileText(self.__profiles[name])
+        return report
+
+    def getProfile(self, name):
+        """returns the pstats.Stats (cProfile) or the pyinstrument session of a profiled phase"""
+        return self.__profiles[name]
+
+    def exportReport(self, filePath):
+        """writes the report (see getReport) as a json file"""
+        with open(filePath, "w") as f:
+            json.dump(self.getReport(), f, indent=2)
+
+    def logReport(self):
+        for name, record in self.__phases.items():
+            logging.info("{}: {:.3f} s (CPU {:.3f} s, peak memory {:.1f} MB)".format(
+                name, record["wallTime"], record["cpuTime"], record["peakMemory"]))
+
+    def _startProfiler(self, profiler):
+        if profiler == "cProfile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+        elif profiler == "pyinstrument":
+            profiler = pyinstrument.Profiler()
+            profiler.start()
+        return profiler
+
+    def _stopProfiler(self, profiler):
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            return pstats.Stats(profiler)
+        return profiler.stop()
+
+    def _profileText(self, profile):
+        if isinstance(profile, pstats.Stats):
+            stream = io.StringIO()
+            profile.stream = stream
+            profile.sort_stats("cumulative").print_stats(30)
+            return stream.getvalue()
+        return ConsoleRenderer(unicode=False, color=False).render(profile)
+
+
+def _cpuTime():
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def _resetPeakMemory():
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    else:
+        _rssSampler.reset()
+
+
+def _peakMemory():
+    # peak memory in MB
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[1] / 1024 ** 2
+    if _rssSampler.available:
+        return _rssSampler.peak()
+    if resource is not None:
+        # peak since the start of the process, in bytes on macOS and in kB on the other platforms
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 ** 2 if sys.platform == "darwin" else 1024)
+    return float("nan")
+
+
+def _currentRss():
+    # current resident set size in MB (linux)
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+
+
+class _RssSampler:
+    """
+    Samples the resident set size of the process in a background thread while phases are recorded (linux only), so
+    that the peak of each phase is obtained without resetting the peak resident set size of the process. The peak
+    between two samples can be missed, the peak of a phase is thus a lower bound for allocations shorter than the
+    interval (s)
+    """
+
+    def __init__(self, interval=0.01):
+        self.available = os.path.exists("/proc/self/statm")
+        self.__interval = interval
+        self.__lock = threading.Lock()
+        self.__peak = 0.0
+        self.__phases = 0           # number of phases being recorded
+        self.__stopEvent = None
+
+    def start(self):
+        if not self.available:
+            return
+        with self.__lock:
+            self.__phases += 1
+            if self.__stopEvent is None:
+                self.__stopEvent = threading.Event()
+                threading.Thread(target=self._run, args=(self.__stopEvent,), daemon=True).start()
+
+    def stop(self):
+        if not self.available:
+            return
+        with self.__lock:
+            self.__phases -= 1
+            if self.__phases == 0:
+                self.__stopEvent.set()
+                self.__stopEvent = None
+
+    def reset(self):
+        if self.available:
+            rss = _currentRss()
+            with self.__lock:
+                self.__peak = rss
+
+    def peak(self):
+        """peak of the samples since the last reset, including the current resident set size"""
+        rss = _currentRss()
+        with self.__lock:
+            self.__peak = max(self.__peak, rss)
+            return self.__peak
+
+    def _run(self, stopEvent):
+        while not stopEvent.wait(self.__interval):
+            self.peak()
+
+
+_rssSampler = _RssSampler()
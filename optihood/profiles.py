@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+weatherTimeColumns = {"time.yy": "year", "time.mm": "month", "time.dd": "day", "time.hh": "hour"}
+# name of the demand profile files, the number captured is the building number
+demandProfilesPattern = r"Building(\d+)\.csv"
+
+
+def readWeatherData(weatherDataPath):
+    """
+    Function to read the weather data file and set a datetime index on it
+    If the file has a 'timestamp' column (ISO format) it is parsed directly, otherwise the index is assembled from the
+    time.yy, time.mm, time.dd and time.hh columns in a single vectorized step
+    :param weatherDataPath: path to the ;-delimited weather data file
+    :return: weatherData: dataframe of weather data indexed by timestamp
+    """
+    weatherData = pd.read_csv(weatherDataPath, delimiter=";")
+    if "timestamp" in weatherData.columns:
+        weatherData.set_index("timestamp", inplace=True)
+        weatherData.index = pd.to_datetime(weatherData.index)
+        # time columns are still required to select clustered days
+        for col, attr in weatherTimeColumns.items():
+            if col not in weatherData.columns:
+                weatherData[col] = getattr(weatherData.index, attr)
+    else:
+        timeColumns = weatherData[list(weatherTimeColumns)].astype(np.int64).rename(columns=weatherTimeColumns)
+        weatherData.index = pd.DatetimeIndex(pd.to_datetime(timeColumns), name="timestamp")
+    logging.info("Weather data with {} timesteps imported from {}".format(len(weatherData.index), weatherDataPath))
+    return weatherData
+
+
+def readDemandProfiles(demandProfilesPath, numberOfBuildings, namePattern=demandProfilesPattern, maxWorkers=None):
+    """
+    Function to read the demand profiles of the buildings from a folder with one ;-delimited file per building
+    Files are assigned to buildings by their name (see namePattern) and read in parallel. The timestamps are parsed
+    only once since all the profiles must share the same index
+    :param demandProfilesPath: path to the folder containing the demand profiles
+    :param numberOfBuildings: number of buildings
+    :param namePattern: regular expression matching the file names, the first group being the building number
+    :param maxWorkers: number of threads used to read the files (default of ThreadPoolExecutor if None)
+    :return: demandProfiles: dictionary of dataframes indexed by timestamp with the building number as key
+    """
+    if not os.path.isdir(demandProfilesPath) or not os.listdir(demandProfilesPath):
+        logging.error("Error in the demand profiles path: The folder is either empty or does not exist")
+        return {}
+    files = {}
+    for filename in sorted(os.listdir(demandProfilesPath)):
+        match = re.fullmatch(namePattern, filename)
+        if match is None:
+            logging.warning("File {} in the demand profiles folder does not match the pattern {} and is ignored".format(filename, namePattern))
+        elif int(match.group(1)) > numberOfBuildings:
+            logging.warning("Demand profiles folder has more files than the number of buildings specified")
+        else:
+            files[int(match.group(1))] = os.path.join(demandProfilesPath, filename)
+    missing = [i for i in range(1, numberOfBuildings + 1) if i not in files]
+    if missing:
+        raise ValueError("Demand profiles missing for the buildings {} in {} (no file matching the pattern {})".format(
+            missing, demandProfilesPath, namePattern))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+        profiles = dict(zip(files, executor.map(_readDemandProfile, files.values())))
+    demandProfiles = {}
+    index = None
+    for i in sorted(profiles):
+        profile, loadTime = profiles[i]
+        timestamps = profile.pop("timestamp").to_numpy()
+        if index is None:
+            referenceFile, referenceTimestamps = files[i], timestamps
+            index = pd.Index(pd.to_datetime(timestamps), name="timestamp")
+        elif not np.array_equal(timestamps, referenceTimestamps):
+            raise ValueError("The timestamps of the demand profiles {} differ from those of {}".format(files[i], referenceFile))
+        profile.index = index
+        demandProfiles[i] = profile
+        logging.debug("Demand profiles of Building{} read from {} in {:.3f} s".format(i, files[i], loadTime))
+    logging.info("Demand profiles of {} buildings imported from {} in {:.3f} s".format(len(demandProfiles), demandProfilesPath, time.perf_counter() - start))
+    return demandProfiles
+
+
+def _readDemandProfile(filePath):
+    start = time.perf_counter()
+    profile = pd.read_csv(filePath, delimiter=";")
+    return profile, time.perf_counter() - start
@@ -0,0 +1,295 @@
+import logging
+import os
+import shutil
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import oemof.solph as solph
+from pyomo import environ as pyo
+
+from optihood.cache import ScenarioCache
+from optihood.solving import defaultSolverOptions, failedTerminationConditions, LogCollector
+
+
+class RollingHorizonDispatch:
+    """
+    Dispatch of an energy network with fixed capacities, solved in overlapping windows (rolling horizon)
+
+    The time period of the energy network is split into windows of windowLength. Each window is optimized together with
+    the lookAhead following it, so that the storages are not emptied at the end of the window, and only the operation
+    of the window is kept. The windows are solved in sequence, each window starting from the contents of the storages at
+    the end of the previous window and the last window ending with the initial contents of the first one (as the
+    balanced storages of a single model of the whole period).
+    The windows can also be solved in parallel by a pool of processes (see run) as decoupled problems: the initial
+    content of the storages of each window is then free and the window ends with the same contents (balanced storages),
+    which approximates the sequential dispatch. Each window is an energy network defined again from the scenario cache (or the scenario directory).
+    The results of the windows are stitched into the results of the energy network, which have the same shape as the
+    results of optimize so that exportToExcel and the plots can be used.
+    The windows do not see the demands after their look-ahead and the demands must be met (there is no unmet demand),
+    so that capacities sized by an optimization of the whole period (e.g. storages charged days before a peak) can make
+    a window infeasible, in which case the dispatch stops. The capacities can be increased by a relative margin for the
+    dispatch (capacityMargin), a longer look-ahead also reduces the shortfalls.
+    Use EnergyNetworkClass.optimizeRollingHorizon once the energy network has been set over the whole time period.
+    """
+
+    def __init__(self, network, numberOfBuildings, solver, capacities, windowLength="7D", lookAhead="1D",
+                 envImpactlimit=1000000, options=None, optConstraints=None, mergeLinkBuses=False, capacityMargin=0):
+        """
+        :param network: energy network (EnergyNetworkIndiv or EnergyNetworkGroup) set over the whole time period
+        :param numberOfBuildings: number of buildings
+        :param solver: name of the solver
+        :param capacities: invested capacities indexed by the labels of the nodes (see getInvestedCapacities)
+        :param windowLength: duration of the windows whose operation is kept
+        :param lookAhead: duration optimized after each window and discarded
+        :param envImpactlimit: limit of the environmental impacts of each window
+        :param options: solver options indexed by the solver name (as in EnergyNetworkClass.optimize)
+        :param optConstraints: optional constraints (as in EnergyNetworkClass.optimize)
+        :param mergeLinkBuses: as in EnergyNetworkClass.optimize
+        :param capacityMargin: relative margin added to the capacities fixed in the windows, e.g. 0.1 for 10%
+        """
+        if capacityMargin < 0:
+            raise ValueError("The capacity margin ({}) must not be negative".format(capacityMargin))
+        if network._scenario is None:
+            raise ValueError("The rolling horizon dispatch requires an energy network set with setFromExcel or "
+                             "setFromDirectory")
+        if network._scenario["clusterSize"]:
+            raise ValueError("The rolling horizon dispatch requires an energy network set without clusterSize")
+        if options is None:
+            options = defaultSolverOptions
+        self.__network = network
+        self.__mergeLinkBuses = mergeLinkBuses
+        self.__runArgs = {"numberOfBuildings": numberOfBuildings, "solver": solver, "options": options.get(solver, {}),
+                          "envImpactlimit": envImpactlimit, "optConstraints": optConstraints, "capacities": capacities,
+                          "capacityMargin": capacityMargin}
+        self.windows = rollingWindows(network.timeindex, windowLength, lookAhead)
+        logging.info("Rolling horizon dispatch of {} windows of {} with a look-ahead of {}".format(
+            len(self.windows), windowLength, lookAhead))
+
+    def run(self, workers=1):
+        """
+        solves the windows and stitches their results into the results of the energy network
+        :param workers: number of processes solving the windows, 1 to solve the windows in sequence in this process. With
+            more than one process the windows are decoupled (the first window is solved in this process)
+        :return: capacitiesTransformers and capacitiesStorages (as returned by optimize) and the statistics of the
+                 windows (period kept, solver status, termination condition, objective including the look-ahead and solve
+                 time) as a DataFrame indexed by the window. The capacities are None if a window failed, in which case
+                 the results of the energy network are not updated
+        """
+        network = self.__network
+        scenario = network._scenario
+        temporaryCache = None
+        if scenario["method"] == "setFromExcel" and scenario["cache"] is None:
+            # the excel file is parsed once more and not for every window
+            temporaryCache = tempfile.mkdtemp(prefix="optihood_cache_")
+            scenario = dict(scenario, cache=ScenarioCache(temporaryCache))
+            network._readNodesData(scenario["path"], scenario["numberOfBuildings"], scenario["clusterSize"],
+                                   scenario["cache"], network._extraSheets)
+        try:
+            first = _defineWindow(type(network), network.timeindex, network._timeincrement, scenario, self.windows[0])
+            coupled = workers <= 1 and len(self.windows) > 1
+            firstResult, statistics, model, transformerFlowCapacityDict, storageCapacityDict = _solveWindow(
+                first, self.windows[0], self.__runArgs, {} if coupled else None, None)
+            windowResults, windowStatistics = [firstResult], [statistics]
+            if firstResult is not None:
+                if workers > 1:
+                    parallelResults = self._solveParallel(scenario, self.windows[1:], workers)
+                    windowResults += [r for r, _ in parallelResults]
+                    windowStatistics += [s for _, s in parallelResults]
+                else:
+                    for k, window in enumerate(self.windows[1:], 1):
+                        finalContents = firstResult["initialContents"] if k == len(self.windows) - 1 else None
+                        windowNetwork = _defineWindow(type(network), network.timeindex, network._timeincrement,
+                                                      scenario, window)
+                        result, statistics = _solveWindow(windowNetwork, window, self.__runArgs,
+                                                          windowResults[-1]["finalContents"], finalContents)[:2]
+                        windowResults.append(result)
+                        windowStatistics.append(statistics)
+                        if result is None:
+                            # the next windows would start from the storage contents of a failed window
+                            break
+        finally:
+            if temporaryCache is not None:
+                shutil.rmtree(temporaryCache, ignore_errors=True)
+        statistics = pd.DataFrame(windowStatistics).rename_axis("window")
+        if any(r is None for r in windowResults):
+            logging.error("Rolling horizon dispatch failed, the capacities may not be sufficient for the operation of "
+                          "the window starting at {}".format(statistics.loc[[r is None for r in windowResults], "start"]
+                                                             .iloc[0]))
+            return None, None, statistics
+
+        capacitiesTransformers, capacitiesStorages = self._collectResults(
+            windowResults, model, transformerFlowCapacityDict, storageCapacityDict)
+        logging.info("Rolling horizon dispatch of {} windows successful".format(len(self.windows)))
+        return capacitiesTransformers, capacitiesStorages, statistics
+
+    def _solveParallel(self, scenario, windows, workers):
+        """
+        solves the decoupled windows in a pool of processes, the results and the log messages of the windows are
+        collected in the order of the windows, a window whose worker failed is returned without results
+        """
+        network = self.__network
+        results = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_initializeWorker,
+                                 initargs=(logging.getLogger().level,)) as executor:
+            futures = [executor.submit(_solveWorkerWindow, type(network), network.timeindex, network._timeincrement,
+                                       scenario, self.__runArgs, window)
+                       for window in windows]
+            for k, (window, future) in enumerate(zip(windows, futures), 1):
+                try:
+                    result, statistics, logs = future.result()
+                except Exception as e:
+                    logging.error("Rolling horizon window {} failed: {}".format(k, repr(e)))
+                    results.append((None, {"start": network.timeindex[window[0]], "status": "error",
+                                           "error": repr(e)}))
+                    continue
+                for message in logs:
+                    logging.info("[window {}] {}".format(k, message))
+                results.append((result, statistics))
+        return results
+
+    def _collectResults(self, windowResults, model, transformerFlowCapacityDict, storageCapacityDict):
+        """
+        stitches the sequences of the windows into the results of the energy network (keyed by its nodes) and calculates
+        the invested capacities and the results of each building, the capacities are read from the model of the first
+        window whose investments are fixed
+        """
+        network = self.__network
+        results = {}
+        for key, scalars in windowResults[0]["scalars"].items():
+            nodes = tuple(None if label is None else network.groups[label] for label in key)
+            results[nodes] = {"scalars": scalars,
+                              "sequences": pd.concat([r["sequences"][key] for r in windowResults])}
+        network._optimizationResults = results
+
+        capacitiesTransformers, capacitiesStorages = network._calculateInvestedCapacities(
+            model, dict(transformerFlowCapacityDict), storageCapacityDict)
+        if network._timeincrement is not None:
+            network._postprocessingSegments()
+        network._calculateResultsPerBuilding(self.__mergeLinkBuses)
+        # total costs (or environmental impacts) of the stitched operation: the capacities are counted once and the
+        # look-aheads are discarded
+        objective = network.getTotalEnvImpacts() if network._scenario["opt"] == "env" else network.getTotalCosts()
+        network._metaResults = _aggregateMetaResults([r["metaResults"] for r in windowResults], objective)
+        return capacitiesTransformers, capacitiesStorages
+
+
+def rollingWindows(timeindex, windowLength, lookAhead):
+    """
+    windows of windowLength followed by lookAhead covering the time index
+    :return: list of the positions (start, end of the operation kept, end of the optimized period) in the time index of
+             the windows, the ends being excluded
+    """
+    windowLength, lookAhead = pd.Timedelta(windowLength), pd.Timedelta(lookAhead)
+    if windowLength <= pd.Timedelta(0) or lookAhead < pd.Timedelta(0):
+        raise ValueError("The window length ({}) must be positive and the look-ahead ({}) not negative".format(
+            windowLength, lookAhead))
+    # the positions of the boundaries are searched as timestamps, so that the time index can be made of segments
+    boundaries = pd.date_range(timeindex[0], timeindex[-1], freq=windowLength)
+    starts = sorted(set(timeindex.searchsorted(boundaries)))
+    keeps = starts[1:] + [len(timeindex)]
+    ends = [max(int(timeindex.searchsorted(timeindex[s] + windowLength + lookAhead)), keep)
+            for s, keep in zip(starts, keeps)]
+    return [(int(s), int(keep), end) for s, keep, end in zip(starts, keeps, ends)]
+
+
+def _aggregateMetaResults(metaResults, objective):
+    """
+    meta results of the rolling horizon in the format of solph.processing.meta_results: the objective is the given
+    objective of the stitched operation (not the sum of the objectives of the windows, which include the look-ahead and
+    the costs of the fixed capacities in each window), the solver results are those of the window with the worst
+    termination condition (failed, then not optimal), the numbers of the problem (e.g. number of constraints) are summed
+    over the windows, and the meta results of each window are given under the key "windows"
+    """
+    def severity(windowResults):
+        terminationCondition = str(windowResults["solver"].get("Termination condition"))
+        return 2 if terminationCondition in failedTerminationConditions else int(terminationCondition != "optimal")
+
+    problem = dict(metaResults[0]["problem"])
+    for key, value in problem.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and key != "Number of objectives":
+            problem[key] = sum(r["problem"][key] for r in metaResults)
+    return {"objective": objective, "problem": problem,
+            "solver": dict(max(metaResults, key=severity)["solver"]), "windows": metaResults}
+
+
+def _defineWindow(networkClass, timeindex, timeincrement, scenario, window):
+    """defines the energy network of a window in dispatch mode from the scenario"""
+    start, _, end = window
+    return networkClass._fromScenario(timeindex[start:end], scenario,
+                                      None if timeincrement is None else list(timeincrement[start:end]),
+                                      firstRow=start, clusterSize={}, dispatchMode=True)
+
+
+def _solveWindow(network, window, runArgs, initialContents, finalContents):
+    """
+    solves the dispatch of a window with the capacities fixed
+    :param initialContents: contents of the storages at the start of the window indexed by the labels of the storages,
+           None for a decoupled window whose storages start from a free content and are balanced
+    :param finalContents: contents of the storages at the end of the window (the storages are not balanced if
+           initialContents is given)
+    :return: results of the window (None if it failed) as a dictionary of the scalars, of the sequences of the operation
+             kept (indexed by the labels of the nodes), of the initial and final contents of the storages and of the meta
+             results, the statistics of the window, the model and the capacity dictionaries
+    """
+    start, keep, end = window
+    model, transformerFlowCapacityDict, storageCapacityDict = network._buildOptimizationModel(
+        runArgs["numberOfBuildings"], runArgs["envImpactlimit"], {}, runArgs["optConstraints"])
+    network._fixInvestments(model, runArgs["capacities"], transformerFlowCapacityDict, storageCapacityDict,
+                            tolerance=max(runArgs["capacityMargin"], 1e-6))
+    if initialContents is None:
+        network._releaseInitialStorageContents(model)
+    else:
+        network._setStorageContents(model, initialContents, finalContents or {})
+    solveStart = time.perf_counter()
+    with network._profiler.phase("solve"):
+        solverResults = network._solve(model, runArgs["solver"], runArgs["options"])
+    terminationCondition = str(solverResults["Solver"][0]["Termination condition"])
+    statistics = {"start": network.timeindex[0], "end": network.timeindex[keep - start - 1],
+                  "lookAheadEnd": network.timeindex[-1], "status": str(solverResults["Solver"][0]["Status"]),
+                  "terminationCondition": terminationCondition,
+                  "objective": pyo.value(model.objective, exception=False),
+                  "solveTime": time.perf_counter() - solveStart}
+    logging.info("Window from {} to {}: objective {}, {}".format(statistics["start"], statistics["end"],
+                                                                  statistics["objective"], terminationCondition))
+    if terminationCondition in failedTerminationConditions:
+        return None, statistics, model, transformerFlowCapacityDict, storageCapacityDict
+
+    results = solph.processing.results(model)
+    keys = {k: tuple(None if n is None else str(n) for n in k) for k in results}
+    result = {"scalars": {keys[k]: r["scalars"] for k, r in results.items()},
+              "sequences": {keys[k]: r["sequences"].iloc[:keep - start] for k, r in results.items()},
+              "initialContents": {}, "finalContents": {},
+              "metaResults": solph.processing.meta_results(model)}
+    if hasattr(model, "GenericInvestmentStorageBlock"):
+        block = model.GenericInvestmentStorageBlock
+        for n in block.INVESTSTORAGES:
+            result["initialContents"][str(n)] = block.init_content[n].value
+            result["finalContents"][str(n)] = block.storage_content[n, keep - start - 1].value
+    return result, statistics, model, transformerFlowCapacityDict, storageCapacityDict
+
+
+_workerLogs = None
+
+
+def _initializeWorker(logLevel=logging.WARNING):
+    """collects the log messages of a worker process, which are returned to the main process, at the log level of the
+    main process (a spawned worker starts with the default level)"""
+    global _workerLogs
+    _workerLogs = LogCollector()
+    logging.getLogger().handlers = [_workerLogs]
+    logging.getLogger().setLevel(logLevel)
+
+
+def _solveWorkerWindow(networkClass, timeindex, timeincrement, scenario, runArgs, window):
+    _workerLogs.messages = []
+    try:
+        network = _defineWindow(networkClass, timeindex, timeincrement, scenario, window)
+        result, statistics = _solveWindow(network, window, runArgs, None, None)[:2]
+    except Exception:
+        logging.error(traceback.format_exc())
+        raise
+    statistics["worker"] = os.getpid()
+    return result, statistics, list(_workerLogs.messages)
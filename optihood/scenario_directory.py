@@ -0,0 +1,140 @@
+import logging
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+# sheets of the input excel file which are stored as one table each in a scenario directory
+scenarioSheets = ["buses", "grid_connection", "commodity_sources", "solar", "transformers", "demand", "storages",
+                  "stratified_storage", "profiles"]
+optionalSheets = ["links"]
+# columns of the weather data which are used to build the energy network (and to select the clustered days)
+weatherColumns = ["tre200h0", "gls", "str.diffus", "ground_temp", "time.yy", "time.mm", "time.dd", "time.hh"]
+# column of the internal gains of the occupants (building model) in the input file and in the scenario directory
+internalGainsColumn = "Total (kW)"
+
+_timeSeriesDir = "timeseries"
+_buildingSeparator = "__Building"
+
+
+def writeScenarioDirectory(nodesData, directoryPath):
+    """
+    Function to write the nodesData dictionary (see EnergyNetworkClass.createNodesData) into a scenario directory
+    Each sheet is written as a csv table, the time series are written as parquet files if pyarrow is installed (csv
+    otherwise). The demand profiles of all the buildings are written in a single table with one column per profile and
+    building (e.g. spaceHeatingDemand__Building2), the internal gains of the building model (if any) as a time series
+    :param nodesData: dictionary of the scenario data
+    :param directoryPath: path of the scenario directory to be created
+    """
+    os.makedirs(os.path.join(directoryPath, _timeSeriesDir), exist_ok=True)
+    for sheet in scenarioSheets + [s for s in optionalSheets if s in nodesData]:
+        frame = nodesData[sheet]
+        if sheet == "stratified_storage":
+            frame = frame.reset_index()
+        frame.to_csv(os.path.join(directoryPath, sheet + ".csv"), sep=";", index=False)
+    demandProfiles = pd.concat({i: frame for i, frame in nodesData["demandProfiles"].items()}, axis=1)
+    demandProfiles.columns = [f"{col}{_buildingSeparator}{i}" for i, col in demandProfiles.columns]
+    frames = {"demand_profiles": demandProfiles, "weather_data": nodesData["weather_data"],
+              "electricity_cost": nodesData["electricity_cost"], "electricity_impact": nodesData["electricity_impact"]}
+    if "Qocc" in nodesData["building_model"]:
+        frames["internal_gains"] = pd.DataFrame({internalGainsColumn: nodesData["building_model"]["Qocc"].to_numpy()},
+                                                index=nodesData["weather_data"].index)
+    for name, frame in frames.items():
+        frame = frame.rename_axis("timestamp").reset_index()
+        if pq is not None:
+            frame.to_parquet(os.path.join(directoryPath, _timeSeriesDir, name + ".parquet"), index=False)
+        else:
+            frame.to_csv(os.path.join(directoryPath, _timeSeriesDir, name + ".csv"), sep=";", index=False,
+                         date_format="%Y-%m-%dT%H:%M:%S")
+    logging.info("Scenario directory written to {}".format(directoryPath))
+
+
+def readScenarioDirectory(directoryPath, numberOfBuildings, sheets=()):
+    """
+    Function to read a scenario directory into a nodesData dictionary
+    Only the columns needed are read from the time series (the demand profiles of the first numberOfBuildings
+    buildings and the weather data columns in weatherColumns), parquet files are memory-mapped
+    :param directoryPath: path of the scenario directory
+    :param numberOfBuildings: number of buildings
+    :param sheets: additional sheets to be read (e.g. links)
+    :return: nodesData: dictionary of the scenario data (without building_model, the internal gains of the building
+        model being given as internal_gains if the directory has them)
+    """
+    nodesData = {}
+    for sheet in scenarioSheets + list(sheets):
+        nodesData[sheet] = _readSheet(os.path.join(directoryPath, sheet + ".csv"))
+    nodesData["stratified_storage"].set_index("label", inplace=True)
+
+    demandColumns = [c for c in _timeSeriesColumns(directoryPath, "demand_profiles")
+                     if c != "timestamp" and int(c.split(_buildingSeparator)[1]) <= numberOfBuildings]
+    demandProfiles = _readTimeSeries(directoryPath, "demand_profiles", demandColumns)
+    nodesData["demandProfiles"] = {}
+    for i in range(1, numberOfBuildings + 1):
+        suffix = f"{_buildingSeparator}{i}"
+        columns = [c for c in demandColumns if c.endswith(suffix)]
+        if not columns:
+            logging.error("No demand profiles for Building{} in the scenario directory {}".format(i, directoryPath))
+            continue
+        nodesData["demandProfiles"][i] = demandProfiles[columns].rename(columns=lambda c: c[:-len(suffix)])
+    nodesData["weather_data"] = _readTimeSeries(directoryPath, "weather_data",
+                                                [c for c in weatherColumns if c in _timeSeriesColumns(directoryPath, "weather_data")])
+    nodesData["electricity_cost"] = _readTimeSeries(directoryPath, "electricity_cost")
+    nodesData["electricity_impact"] = _readTimeSeries(directoryPath, "electricity_impact")
+    if os.path.exists(_timeSeriesPath(directoryPath, "internal_gains")):
+        nodesData["internal_gains"] = _readTimeSeries(directoryPath, "internal_gains")
+    logging.info("Data from scenario directory {} imported.".format(directoryPath))
+    return nodesData
+
+
+def _parseCell(value):
+    # csv cells of columns with mixed types are read as strings, numbers are converted back as done by xlrd
+    if not isinstance(value, str):
+        return value
+    for conversion in (int, float):
+        try:
+            return conversion(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _readSheet(filePath):
+    sheet = pd.read_csv(filePath, delimiter=";")
+    for col in sheet.columns[sheet.dtypes == object]:
+        sheet[col] = sheet[col].map(_parseCell).astype(object)
+    return sheet
+
+
+def _timeSeriesPath(directoryPath, name):
+    path = os.path.join(directoryPath, _timeSeriesDir, name + ".parquet")
+    if os.path.exists(path):
+        if pq is None:
+            raise ImportError("pyarrow is required to read the parquet time series of {}".format(directoryPath))
+        return path
+    return os.path.join(directoryPath, _timeSeriesDir, name + ".csv")
+
+
+def _timeSeriesColumns(directoryPath, name):
+    path = _timeSeriesPath(directoryPath, name)
+    if path.endswith(".parquet"):
+        return pq.read_schema(path).names
+    return list(pd.read_csv(path, delimiter=";", nrows=0).columns)
+
+
+def _readTimeSeries(directoryPath, name, columns=None):
+    path = _timeSeriesPath(directoryPath, name)
+    if columns is not None:
+        columns = ["timestamp"] + list(columns)
+    if path.endswith(".parquet"):
+        frame = pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+    else:
+        frame = pd.read_csv(path, delimiter=";", usecols=columns, parse_dates=["timestamp"])
+        if columns is not None:
+            frame = frame[columns]
+    frame.set_index("timestamp", inplace=True)
+    frame.index = pd.to_datetime(frame.index)
+    return frame
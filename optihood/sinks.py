@@ -35,6 +35,9 @@ class SinkRCModel(solph.Sink):
     tAmbient : Ambient outside air temperature at each timestep [ºC]
     totalIrradiationHorizontal : Total horizontal irradiation at each timestep [kW/m^2]
     heatGainOccupants : Internal heat gains from occupants at each timestep [kW]
+
+    The state space equations are discretized with the duration of each timestep (timeincrement of the energy system
+    in hours), so that timesteps of variable duration (e.g. time segments) can be used.
     """
 
     def __init__(
@@ -242,12 +245,12 @@ class SinkRCModelBlock(SimpleBlock):
             """discrete state space equation for tIndoor
             """
             for g in group:
-                c2 = 1/(g.rIndoor*g.cIndoor)
-                c3 = 1/(g.rDistribution*g.cIndoor)
-                c1 = 1 - c2 - c3
-                c4 = g.areaWindows/g.cIndoor
                 for t in m.TIMESTEPS:
                     if t!= m.TIMESTEPS[-1]:
+                        c2 = m.timeincrement[t]/(g.rIndoor*g.cIndoor)
+                        c3 = m.timeincrement[t]/(g.rDistribution*g.cIndoor)
+                        c1 = 1 - c2 - c3
+                        c4 = m.timeincrement[t]*g.areaWindows/g.cIndoor
                         lhs = self.tIndoor[g, t+1]
                         rhs = c1*self.tIndoor[g, t] + c2*self.tWall[g, t] + c3*self.tDistribution[g, t] + c4*(g.totalIrradiationHorizontal[t] + g.heatGainOccupants[t])
                         block.indoor_temperature_equation.add((g, t), (lhs == rhs))
@@ -259,11 +262,11 @@ class SinkRCModelBlock(SimpleBlock):
             """discrete state space equation for tWall
             """
             for g in group:
-                c1 = 1 / (g.rIndoor * g.cWall)
-                c3 = 1 / (g.rWall * g.cWall)
-                c2 = 1 - c1 - c3
                 for t in m.TIMESTEPS:
                     if t != m.TIMESTEPS[-1]:
+                        c1 = m.timeincrement[t] / (g.rIndoor * g.cWall)
+                        c3 = m.timeincrement[t] / (g.rWall * g.cWall)
+                        c2 = 1 - c1 - c3
                         lhs = self.tWall[g, t + 1]
                         rhs = c1 * self.tIndoor[g, t] + c2 * self.tWall[g, t] + c3 * g.tAmbient[t]
                         block.wall_temperature_equation.add((g, t), (lhs == rhs))
@@ -275,11 +278,11 @@ class SinkRCModelBlock(SimpleBlock):
             """discrete state space equation for tDistribution
             """
             for g in group:
-                c1 = 1 / (g.rDistribution * g.cDistribution)
-                c2 = 1 - c1
-                c3 = 1 /g.cDistribution
                 for t in m.TIMESTEPS:
                     if t != m.TIMESTEPS[-1]:
+                        c1 = m.timeincrement[t] / (g.rDistribution * g.cDistribution)
+                        c2 = 1 - c1
+                        c3 = m.timeincrement[t] / g.cDistribution
                         lhs = self.tDistribution[g, t + 1]
                         rhs = c1 * self.tIndoor[g, t] + c2 * self.tDistribution[g, t] + c3 * m.flow[g.inflow, g, t]
                         block.distribution_temperature_equation.add((g, t), (lhs == rhs))
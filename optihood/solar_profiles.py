@@ -0,0 +1,112 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pvlib
+
+
+class SolarProfileCache:
+    """
+    Cache of the solar precalculations shared by the PV and solar collector components of all the buildings
+
+    The solar position is computed once per site (latitude, longitude and time index), the irradiance on the plane of
+    array once per orientation (tilt and azimuth) and the derived profiles (PV output, collector heat) once per set of
+    parameters. Weather data are identified by a fingerprint of their time index and values. The cache can be used by
+    several threads (buildings added in parallel). Each kind of entry is bounded, the least recently used entries being
+    evicted so that the cache does not grow with the number of energy networks defined in a process.
+
+    Parameters
+    ----------
+    maxEntries : maximum number of solar positions, irradiance and profiles kept in the cache
+    """
+
+    def __init__(self, maxEntries=256):
+        self.__maxEntries = maxEntries
+        self.__positions = OrderedDict()
+        self.__irradiance = OrderedDict()
+        self.__profiles = OrderedDict()
+        self.__statistics = {"solar position": [0, 0], "irradiance": [0, 0], "profiles": [0, 0]}   # [hits, misses]
+        self.__lock = threading.RLock()
+
+    def clear(self):
+        self.__positions.clear()
+        self.__irradiance.clear()
+        self.__profiles.clear()
+        for counts in self.__statistics.values():
+            counts[:] = [0, 0]
+
+    def getStatistics(self):
+        return {name: {"hits": hits, "misses": misses, "hitRate": hits / (hits + misses) if hits + misses else np.nan}
+                for name, (hits, misses) in self.__statistics.items()}
+
+    def logStatistics(self):
+        logging.info("Solar profile cache hit rates: " + ", ".join(
+            "{} {}/{}".format(name, hits, hits + misses) for name, (hits, misses) in self.__statistics.items()))
+
+    def fingerprint(self, *series):
+        """fingerprint of the time index and values of the given time series"""
+        digest = hashlib.sha1(np.asarray(series[0].index.asi8).tobytes())
+        for s in series:
+            digest.update(np.ascontiguousarray(s, dtype=np.float64).tobytes())
+        return digest.hexdigest()
+
+    def getSolarPosition(self, index, latitude, longitude):
+        key = (latitude, longitude, hashlib.sha1(np.asarray(index.asi8).tobytes()).hexdigest())
+        with self.__lock:
+            if not self._lookup("solar position", key, self.__positions):
+                self._store(self.__positions, key,
+                            pvlib.solarposition.get_solarposition(time=index, latitude=latitude, longitude=longitude))
+            return self.__positions[key]
+
+    def getIrradiance(self, latitude, longitude, tilt, azimuth, irradianceGlobal, irradianceDiffuse):
+        """irradiance on the plane of array (poa_global) for the given site and orientation"""
+        key = (latitude, longitude, tilt, azimuth, self.fingerprint(irradianceGlobal, irradianceDiffuse))
+        with self.__lock:
+            if not self._lookup("irradiance", key, self.__irradiance):
+                solposition = self.getSolarPosition(irradianceGlobal.index, latitude, longitude)
+                dni = pvlib.irradiance.dni(ghi=irradianceGlobal, dhi=irradianceDiffuse, zenith=solposition['apparent_zenith'])
+                totalIrradiation = pvlib.irradiance.get_total_irradiance(
+                    surface_tilt=tilt,
+                    surface_azimuth=azimuth,
+                    solar_zenith=solposition['apparent_zenith'],
+                    solar_azimuth=solposition['azimuth'],
+                    dni=dni.fillna(0),  # fill NaN values with '0'
+                    ghi=irradianceGlobal,
+                    dhi=irradianceDiffuse,
+                )
+                self._store(self.__irradiance, key, _readOnly(totalIrradiation['poa_global']))
+            return self.__irradiance[key]
+
+    def getProfile(self, key, function):
+        """returns the profile identified by key, function is called to compute it if it is not in the cache"""
+        with self.__lock:
+            if not self._lookup("profiles", key, self.__profiles):
+                profile = function()
+                self._store(self.__profiles, key,
+                            tuple(_readOnly(p) for p in profile) if isinstance(profile, tuple) else _readOnly(profile))
+            return self.__profiles[key]
+
+    def _lookup(self, name, key, cache):
+        found = key in cache
+        if found:
+            cache.move_to_end(key)
+        self.__statistics[name][0 if found else 1] += 1
+        return found
+
+    def _store(self, cache, key, value):
+        cache[key] = value
+        while len(cache) > self.__maxEntries:
+            cache.popitem(last=False)
+
+
+def _readOnly(series):
+    # profiles are shared between buildings, they must not be modified in place
+    if isinstance(series, pd.Series):
+        series.values.setflags(write=False)
+    return series
+
+
+solarProfiles = SolarProfileCache()
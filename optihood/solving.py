@@ -0,0 +1,20 @@
+import logging
+
+# options of the solvers used when no options are given to the optimizations (EnergyNetworkClass.optimize,
+# optimizeTwoStage, ParetoRunner and RollingHorizonDispatch)
+defaultSolverOptions = {"gurobi": {"MIPGap": 0.01}, "highs": {"mip_rel_gap": 0.01}}
+# termination conditions of the solvers without solution
+failedTerminationConditions = ["infeasible", "infeasibleOrUnbounded", "unbounded", "invalidProblem", "solverFailure",
+                               "internalSolverError", "error"]
+
+
+class LogCollector(logging.Handler):
+    """collects the log messages of a worker process (e.g. of the pareto front or of the rolling horizon), which are
+    then logged by the main process"""
+
+    def __init__(self):
+        super(LogCollector, self).__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(self.format(record))
@@ -1,18 +1,22 @@
 import oemof.solph as solph
 import numpy as np
 import pandas as pd
-import pvlib
+from optihood.solar_profiles import solarProfiles
 
 
 class PV(solph.Source):
     def __init__(self, label, buildingLabel, outputs, peripheral_losses, latitude, longitude,
                  pv_tilt, pv_efficiency, roof_area, zenith_angle, pv_azimuth, irradiance_global, irradiance_diffuse, temp_amb_pv, capacityMin,
                  capacityMax, epc, base, env_capa, env_flow, varc, dispatchMode):
-        # Creation of a df with 3 columns
-        data = self.computePvSolarPosition(irradiance_diffuse, irradiance_global, latitude, longitude, pv_azimuth,
-                                           pv_tilt, temp_amb_pv)
-
-        self.pv_electricity = np.minimum(self.pv_precalc(temp_amb_pv, data['pv_ira']/1000), capacityMax + base)
+        # PV output per kW, shared by all the PV with the same site, orientation and weather data
+        weatherKey = solarProfiles.fingerprint(irradiance_global, irradiance_diffuse, temp_amb_pv)
+        pvPower = solarProfiles.getProfile(("pv", latitude, longitude, pv_tilt, pv_azimuth, weatherKey),
+                                           lambda: self._computePvPower(irradiance_diffuse, irradiance_global, latitude,
+                                                                        longitude, pv_azimuth, pv_tilt, temp_amb_pv))
+        if pvPower.max() <= capacityMax + base:     # the cached profile is used as is if it is not capped
+            self.pv_electricity = pvPower
+        else:
+            self.pv_electricity = np.minimum(pvPower, capacityMax + base)
 
         if not (np.isnan(roof_area) or np.isnan(zenith_angle) or np.isnan(pv_efficiency)):
             self.surface_used = self._calculateArea(zenith_angle, pv_tilt, pv_azimuth, pv_efficiency)
@@ -52,24 +56,14 @@ class PV(solph.Source):
                 'temp_amb': temp_amb_pv
             }
         )
-        solposition = pvlib.solarposition.get_solarposition(
-            time=data.index, latitude=latitude, longitude=longitude
-        )
-        dni = pvlib.irradiance.dni(
-            ghi=data['ghi'], dhi=data['dhi'], zenith=solposition['apparent_zenith']
-        )
-        total_irradiation = pvlib.irradiance.get_total_irradiance(
-            surface_tilt=pv_tilt,
-            surface_azimuth=pv_azimuth,
-            solar_zenith=solposition['apparent_zenith'],
-            solar_azimuth=solposition['azimuth'],
-            dni=dni.fillna(0),  # fill NaN values with '0'
-            ghi=data['ghi'],
-            dhi=data['dhi'],
-        )
-        data['pv_ira'] = total_irradiation['poa_global']
+        data['pv_ira'] = solarProfiles.getIrradiance(latitude, longitude, pv_tilt, pv_azimuth, data['ghi'], data['dhi'])
         return data
 
+    def _computePvPower(self, irradiance_diffuse, irradiance_global, latitude, longitude, pv_azimuth, pv_tilt, temp_amb_pv):
+        data = self.computePvSolarPosition(irradiance_diffuse, irradiance_global, latitude, longitude, pv_azimuth,
+                                           pv_tilt, temp_amb_pv)
+        return self.pv_precalc(temp_amb_pv, data['pv_ira']/1000)
+
     # model according to Energy management algorithms description. D6.2 v1.0
     # nominal power is 1 KW due to the normed optimizer
     def pv_precalc(self, temp_amb, i_H_t, a1=17.23292, a2=0.451708, a3=22.706, a4=-0.062059,
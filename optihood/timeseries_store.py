@@ -0,0 +1,79 @@
+import logging
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+
+class TimeSeriesStore:
+    """
+    Read-only store of the time series shared by the components of all the buildings
+
+    Each time series is saved once as a contiguous float64 array and referenced by its key (e.g. 'weather/gls',
+    'electricity/cost' or 'demand/Building1/spaceHeatingDemand'). The arrays are read-only views (no copy is made of
+    float64 input data) so that they can be safely shared between the flows of different buildings. If memmapDir is
+    given, the arrays are saved in a sub-directory of memmapDir created for the store and memory-mapped instead of
+    being kept in memory, so that several stores (e.g. of the energy networks of a pareto front) can share memmapDir
+    without overwriting the files mapped by the others.
+
+    Parameters
+    ----------
+    memmapDir : directory in which the memory-mapped arrays are saved (arrays are kept in memory if None)
+    """
+
+    def __init__(self, memmapDir=None):
+        self.__arrays = {}
+        self.__indexes = {}
+        self.__memmapDir = None
+        if memmapDir is not None:
+            os.makedirs(memmapDir, exist_ok=True)
+            self.__memmapDir = tempfile.mkdtemp(prefix="timeseries_", dir=memmapDir)
+
+    def __getitem__(self, key):
+        return self.__arrays[key]
+
+    def __contains__(self, key):
+        return key in self.__arrays
+
+    def __len__(self):
+        return len(self.__arrays)
+
+    def keys(self):
+        return self.__arrays.keys()
+
+    def add(self, key, values, index=None):
+        """adds a time series (if the key is not already in the store) and returns the stored array
+        index is the time index of the series, it is used by getSeries"""
+        if key in self.__arrays:
+            return self.__arrays[key]
+        if index is None and isinstance(values, pd.Series):
+            index = values.index
+        # float64 columns of a dataframe are contiguous, they are referenced without being copied
+        array = np.ascontiguousarray(values, dtype=np.float64)
+        if self.__memmapDir is not None:
+            filePath = os.path.join(self.__memmapDir, key.replace("/", "__") + ".npy")
+            np.save(filePath, array)
+            array = np.load(filePath, mmap_mode="r")
+        else:
+            array = array.view()
+            array.setflags(write=False)
+        self.__arrays[key] = array
+        self.__indexes[key] = index
+        return array
+
+    def addFrame(self, prefix, frame, columns=None):
+        """adds the columns of a dataframe under the keys prefix/column"""
+        for col in (frame.columns if columns is None else columns):
+            self.add(f"{prefix}/{col}", frame[col], frame.index)
+
+    def getSeries(self, key):
+        """returns the time series as a pandas Series indexed by time, without copying the stored array"""
+        return pd.Series(self.__arrays[key], index=self.__indexes[key], name=key.split("/")[-1], copy=False)
+
+    def getMemoryUsage(self):
+        """number of bytes of the arrays held in memory (memory-mapped arrays are not counted)"""
+        return sum(a.nbytes for a in self.__arrays.values() if not isinstance(a, np.memmap))
+
+    def logSummary(self):
+        logging.info("Time series store with {} series ({:.1f} MB in memory)".format(len(self), self.getMemoryUsage() / 1e6))
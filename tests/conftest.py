@@ -0,0 +1,48 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+basicExamplePath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "excels", "basic_example")
+
+
+@pytest.fixture(scope="session")
+def fullYearScenario(tmp_path_factory):
+    """
+    scenario file of the first building of the basic example with its profiles (January) repeated over the year 2018
+    """
+    scenarioPath = str(tmp_path_factory.mktemp("scenario"))
+    demandProfilesPath = os.path.join(scenarioPath, "demand_profiles")
+    os.makedirs(demandProfilesPath)
+    weather = _repeatToFullYear(pd.read_csv(os.path.join(basicExamplePath, "weather.csv"), delimiter=";"))
+    index = pd.date_range("2018-01-01 00:00:00", periods=len(weather), freq="60min")
+    weather["time.mm"], weather["time.dd"], weather["time.hh"] = index.month, index.day, index.hour
+    weather.to_csv(os.path.join(scenarioPath, "weather.csv"), sep=";", index=False)
+    for name, target in [("electricity_impact.csv", scenarioPath), (os.path.join("demand_profiles", "Building1.csv"),
+                                                                    demandProfilesPath)]:
+        frame = pd.read_csv(os.path.join(basicExamplePath, name), delimiter=";", encoding="utf-8-sig")
+        _repeatToFullYear(frame).to_csv(os.path.join(target, os.path.basename(name)), sep=";", index=False)
+
+    data = pd.ExcelFile(os.path.join(basicExamplePath, "scenario.xls"))
+    sheets = {s: data.parse(s) for s in data.sheet_names}
+    for s, frame in sheets.items():
+        if "building" in frame.columns:
+            sheets[s] = frame[frame["building"] == 1]
+    sheets["profiles"]["path"] = [demandProfilesPath, os.path.join(scenarioPath, "weather.csv")]
+    impact = sheets["commodity_sources"]["CO2 impact"]
+    sheets["commodity_sources"]["CO2 impact"] = impact.where(impact.map(lambda v: not isinstance(v, str)),
+                                                             os.path.join(scenarioPath, "electricity_impact.csv"))
+    scenarioFile = os.path.join(scenarioPath, "scenario.xlsx")
+    with pd.ExcelWriter(scenarioFile, engine="openpyxl") as writer:
+        for s, frame in sheets.items():
+            frame.to_excel(writer, sheet_name=s, index=False)
+    return scenarioFile
+
+
+def _repeatToFullYear(frame):
+    # repeats the rows of an hourly time series to obtain 8760 hours, timestamps (if any) are replaced by ISO timestamps
+    frame = frame.iloc[np.arange(8760) % len(frame)].reset_index(drop=True)
+    if "timestamp" in frame.columns:
+        frame["timestamp"] = pd.date_range("2018-01-01 00:00:00", periods=8760, freq="60min").strftime("%Y-%m-%d %H:%M")
+    return frame
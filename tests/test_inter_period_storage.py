@@ -0,0 +1,76 @@
+import os
+
+import pandas as pd
+import pytest
+
+from optihood.energy_network import EnergyNetworkIndiv
+
+pytest.importorskip("highspy")
+
+
+def _typicalDays(scenarioFile, numberOfClusters):
+    typicalDays = EnergyNetworkIndiv(pd.date_range("2018-01-01", periods=24, freq="60min")).getTypicalDays(
+        scenarioFile, 1)
+    clusterSize, report = typicalDays.cluster(numberOfClusters)
+    return clusterSize, typicalDays.periodSequence(clusterSize)
+
+
+def test_optimize_with_period_sequence(fullYearScenario):
+    # 4 representative days linked over the 365 days of the year, the sequence of the days being longer than the time
+    # index of the optimization
+    clusterSize, sequence = _typicalDays(fullYearScenario, 4)
+    network = EnergyNetworkIndiv(pd.date_range("2018-01-01 00:00:00", periods=4 * 24, freq="60min"))
+    network.setFromExcel(fullYearScenario, 1, clusterSize=clusterSize, opt="costs")
+
+    envImpact, capacitiesTransformers, capacitiesStorages = network.optimize(1, "highs", clusterSize=clusterSize,
+                                                                             periodSequence=sequence)
+
+    assert len(sequence) == 365
+    assert network.getTotalCosts() > 0
+    capacities = network.getInvestedCapacities()
+    assert capacities and all(len(nodes) in [1, 2] for nodes in capacities)
+    for nodes, result in network._optimizationResults.items():
+        assert len(result["sequences"]) in [0, 4 * 24]
+
+
+def test_storage_content_follows_period_sequence(fullYearScenario, tmp_path):
+    # the SH storage starts half full (with a minimum capacity), its content at the boundary of each day of the year is
+    # the content at the previous boundary, decayed over the day, plus the net charge of the representative day of the
+    # day in periodSequence
+    data = pd.ExcelFile(fullYearScenario)
+    sheets = {s: data.parse(s) for s in data.sheet_names}
+    storages = sheets["storages"].astype({"initial capacity": float, "capacity min": float})
+    sheets["storages"] = storages
+    storages.loc[storages["label"] == "shStorage", ["initial capacity", "capacity min"]] = [0.5, 1000]
+    scenarioFile = os.path.join(tmp_path, "scenario.xlsx")
+    with pd.ExcelWriter(scenarioFile, engine="openpyxl") as writer:
+        for s, frame in sheets.items():
+            frame.to_excel(writer, sheet_name=s, index=False)
+    clusterSize, sequence = _typicalDays(scenarioFile, 4)
+    network = EnergyNetworkIndiv(pd.date_range("2018-01-01 00:00:00", periods=4 * 24, freq="60min"))
+    network.setFromExcel(scenarioFile, 1, clusterSize=clusterSize, opt="costs")
+    optimizationModel, _, _ = network._buildOptimizationModel(1, 1000000, clusterSize, None, sequence)
+
+    network._solve(optimizationModel, "highs", {})
+
+    block = optimizationModel.GenericInvestmentStorageBlock
+    linking = optimizationModel.interPeriodStorage
+    days = {pd.Timestamp(day): k for k, day in enumerate(sorted(pd.Timestamp(d) for d in clusterSize))}
+    shStorage = next(n for n in block.INVESTSTORAGES if n.label.startswith("shStorage"))
+    assert block.invest[shStorage].value > 0
+    for n in block.INVESTSTORAGES:
+        content = linking.storageInterContent[n, 0].value
+        capacity = n.investment.existing + block.invest[n].value
+        for p, day in enumerate(sequence):
+            timesteps = range(days[pd.Timestamp(day)] * 24, (days[pd.Timestamp(day)] + 1) * 24)
+            start = linking.storagePeriodStart[n, days[pd.Timestamp(day)]].value
+            decay = 1
+            for t in timesteps:
+                decay *= 1 - n.loss_rate[t]
+                # content of the storage during the day of the year
+                yearContent = content * decay + block.storage_content[n, t].value - start * decay
+                assert -1e-6 <= yearContent <= capacity + 1e-6
+            content = content * decay + block.storage_content[n, timesteps[-1]].value - start * decay
+            assert content == pytest.approx(linking.storageInterContent[n, p + 1].value, abs=1e-6)
+        if n is shStorage:
+            assert content == pytest.approx(0.5 * capacity, rel=1e-6)
@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from optihood.energy_network import EnergyNetworkIndiv
+from optihood.scenario_directory import readScenarioDirectory
+
+
+def test_directory_nodes_data_equals_excel(fullYearScenario, tmp_path, monkeypatch):
+    # scenario with the building model, whose internal gains are read from a path relative to the working directory
+    data = pd.ExcelFile(fullYearScenario)
+    sheets = {s: data.parse(s) for s in data.sheet_names}
+    sheets["demand"]["building model"] = "Yes"
+    scenarioFile = os.path.join(tmp_path, "scenario.xlsx")
+    with pd.ExcelWriter(scenarioFile, engine="openpyxl") as writer:
+        for s, frame in sheets.items():
+            frame.to_excel(writer, sheet_name=s, index=False)
+    workingDirectory = os.path.join(tmp_path, "run")
+    internalGainsPath = os.path.join(workingDirectory, r"..\excels\Internal_gains.csv")
+    os.makedirs(os.path.dirname(internalGainsPath), exist_ok=True)
+    pd.DataFrame({"Total (kW)": np.linspace(0, 1, 8760)}).to_csv(internalGainsPath, sep=";", index=False)
+    monkeypatch.chdir(workingDirectory)
+    network = EnergyNetworkIndiv(pd.date_range("2018-01-01 00:00:00", periods=24, freq="60min"))
+
+    excelData = network.createNodesData(pd.ExcelFile(scenarioFile), scenarioFile, 1)
+    directoryPath = os.path.join(tmp_path, "scenario_directory")
+    network.createScenarioDirectory(scenarioFile, directoryPath, 1)
+    # the scenario directory does not depend on the input files
+    os.remove(internalGainsPath)
+    directoryData = readScenarioDirectory(directoryPath, 1)
+    network._createBuildingModelData(directoryData)
+
+    assert set(directoryData) == set(excelData)
+    for key, frame in excelData.items():
+        if key == "demandProfiles":
+            assert list(directoryData[key]) == list(frame)
+            for i in frame:
+                pd.testing.assert_frame_equal(directoryData[key][i], frame[i], check_freq=False)
+        elif key == "weather_data":
+            # all the columns of the weather data file are used
+            pd.testing.assert_frame_equal(directoryData[key], frame, check_freq=False, check_like=True)
+        else:
+            pd.testing.assert_frame_equal(directoryData[key], frame, check_freq=False)
+    assert "Qocc" in directoryData["building_model"]